@@ -1,47 +1,62 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+from firestore_client import db
+import argparse
 import json
 from datetime import datetime
+from schema_profile import SchemaProfile
+from snapshot import SnapshotWriter, iter_collection, snapshot_format
 
-# Initialize Firebase Admin
-cred = credentials.Certificate('/Users/admin/Downloads/bymayanksingh-firebase-adminsdk-jmdt5-f612894ec8.json')
-firebase_admin.initialize_app(cred)
+def iter_projects():
+    """Stream projects from Firebase one at a time"""
+    for doc in db.collection('projects').stream():
+        project = doc.to_dict()
+        project['id'] = doc.id
+        yield project
 
-db = firestore.client()
+def iter_snapshot_projects(filename):
+    """Stream projects from an export file or snapshot"""
+    for doc_id, project in iter_collection(filename, 'projects'):
+        project['id'] = doc_id
+        yield project
 
 def get_all_projects():
     """Get all projects from Firebase"""
-    projects = []
-    docs = db.collection('projects').stream()
-    
-    for doc in docs:
-        project = doc.to_dict()
-        project['id'] = doc.id
-        projects.append(project)
-    
-    return projects
+    return list(iter_projects())
 
 def analyze_schema(projects):
-    """Analyze the schema of all projects"""
-    all_fields = set()
-    for project in projects:
-        all_fields.update(project.keys())
+    """Analyze the schema of all projects in a single pass (accepts any iterable)"""
+    profile = SchemaProfile.from_documents(projects)
     
-    print("\nAll possible fields:", sorted(list(all_fields)))
+    print("\nAll possible fields:", profile.fields())
     
-    # Print field coverage
+    # Print field coverage, null/empty counts and type distribution
     print("\nField coverage across projects:")
-    for field in sorted(list(all_fields)):
-        coverage = sum(1 for p in projects if field in p)
-        print(f"{field}: {coverage}/{len(projects)} projects")
+    print(profile.report())
+    return profile
 
 def save_projects(projects, filename):
-    """Save projects to a JSON file for inspection"""
+    """Save projects to a JSON file, or a .ndjson/.fsnap snapshot, for inspection"""
+    if snapshot_format(filename) != 'json':
+        with SnapshotWriter(filename) as writer:
+            writer.write_collection('projects', (
+                (project['id'], {k: v for k, v in project.items() if k != 'id'})
+                for project in projects
+            ))
+        return
+
     with open(filename, 'w') as f:
         json.dump(projects, f, indent=2, default=str)
 
 if __name__ == "__main__":
-    projects = get_all_projects()
-    print(f"\nFound {len(projects)} projects")
-    analyze_schema(projects)
-    save_projects(projects, 'current_projects.json')
+    parser = argparse.ArgumentParser(description='Analyze the projects schema.')
+    parser.add_argument('--snapshot', metavar='FILE',
+                        help='analyze an export/snapshot file instead of the live collection')
+    args = parser.parse_args()
+
+    if args.snapshot:
+        profile = analyze_schema(iter_snapshot_projects(args.snapshot))
+        print(f"\nAnalyzed {profile.documents} projects")
+    else:
+        projects = get_all_projects()
+        print(f"\nFound {len(projects)} projects")
+        analyze_schema(projects)
+        save_projects(projects, 'current_projects.json')
@@ -0,0 +1,309 @@
+"""Benchmark the export/import/merge scripts against the in-process fake Firestore.
+
+Every benchmark runs in a fresh process (so peak RSS is its own) on a
+fake_firestore.FakeClient seeded with synthetic projects shaped like the
+ones in current_projects.json, at growing sizes. Each round-trip to the
+fake sleeps for ``--latency`` seconds. Reported per run: wall time,
+documents per second, round-trips, peak RSS, and the scaling exponent k in
+time ~ n**k relative to the previous size.
+
+    python bench_scripts.py [--sizes 10 100 1000 10000] [--latency 0.005]
+                            [--only merge_projects ...] [--json results.json]
+                            [--baseline results.json]
+
+With ``--baseline`` runs that are more than ``--tolerance`` slower than the
+saved results are flagged, so a change can be checked for regressions.
+"""
+import argparse
+import contextlib
+import json
+import math
+import multiprocessing
+import os
+import queue
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from bench_title_index import synthetic_titles
+
+DEFAULT_SIZES = (10, 100, 1000, 10000)
+# Seconds a single case may run before it is stopped and reported as failed
+DEFAULT_TIMEOUT = 1800
+# Seconds between checks that the child process is still alive
+POLL_INTERVAL = 1.0
+ID_ALPHABET = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+
+CLIENTS = ['Jumbotail', 'IDfy', 'Open Source Developers Community', 'Freelance', 'Personal']
+LOCATIONS = ['Remote', 'Mumbai, India', 'Bengaluru, India', 'Delhi, India']
+STATUSES = ['Completed', 'Live', 'In Progress']
+CATEGORIES = ['Software Development', 'Backend Development', 'Frontend Development',
+              'Full Stack Development', 'Game Development']
+TECHNOLOGIES = ['Python', 'Django', 'Django Rest Framework', 'PostgreSQL', 'React', 'Node.js',
+                'Express', 'MongoDB', 'Elixir', 'Phoenix', 'JavaScript', 'HTML', 'CSS', 'Pygame',
+                'Flask', 'Docker', 'Redis', 'TypeScript', 'Firebase', 'C++', 'OpenGL']
+SENTENCES = [
+    'Designed and implemented a robust tracking system.',
+    'Built and maintained scalable services.',
+    'Handled peak traffic with horizontal scaling.',
+    'Integrated with external APIs.',
+    'Wrote the documentation using Swagger Open API Specification.',
+    'Implemented the entire backend API from scratch.',
+    'Selected among the top participants of the program.',
+]
+
+
+def synthetic_id(rng):
+    return ''.join(rng.choice(ID_ALPHABET) for _ in range(20))
+
+
+def synthetic_project(rng, title):
+    """One project in either of the two shapes found in current_projects.json."""
+    year = rng.randint(2016, 2024)
+    if rng.random() < 0.5:
+        # Portfolio entry: year/status/details/gallery, no timestamps
+        return {
+            'title': title.title(),
+            'description': f"Developed {title} for {rng.choice(CLIENTS)}.",
+            'year': year,
+            'date': str(year),
+            'status': rng.choice(STATUSES),
+            'area': 'N/A',
+            'coverImage': None,
+            'client': rng.choice(CLIENTS),
+            'category': rng.choice(CATEGORIES),
+            'details': rng.sample(SENTENCES, rng.randint(1, 3)),
+            'location': rng.choice(LOCATIONS),
+            'gallery': [],
+            'featured': rng.random() < 0.2,
+        }
+    # Imported repository: free-text technologies and timestamps
+    created = datetime(year, 1, 1, tzinfo=timezone.utc) + timedelta(seconds=rng.randrange(365 * 86400))
+    slug = '-'.join(title.split())
+    return {
+        'title': title.title(),
+        'description': f"It is {title}.",
+        'technologies': 'Used ' + ', '.join(rng.sample(TECHNOLOGIES, rng.randint(2, 5))) + '.',
+        'role': 'As a developer I implemented the entire project.',
+        'github_url': f"https://github.com/code-monk08/{slug}",
+        'date_built': created,
+        'created_at': created,
+        'updated_at': created + timedelta(days=rng.randint(0, 900)),
+    }
+
+
+def synthetic_projects(count, seed=42, duplicate_rate=0.05):
+    """{doc_id: project} for ``count`` projects, a share of them near-duplicate titles."""
+    rng = random.Random(seed)
+    return {
+        synthetic_id(rng): synthetic_project(rng, title)
+        for title in synthetic_titles(count, duplicate_rate, seed)
+    }
+
+
+def write_export(filename, projects):
+    from snapshot import SnapshotWriter
+
+    with SnapshotWriter(filename) as writer:
+        writer.write_collection('projects', projects.items())
+    return filename
+
+
+# Benchmarks: setup(size, latency) returns (client, run), where run() does the timed work
+
+def _fake_client(projects, latency):
+    from fake_firestore import FakeClient
+    from firestore_client import set_db
+
+    client = FakeClient({'projects': projects} if projects else None, latency=latency)
+    set_db(client)
+    return client
+
+
+def setup_export_data(size, latency):
+    from firebase_export import export_data
+
+    return _fake_client(synthetic_projects(size), latency), export_data
+
+
+def setup_import_data(size, latency):
+    from firebase_import import import_data
+
+    filename = write_export('export.ndjson', synthetic_projects(size))
+    client = _fake_client(None, latency)
+    return client, lambda: import_data(filename, client=client)
+
+
+def setup_delete_and_import_projects(size, latency):
+    from firebase_import_with_delete import delete_and_import_projects
+
+    filename = write_export('export.ndjson', synthetic_projects(size, seed=7))
+    client = _fake_client(synthetic_projects(size), latency)
+    return client, lambda: delete_and_import_projects(filename, client=client)
+
+
+def setup_merge_projects(size, latency):
+    from merge_projects import main
+
+    return _fake_client(synthetic_projects(size), latency), main
+
+
+def setup_analyze_schema(size, latency):
+    from analyze_projects import analyze_schema, iter_projects
+
+    client = _fake_client(synthetic_projects(size), latency)
+    return client, lambda: analyze_schema(iter_projects())
+
+
+def setup_update_all_projects(size, latency):
+    from unsplash_standin import start_standin
+
+    # Cover images come from a local Unsplash stand-in answering with the same latency
+    server = start_standin(latency=latency, limit=10 ** 9)
+    os.environ['UNSPLASH_API_URL'] = server.url
+    from update_projects import update_all_projects
+
+    return _fake_client(synthetic_projects(size), latency), update_all_projects
+
+
+BENCHMARKS = {
+    'export_data': setup_export_data,
+    'import_data': setup_import_data,
+    'delete_and_import_projects': setup_delete_and_import_projects,
+    'merge_projects': setup_merge_projects,
+    'analyze_schema': setup_analyze_schema,
+    'update_all_projects': setup_update_all_projects,
+}
+
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+
+
+def run_case(name, size, latency, results):
+    """Run one benchmark at one size in this (child) process and report through ``results``."""
+    with tempfile.TemporaryDirectory() as workdir:
+        os.chdir(workdir)
+        try:
+            with open(os.devnull, 'w') as devnull, \
+                    contextlib.redirect_stdout(devnull), contextlib.redirect_stderr(devnull):
+                client, run = BENCHMARKS[name](size, latency)
+                client.rpc_counts.clear()
+                start = time.perf_counter()
+                run()
+                elapsed = time.perf_counter() - start
+        except Exception as e:
+            results.put({'benchmark': name, 'size': size, 'error': f"{type(e).__name__}: {e}"})
+            return
+        results.put({
+            'benchmark': name,
+            'size': size,
+            'seconds': elapsed,
+            'docs_per_second': size / elapsed if elapsed else 0.0,
+            'round_trips': sum(client.rpc_counts.values()),
+            'peak_rss_mb': _peak_rss_mb(),
+        })
+
+
+def measure(name, size, latency, timeout=DEFAULT_TIMEOUT):
+    """Run a case in a fresh process so its peak RSS isn't shared with other cases.
+
+    A child that dies without reporting (a crash, the OOM killer) or runs
+    longer than ``timeout`` seconds gives a result with an 'error' instead.
+    """
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+    process = context.Process(target=run_case, args=(name, size, latency, results))
+    process.start()
+    deadline = time.monotonic() + timeout
+    result = None
+    while result is None:
+        try:
+            result = results.get(timeout=POLL_INTERVAL)
+        except queue.Empty:
+            if not process.is_alive():
+                # One last look, in case the result arrived as the child exited
+                try:
+                    result = results.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    result = {'benchmark': name, 'size': size,
+                              'error': f"process exited with code {process.exitcode}"}
+            elif time.monotonic() > deadline:
+                process.terminate()
+                result = {'benchmark': name, 'size': size, 'error': f"timed out after {timeout}s"}
+    process.join()
+    return result
+
+
+def load_baseline(path):
+    """(latency, {(benchmark, size): result}) from a file saved with --json."""
+    with open(path, 'r') as f:
+        saved = json.load(f)
+    return saved['latency'], {(r['benchmark'], r['size']): r for r in saved['results'] if 'seconds' in r}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Benchmark the scripts against a fake Firestore.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='project counts to run at (up to 1000000)')
+    parser.add_argument('--latency', type=float, default=0.0, help='seconds slept per round-trip')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='benchmarks to run')
+    parser.add_argument('--json', metavar='FILE', help='save the results')
+    parser.add_argument('--baseline', metavar='FILE', help='flag runs slower than these saved results')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='slowdown against the baseline that counts as a regression')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT,
+                        help='seconds a single run may take before it is stopped')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.baseline:
+        baseline_latency, baseline = load_baseline(args.baseline)
+        if baseline_latency != args.latency:
+            parser.error(f"{args.baseline} was measured with --latency {baseline_latency}")
+    results = []
+    regressions = 0
+    failures = 0
+    print(f"latency {args.latency * 1000:.1f} ms per round-trip")
+    print(f"{'benchmark':<28} {'docs':>8} {'seconds':>9} {'docs/s':>10} {'rpcs':>7} {'rss MB':>7} {'growth':>7}")
+    for name in args.only or list(BENCHMARKS):
+        previous = None
+        for size in sorted(args.sizes):
+            result = measure(name, size, args.latency, args.timeout)
+            results.append(result)
+            if 'error' in result:
+                failures += 1
+                print(f"{name:<28} {size:>8} failed: {result['error']}")
+                continue
+            # Exponent k in time ~ n**k between this size and the previous one
+            growth = '-'
+            if previous and previous['seconds'] and size != previous['size']:
+                growth = f"{math.log(result['seconds'] / previous['seconds']) / math.log(size / previous['size']):.2f}"
+            previous = result
+            line = (f"{name:<28} {size:>8} {result['seconds']:>9.3f} {result['docs_per_second']:>10.0f} "
+                    f"{result['round_trips']:>7} {result['peak_rss_mb']:>7.0f} {growth:>7}")
+            saved = baseline.get((name, size))
+            if saved and result['seconds'] > saved['seconds'] * (1 + args.tolerance):
+                regressions += 1
+                line += f"  REGRESSION ({saved['seconds']:.3f}s before)"
+            print(line)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'run_at': datetime.now().isoformat(),
+                'latency': args.latency,
+                'results': results,
+            }, f, indent=2)
+        print(f"Results saved to {args.json}")
+    if failures:
+        print(f"{failures} runs failed")
+    if regressions:
+        print(f"{regressions} regressions against {args.baseline}")
+    if failures or regressions:
+        sys.exit(1)
@@ -0,0 +1,76 @@
+"""Micro-benchmark for text_normalize against the previous per-call implementations.
+
+    python bench_text_normalize.py [titles]
+"""
+import re
+import sys
+import time
+
+import text_normalize
+from bench_title_index import synthetic_titles
+
+
+def legacy_normalize_title(title):
+    """normalize_title() as it was in merge_projects.py"""
+    number_word_map = {
+        '0': 'zero', '1': 'one', '2': 'two', '3': 'three', '4': 'four',
+        '5': 'five', '6': 'six', '7': 'seven', '8': 'eight', '9': 'nine',
+        'zero': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4',
+        'five': '5', 'six': '6', 'seven': '7', 'eight': '8', 'nine': '9'
+    }
+    title = re.sub(r'[^\w\s]', '', title.lower().strip())
+    title = re.sub(r'(\w+)(\d+)', r'\1 \2', title)
+    normalized = []
+    for word in title.split():
+        if word.isdigit():
+            word = number_word_map.get(word, word)
+        elif word in number_word_map:
+            word = number_word_map[word]
+        if word not in {'a', 'an', 'the', 'and', 'or', 'but', 'game'}:
+            normalized.append(word)
+    return ' '.join(normalized)
+
+
+def legacy_create_slug(title):
+    """create_slug() as it was in update_project_slugs.py"""
+    slug = title.lower().strip()
+    slug = re.sub(r'[^\w\s-]', '', slug)
+    slug = re.sub(r'[-\s]+', '-', slug)
+    return slug
+
+
+def per_title_us(func, titles, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        text_normalize.normalize_title.cache_clear()
+        text_normalize.create_slug.cache_clear()
+        start = time.perf_counter()
+        func(titles)
+        best = min(best, time.perf_counter() - start)
+    return best / len(titles) * 1e6
+
+
+def warm_per_title_us(func, titles):
+    func(titles)
+    start = time.perf_counter()
+    func(titles)
+    return (time.perf_counter() - start) / len(titles) * 1e6
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    # Mixed case, punctuation and digits like real project titles
+    titles = [f"The {title.title()}: Game {i % 12}!" for i, title in enumerate(synthetic_titles(count))]
+
+    assert [legacy_normalize_title(t) for t in titles] == text_normalize.normalize_titles(titles)
+    assert [legacy_create_slug(t) for t in titles] == text_normalize.create_slugs(titles)
+
+    rows = [
+        ('normalize_title', lambda ts: [legacy_normalize_title(t) for t in ts], text_normalize.normalize_titles),
+        ('create_slug', lambda ts: [legacy_create_slug(t) for t in ts], text_normalize.create_slugs),
+    ]
+    print(f"{count} titles, microseconds per title")
+    print(f"{'function':<16} {'before':>8} {'after':>8} {'cached':>8}")
+    for name, legacy, batch in rows:
+        print(f"{name:<16} {per_title_us(legacy, titles):>8.2f} "
+              f"{per_title_us(batch, titles):>8.2f} {warm_per_title_us(batch, titles):>8.2f}")
@@ -0,0 +1,100 @@
+"""Benchmark near-duplicate detection: all-pairs loop vs TitleIndex vs MinHashIndex.
+
+Generates synthetic project titles (with a share of deliberate near
+duplicates) and times the three at growing sizes. The exact index must
+find exactly the pairs of the all-pairs loop; for MinHash the share of the
+exact index's pairs it finds (its recall) is reported.
+
+    python bench_title_index.py [max_titles] [max_exact_titles]
+"""
+import math
+import random
+import sys
+import time
+
+from title_index import MinHashIndex, TitleIndex, find_similar_pairs_bruteforce
+
+WORDS = [
+    'asset', 'tracking', 'portal', 'document', 'fetcher', 'connect', 'four', 'chess',
+    'weather', 'dashboard', 'chat', 'bot', 'portfolio', 'website', 'color', 'picker',
+    'extension', 'expense', 'tracker', 'todo', 'app', 'music', 'player', 'image',
+    'classifier', 'api', 'gateway', 'kyc', 'workflow', 'engine', 'search', 'blog',
+    'platform', 'snake', 'tetris', 'compiler', 'parser', 'scheduler', 'monitor',
+    'inventory', 'booking', 'system', 'analytics', 'pipeline', 'crawler', 'notes',
+]
+
+
+CONSONANTS = 'bcdfghjklmnprstvwxz'
+VOWELS = 'aeiou'
+
+
+def vocabulary(rng, size=3000):
+    """Real project words plus made-up ones, so larger sets don't just repeat titles."""
+    words = list(WORDS)
+    while len(words) < size:
+        words.append(''.join(
+            rng.choice(CONSONANTS) + rng.choice(VOWELS) for _ in range(rng.randint(2, 4))
+        ))
+    return words
+
+
+def synthetic_titles(count, duplicate_rate=0.1, seed=42):
+    """Random 2-4 word titles, some of them typo'd or reworded copies of earlier ones."""
+    rng = random.Random(seed)
+    vocab = vocabulary(rng, max(3000, count))
+    titles = []
+    for _ in range(count):
+        if titles and rng.random() < duplicate_rate:
+            words = rng.choice(titles).split()
+            mutation = rng.random()
+            if mutation < 0.4 and len(words) > 2:
+                words.pop(rng.randrange(len(words)))
+            elif mutation < 0.7:
+                word = words[rng.randrange(len(words))]
+                position = rng.randrange(len(word))
+                words[words.index(word)] = word[:position] + word[position + 1:]
+            else:
+                words.append(rng.choice(vocab))
+        else:
+            words = rng.sample(vocab, rng.randint(2, 4))
+        titles.append(' '.join(words))
+    return titles
+
+
+def timed(func, *args):
+    start = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - start
+
+
+def growth(current, previous):
+    """Exponent k in time ~ n**k between this size and the previous, half as large, one."""
+    return f"{math.log2(current / previous):.2f}" if previous else '-'
+
+
+if __name__ == "__main__":
+    max_titles = int(sys.argv[1]) if len(sys.argv) > 1 else 16000
+    exact_limit = int(sys.argv[2]) if len(sys.argv) > 2 else 4000
+    bruteforce_limit = 1000
+
+    print(f"{'titles':>8} {'all-pairs s':>12} {'exact s':>9} {'growth':>7} {'same':>5} "
+          f"{'minhash s':>10} {'growth':>7} {'pairs':>7} {'recall':>7}")
+    size = 250
+    previous_exact = previous_minhash = None
+    while size <= max_titles:
+        titles = synthetic_titles(size)
+        found, minhash_time = timed(MinHashIndex(titles).similar_pairs)
+        brute, same, exact_time, recall = 'skipped', '-', None, '-'
+        if size <= exact_limit:
+            expected, exact_time = timed(TitleIndex(titles).similar_pairs)
+            recall = f"{len(set(found) & set(expected)) / len(expected):.4f}" if expected else '-'
+            if size <= bruteforce_limit:
+                reference, brute_time = timed(find_similar_pairs_bruteforce, titles)
+                same = 'yes' if reference == expected else 'NO'
+                brute = f"{brute_time:.3f}"
+        exact = f"{exact_time:.3f}" if exact_time else 'skipped'
+        exact_growth = growth(exact_time, previous_exact) if exact_time else '-'
+        print(f"{size:>8} {brute:>12} {exact:>9} {exact_growth:>7} {same:>5} "
+              f"{minhash_time:>10.3f} {growth(minhash_time, previous_minhash):>7} {len(found):>7} {recall:>7}")
+        previous_exact, previous_minhash = exact_time, minhash_time
+        size *= 2
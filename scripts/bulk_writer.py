@@ -0,0 +1,169 @@
+"""Batched, concurrent Firestore writer.
+
+Writes are grouped into batches of up to MAX_BATCH_SIZE operations and
+committed on a small thread pool. The number of batches in flight is
+bounded, so a fast producer blocks instead of queueing the whole dataset in
+memory. Commits that fail with contention or quota errors are retried with
+exponential backoff and jitter.
+
+Works with any client exposing ``batch()``: the real Firestore client, the
+emulator (set FIRESTORE_EMULATOR_HOST) or ``fake_firestore.FakeClient``.
+"""
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from instrumentation import record_retry
+
+MAX_BATCH_SIZE = 500  # Firestore limit on writes per commit
+MAX_WORKERS = 4
+
+# google.api_core exception names worth retrying
+RETRYABLE_ERRORS = {
+    'Aborted',
+    'DeadlineExceeded',
+    'InternalServerError',
+    'ResourceExhausted',
+    'ServiceUnavailable',
+    'TooManyRequests',
+}
+
+
+def is_retryable(error):
+    """Return True for errors caused by contention, quota or transient outages."""
+    return type(error).__name__ in RETRYABLE_ERRORS
+
+
+class BulkWriteStats:
+    """Counters collected while a BulkWriter runs."""
+
+    def __init__(self):
+        self.writes = 0
+        self.batches = 0
+        self.retries = 0
+        self.failed_writes = 0
+        self.errors = []
+        # Writes not attempted because earlier ones failed, as 'collection/id'
+        self.skipped = []
+        self.started = time.monotonic()
+        self.finished = None
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    @property
+    def writes_per_second(self):
+        return self.writes / self.elapsed if self.elapsed else 0.0
+
+    def report(self):
+        """Human-readable throughput summary."""
+        lines = [
+            f"Committed {self.writes} writes in {self.batches} batches "
+            f"in {self.elapsed:.2f}s ({self.writes_per_second:.1f} writes/s)",
+            f"Retries: {self.retries}, failed writes: {self.failed_writes}",
+        ]
+        if self.skipped:
+            lines.append(f"Skipped {len(self.skipped)} writes after failures: "
+                         + ', '.join(self.skipped[:5]) + (', ...' if len(self.skipped) > 5 else ''))
+        for error in self.errors[:5]:
+            lines.append(f"  error: {error}")
+        return '\n'.join(lines)
+
+
+class BulkWriter:
+    """Buffer set/update/delete calls and commit them as parallel batches.
+
+    Use as a context manager, or call close() to flush and wait for every
+    outstanding batch.
+    """
+
+    def __init__(self, db, batch_size=MAX_BATCH_SIZE, max_workers=MAX_WORKERS,
+                 max_in_flight=None, max_retries=5, base_delay=0.5, max_delay=30.0):
+        if not 0 < batch_size <= MAX_BATCH_SIZE:
+            raise ValueError(f"batch_size must be between 1 and {MAX_BATCH_SIZE}")
+        self.db = db
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats = BulkWriteStats()
+        self._pending = []
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight or max_workers * 2)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._futures = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def set(self, reference, document_data, merge=False):
+        self._add(('set', reference, document_data, merge))
+
+    def update(self, reference, field_updates):
+        self._add(('update', reference, field_updates, None))
+
+    def delete(self, reference):
+        self._add(('delete', reference, None, None))
+
+    def _add(self, operation):
+        self._pending.append(operation)
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        """Submit the buffered operations as one batch, blocking while too many are in flight."""
+        if not self._pending:
+            return
+        operations, self._pending = self._pending, []
+        self._slots.acquire()
+        self._futures.append(self._executor.submit(self._commit, operations))
+        self._futures = [future for future in self._futures if not future.done()]
+
+    def _build_batch(self, operations):
+        batch = self.db.batch()
+        for kind, reference, data, merge in operations:
+            if kind == 'set':
+                batch.set(reference, data, merge=merge)
+            elif kind == 'update':
+                batch.update(reference, data)
+            else:
+                batch.delete(reference)
+        return batch
+
+    def _commit(self, operations):
+        try:
+            attempt = 0
+            while True:
+                try:
+                    # A batch can't be reused after a failed commit, so rebuild it each time
+                    self._build_batch(operations).commit()
+                    with self._lock:
+                        self.stats.writes += len(operations)
+                        self.stats.batches += 1
+                    return
+                except Exception as e:
+                    if not is_retryable(e) or attempt >= self.max_retries:
+                        with self._lock:
+                            self.stats.failed_writes += len(operations)
+                            self.stats.errors.append(f"{type(e).__name__}: {e}")
+                        return
+                    delay = min(self.max_delay, self.base_delay * 2 ** attempt)
+                    time.sleep(delay * random.uniform(0.5, 1.0))
+                    attempt += 1
+                    with self._lock:
+                        self.stats.retries += 1
+                    record_retry('commit')
+        finally:
+            self._slots.release()
+
+    def close(self):
+        """Flush remaining writes, wait for all batches and return the stats."""
+        self.flush()
+        self._executor.shutdown(wait=True)
+        self.stats.finished = time.monotonic()
+        return self.stats
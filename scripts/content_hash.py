@@ -0,0 +1,77 @@
+"""Content hashes for skipping writes to documents that haven't changed.
+
+A document's content hash is a digest of its canonical JSON form with
+volatile bookkeeping fields (``updated_at``) left out, so re-running a
+migration over already-migrated data produces identical hashes.
+
+HashManifest keeps the hashes a migration has already processed in a local
+JSON file, namespaced per migration, so a re-run can skip those documents
+without recomputing anything or writing to Firestore.
+"""
+import hashlib
+import json
+import os
+from datetime import datetime, timezone
+
+DEFAULT_MANIFEST = 'content_hashes.json'
+VOLATILE_FIELDS = frozenset({'updated_at'})
+
+
+def _canonical_default(value):
+    if isinstance(value, datetime):
+        # Firestore stores naive datetimes as UTC and returns them tz-aware
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return value.isoformat()
+    return str(value)
+
+
+def canonical_json(data):
+    """Serialize a document deterministically (sorted keys, normalized timestamps)."""
+    return json.dumps(data, sort_keys=True, default=_canonical_default,
+                      separators=(',', ':'), ensure_ascii=False)
+
+
+def document_digest(data):
+    """Digest of every field of a document."""
+    return hashlib.sha1(canonical_json(data).encode('utf-8')).hexdigest()
+
+
+def content_hash(data, ignore=VOLATILE_FIELDS):
+    """Digest of a document's content, ignoring volatile fields."""
+    return document_digest({key: value for key, value in data.items() if key not in ignore})
+
+
+class HashManifest:
+    """Local record of the content hashes a migration has already handled."""
+
+    def __init__(self, namespace, path=DEFAULT_MANIFEST):
+        self.namespace = namespace
+        self.path = path
+        self._all = {}
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                self._all = json.load(f)
+        self._hashes = self._all.setdefault(namespace, {})
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.save()
+
+    def matches(self, collection, doc_id, data):
+        """True if this exact content was already processed by the migration."""
+        return self._hashes.get(f'{collection}/{doc_id}') == content_hash(data)
+
+    def record(self, collection, doc_id, data):
+        self._hashes[f'{collection}/{doc_id}'] = content_hash(data)
+
+    def forget(self, collection, doc_id):
+        self._hashes.pop(f'{collection}/{doc_id}', None)
+
+    def save(self):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._all, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -1,36 +1,107 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import os
-from dotenv import load_dotenv
+"""Delete projects by slug, in bulk.
 
-# Load environment variables
-load_dotenv()
+    python delete_project.py color-picker-extension [more-slugs ...]
+    python delete_project.py --file slugs.txt
+    python delete_project.py --where status == Archived
+    ... [--cascade] [--dry-run] [--plan FILE]
 
-# Initialize Firebase Admin
-cred = credentials.Certificate(os.getenv('FIREBASE_ADMIN_SDK_PATH'))
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(cred)
+Slugs are resolved to document IDs with 'in' queries of up to 30 slugs
+each (see project_queries.project_ids_by_slugs()). The deletes are planned first and then committed in parallel batches, and
+--cascade also deletes every document in the projects' subcollections.
+"""
+from firestore_client import db
+import argparse
+import json
+from project_queries import PROJECTS, project_ids_by_slugs, projects_where
+from write_plan import WritePlan, execute_plan
+
+def read_slugs(filename):
+    """Slugs from a file, one per line; blank lines and # comments are skipped."""
+    with open(filename, 'r') as f:
+        lines = [line.split('#', 1)[0].strip() for line in f]
+    return [line for line in lines if line]
+
+
+def subcollection_refs(reference):
+    """Every document below ``reference``, through all levels of subcollections."""
+    for collection in reference.collections():
+        # list_documents() also returns documents that only hold subcollections
+        for child in collection.list_documents():
+            yield child
+            yield from subcollection_refs(child)
+
+
+def plan_deletes(client, doc_ids, cascade=False):
+    """Write plan deleting the given projects (and with ``cascade`` their subcollections)"""
+    plan = WritePlan('delete_project')
+    for doc_id in doc_ids:
+        reference = client.collection(PROJECTS).document(doc_id)
+        if cascade:
+            for child in subcollection_refs(reference):
+                plan.delete(child.path.rsplit('/', 1)[0], child.id)
+        plan.delete(PROJECTS, doc_id)
+    return plan
+
+
+def delete_projects(slugs=(), filters=(), cascade=False, dry_run=False, plan_path=None, client=None):
+    """Delete every project with one of ``slugs`` or matching all (field, op, value) ``filters``."""
+    client = client or db
+    doc_ids = []
+    if slugs:
+        resolved = project_ids_by_slugs(client, slugs)
+        for slug in dict.fromkeys(slugs):
+            if slug in resolved:
+                doc_ids.extend(resolved[slug])
+            else:
+                print(f"No project found with slug: {slug}")
+    if filters:
+        doc_ids.extend(doc.id for doc in projects_where(client, filters))
+
+    plan = plan_deletes(client, dict.fromkeys(doc_ids), cascade)
+    print(plan.report(show_diffs=False) if dry_run else plan.report().splitlines()[0])
+    if plan_path:
+        plan.save(plan_path)
+        print(f"Plan saved to {plan_path}")
+    if dry_run or not plan:
+        return plan
+
+    stats = execute_plan(plan, client)
+    print(stats.report())
+    if stats.failed_writes:
+        print(f"Deleted {len(plan) - stats.failed_writes} of {len(plan)} documents")
+    else:
+        print(f"Successfully deleted {len(plan)} documents")
+    return stats
 
-db = firestore.client()
 
 def delete_project(project_slug):
-    # Get projects collection
-    projects_ref = db.collection('projects')
-    
-    # Query for the project with matching slug
-    query = projects_ref.where('slug', '==', project_slug)
-    docs = query.get()
-    
-    # Delete matching documents
-    deleted = False
-    for doc in docs:
-        doc.reference.delete()
-        deleted = True
-        print(f"Successfully deleted project with slug: {project_slug}")
-    
-    if not deleted:
-        print(f"No project found with slug: {project_slug}")
+    return delete_projects([project_slug])
+
+
+def parse_value(text):
+    """A --where value: JSON if it parses (numbers, true, null, lists), else the string itself."""
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
 
 if __name__ == "__main__":
-    # Delete the Color Picker Extension project
-    delete_project("color-picker-extension")
+    parser = argparse.ArgumentParser(description='Delete projects by slug or filter.')
+    parser.add_argument('slugs', nargs='*', help='slugs of the projects to delete')
+    parser.add_argument('--file', help='file with one slug per line')
+    parser.add_argument('--where', nargs=3, action='append', default=[], metavar=('FIELD', 'OP', 'VALUE'),
+                        help="delete projects matching a filter, e.g. --where status == Archived")
+    parser.add_argument('--cascade', action='store_true', help='also delete the subcollections of each project')
+    parser.add_argument('--dry-run', action='store_true', help='print the write plan without executing it')
+    parser.add_argument('--plan', metavar='FILE', help='save the write plan as JSON')
+    args = parser.parse_args()
+
+    slugs = list(args.slugs)
+    if args.file:
+        slugs.extend(read_slugs(args.file))
+    filters = [(field, op, parse_value(value)) for field, op, value in args.where]
+    if not slugs and not filters:
+        parser.error('give slugs, --file or --where')
+
+    delete_projects(slugs, filters, cascade=args.cascade, dry_run=args.dry_run, plan_path=args.plan)
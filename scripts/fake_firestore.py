@@ -0,0 +1,470 @@
+"""In-process stand-in for the subset of the Firestore client the scripts use.
+
+Documents live in plain dicts, every call that would be a round-trip against
+Firestore sleeps for ``latency`` seconds and is counted in ``rpc_counts``, and
+commits can be made to fail on demand to exercise retry paths.
+"""
+import copy
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+MAX_BATCH_SIZE = 500
+
+SERVER_TIMESTAMP = object()
+DELETE_FIELD = object()
+
+
+class Aborted(Exception):
+    """Raised for simulated transaction contention."""
+
+
+class ResourceExhausted(Exception):
+    """Raised for simulated quota exhaustion."""
+
+
+class InvalidArgument(Exception):
+    """Raised for requests Firestore would reject outright."""
+
+
+class FieldPath:
+    @staticmethod
+    def document_id():
+        return '__name__'
+
+
+def _get_field(data, field_path):
+    value = data
+    for part in field_path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            raise KeyError(field_path)
+        value = value[part]
+    return value
+
+
+def _type_order(value):
+    """Firestore's cross-type ordering; range filters only match within one type."""
+    if value is None:
+        return 0
+    if isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float)):
+        return 2
+    if isinstance(value, datetime):
+        return 3
+    if isinstance(value, str):
+        return 4
+    if isinstance(value, list):
+        return 9
+    if isinstance(value, dict):
+        return 10
+    return 5
+
+
+def _resolve(value):
+    if value is SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    if isinstance(value, dict):
+        return {k: _resolve(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_resolve(v) for v in value]
+    return copy.deepcopy(value)
+
+
+class DocumentSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, field_path):
+        return copy.deepcopy(_get_field(self._data, field_path))
+
+
+class DocumentReference:
+    def __init__(self, client, collection_path, doc_id):
+        self._client = client
+        self._collection_path = collection_path
+        self.id = doc_id
+
+    @property
+    def path(self):
+        return f'{self._collection_path}/{self.id}'
+
+    @property
+    def parent(self):
+        return CollectionReference(self._client, self._collection_path)
+
+    def collection(self, name):
+        return CollectionReference(self._client, f'{self.path}/{name}')
+
+    def collections(self):
+        prefix = self.path + '/'
+        names = sorted({
+            path[len(prefix):] for path in self._client._collection_paths()
+            if path.startswith(prefix) and '/' not in path[len(prefix):]
+        })
+        return [self.collection(name) for name in names]
+
+    def get(self, field_paths=None):
+        self._client._rpc('get')
+        with self._client._lock:
+            data = self._client._get_document(self._collection_path, self.id)
+            return DocumentSnapshot(self, copy.deepcopy(data))
+
+    def set(self, document_data, merge=False):
+        self._client._rpc('set')
+        self._client._apply(('set', self, document_data, merge))
+
+    def update(self, field_updates):
+        self._client._rpc('update')
+        self._client._apply(('update', self, field_updates, False))
+
+    def delete(self):
+        self._client._rpc('delete')
+        self._client._apply(('delete', self, None, False))
+
+
+class Query:
+    def __init__(self, client, collection_path, filters=(), orders=(), limit=None,
+                 start_after=None, projection=None):
+        self._client = client
+        self._collection_path = collection_path
+        self._filters = filters
+        self._orders = orders
+        self._limit = limit
+        self._start_after = start_after
+        self._projection = projection
+
+    def _copy(self, **changes):
+        state = {
+            'filters': self._filters, 'orders': self._orders, 'limit': self._limit,
+            'start_after': self._start_after, 'projection': self._projection,
+        }
+        state.update(changes)
+        return Query(self._client, self._collection_path, **state)
+
+    def where(self, field_path, op_string, value):
+        return self._copy(filters=self._filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction='ASCENDING'):
+        return self._copy(orders=self._orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def start_after(self, document_fields):
+        return self._copy(start_after=document_fields)
+
+    def select(self, field_paths):
+        return self._copy(projection=tuple(field_paths))
+
+    def _matches(self, data):
+        for field_path, op, value in self._filters:
+            try:
+                actual = _get_field(data, field_path)
+            except KeyError:
+                return False
+            if op in ('<', '<=', '>', '>=') and _type_order(actual) != _type_order(value):
+                return False
+            if op == '==' and not actual == value:
+                return False
+            if op == '!=' and not (actual != value and actual is not None):
+                return False
+            if op == '<' and not actual < value:
+                return False
+            if op == '<=' and not actual <= value:
+                return False
+            if op == '>' and not actual > value:
+                return False
+            if op == '>=' and not actual >= value:
+                return False
+            if op == 'in' and actual not in value:
+                return False
+            if op == 'not-in' and actual in value:
+                return False
+            if op == 'array-contains' and not (isinstance(actual, list) and value in actual):
+                return False
+        return True
+
+    def _sort_key(self, doc_id, data):
+        key = []
+        for field_path, _ in self._orders:
+            if field_path == '__name__':
+                key.append(doc_id)
+            else:
+                key.append(_get_field(data, field_path))
+        key.append(doc_id)
+        return tuple(key)
+
+    def _cursor_key(self):
+        cursor = self._start_after
+        if isinstance(cursor, DocumentSnapshot):
+            return self._sort_key(cursor.id, cursor._data)
+        key = []
+        for field_path, _ in self._orders:
+            value = cursor[field_path]
+            if isinstance(value, DocumentReference):
+                value = value.id
+            key.append(value)
+        return tuple(key)
+
+    def _run(self):
+        with self._client._lock:
+            docs = self._client._documents(self._collection_path, self._filters)
+        results = []
+        for doc_id, data in docs:
+            if not self._matches(data):
+                continue
+            try:
+                results.append((self._sort_key(doc_id, data), doc_id, data))
+            except KeyError:
+                # Firestore omits documents missing an order_by field
+                continue
+        results.sort(key=lambda item: item[0])
+        for (field_path, direction) in self._orders[:1]:
+            if direction == 'DESCENDING':
+                results.reverse()
+        if self._start_after is not None:
+            cursor_key = self._cursor_key()
+            results = [r for r in results if r[0][:len(cursor_key)] > cursor_key]
+        if self._limit is not None:
+            results = results[:self._limit]
+        snapshots = []
+        collection = CollectionReference(self._client, self._collection_path)
+        for _, doc_id, data in results:
+            data = copy.deepcopy(data)
+            if self._projection is not None:
+                projected = {}
+                for field_path in self._projection:
+                    try:
+                        value = _get_field(data, field_path)
+                    except KeyError:
+                        continue
+                    target = projected
+                    parts = field_path.split('.')
+                    for part in parts[:-1]:
+                        target = target.setdefault(part, {})
+                    target[parts[-1]] = value
+                data = projected
+            snapshots.append(DocumentSnapshot(collection.document(doc_id), data))
+        return snapshots
+
+    def count(self, alias=None):
+        return AggregationQuery(self, alias or 'count')
+
+    def stream(self, transaction=None):
+        self._client._rpc('stream')
+        for snapshot in self._run():
+            yield snapshot
+
+    def get(self, transaction=None):
+        self._client._rpc('get')
+        return self._run()
+
+
+class AggregationResult:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class AggregationQuery:
+    def __init__(self, query, alias):
+        self._query = query
+        self._alias = alias
+
+    def get(self, transaction=None):
+        # Billed by index entries, not documents; counted as one round-trip
+        self._query._client._rpc('aggregate')
+        return [[AggregationResult(self._alias, len(self._query._run()))]]
+
+
+class CollectionReference(Query):
+    def __init__(self, client, path):
+        super().__init__(client, path)
+        self.id = path.rsplit('/', 1)[-1]
+
+    def document(self, document_id=None):
+        if document_id is None:
+            document_id = uuid.uuid4().hex[:20]
+        return DocumentReference(self._client, self._collection_path, document_id)
+
+    def list_documents(self, page_size=None):
+        self._client._rpc('list_documents')
+        with self._client._lock:
+            ids = sorted(doc_id for doc_id, _ in self._client._documents(self._collection_path))
+        return [self.document(doc_id) for doc_id in ids]
+
+    def add(self, document_data):
+        ref = self.document()
+        ref.set(document_data)
+        return None, ref
+
+
+class WriteBatch:
+    def __init__(self, client):
+        self._client = client
+        self._writes = []
+
+    def __len__(self):
+        return len(self._writes)
+
+    def set(self, reference, document_data, merge=False):
+        self._writes.append(('set', reference, document_data, merge))
+
+    def update(self, reference, field_updates):
+        self._writes.append(('update', reference, field_updates, False))
+
+    def delete(self, reference):
+        self._writes.append(('delete', reference, None, False))
+
+    def commit(self):
+        if len(self._writes) > MAX_BATCH_SIZE:
+            raise InvalidArgument(f'maximum {MAX_BATCH_SIZE} writes allowed per request')
+        self._client._rpc('commit')
+        self._client._maybe_fail()
+        self._client._apply_writes(self._writes)
+        results = list(self._writes)
+        self._writes = []
+        return results
+
+
+class FakeClient:
+    """Thread-safe in-memory Firestore client.
+
+    ``latency`` is slept on every round-trip; ``fail_commits`` makes that many
+    upcoming batch commits raise ``failure`` before succeeding again.
+    """
+
+    def __init__(self, data=None, latency=0.0):
+        self.latency = latency
+        self.rpc_counts = Counter()
+        self.fail_commits = 0
+        self.failure = Aborted
+        self._lock = threading.RLock()
+        self._store = {}
+        for collection_name, documents in (data or {}).items():
+            self._store[collection_name] = copy.deepcopy(documents)
+
+    def _rpc(self, kind):
+        with self._lock:
+            self.rpc_counts[kind] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def _maybe_fail(self):
+        with self._lock:
+            if self.fail_commits > 0:
+                self.fail_commits -= 1
+                raise self.failure('simulated failure')
+
+    def _apply(self, write):
+        self._apply_writes([write])
+
+    def _apply_writes(self, writes):
+        """Apply a commit's writes all-or-nothing, like a Firestore batch."""
+        with self._lock:
+            touched = {(reference._collection_path, reference.id) for _, reference, _, _ in writes}
+            saved = {key: self._get_document(*key) for key in touched}
+            try:
+                for write in writes:
+                    self._apply_locked(write)
+            except Exception:
+                for (path, doc_id), data in saved.items():
+                    if data is None:
+                        self._delete_document(path, doc_id)
+                    else:
+                        self._put_document(path, doc_id, data)
+                raise
+
+    # Storage primitives; callers hold the lock. Subclasses (local_store.LocalStore)
+    # override these to keep documents somewhere other than dicts.
+
+    def _collection_paths(self):
+        return [path for path, documents in self._store.items() if documents]
+
+    def _documents(self, collection_path, filters=()):
+        """(doc_id, data) pairs of a collection; ``filters`` may be used to narrow them."""
+        return list(self._store.get(collection_path, {}).items())
+
+    def _get_document(self, collection_path, doc_id):
+        return self._store.get(collection_path, {}).get(doc_id)
+
+    def _put_document(self, collection_path, doc_id, data):
+        self._store.setdefault(collection_path, {})[doc_id] = data
+
+    def _delete_document(self, collection_path, doc_id):
+        self._store.get(collection_path, {}).pop(doc_id, None)
+
+    def _apply_locked(self, write):
+        kind, reference, data, merge = write
+        path = reference._collection_path
+        if kind == 'delete':
+            self._delete_document(path, reference.id)
+            return
+        current = self._get_document(path, reference.id)
+        if kind == 'set':
+            resolved = _resolve(data)
+            if merge and current is not None:
+                current = copy.deepcopy(current)
+                current.update(resolved)
+                resolved = current
+            self._put_document(path, reference.id, resolved)
+        elif kind == 'update':
+            if current is None:
+                raise KeyError(f'No document to update: {reference.path}')
+            target = copy.deepcopy(current)
+            for field_path, value in data.items():
+                node = target
+                parts = field_path.split('.')
+                for part in parts[:-1]:
+                    node = node.setdefault(part, {})
+                if value is DELETE_FIELD:
+                    node.pop(parts[-1], None)
+                else:
+                    node[parts[-1]] = _resolve(value)
+            self._put_document(path, reference.id, target)
+
+    def collection(self, collection_path):
+        return CollectionReference(self, collection_path)
+
+    def collections(self):
+        self._rpc('list_collections')
+        with self._lock:
+            names = sorted(path for path in self._collection_paths() if '/' not in path)
+        return [self.collection(name) for name in names]
+
+    def document(self, document_path):
+        collection_path, doc_id = document_path.rsplit('/', 1)
+        return DocumentReference(self, collection_path, doc_id)
+
+    def get_all(self, references, field_paths=None):
+        self._rpc('batch_get')
+        with self._lock:
+            found = [
+                (reference, copy.deepcopy(self._get_document(reference._collection_path, reference.id)))
+                for reference in references
+            ]
+        for reference, data in found:
+            yield DocumentSnapshot(reference, data)
+
+    def batch(self):
+        return WriteBatch(self)
+
+    def dump(self):
+        """Return a deep copy of every top-level collection."""
+        with self._lock:
+            return {
+                name: copy.deepcopy(dict(self._documents(name)))
+                for name in self._collection_paths() if '/' not in name
+            }
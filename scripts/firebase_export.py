@@ -1,13 +1,15 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+from firestore_client import db, firestore
+import argparse
 import json
+import os
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
+from instrumentation import Progress
+from snapshot import SnapshotWriter, decode_document, encode_document, json_default, snapshot_format
 
-# Initialize Firebase Admin
-cred = credentials.Certificate('')  # Updated service account path
-firebase_admin.initialize_app(cred)
-
-db = firestore.client()
+# Streaming export defaults
+PAGE_SIZE = 500
+MAX_WORKERS = 4
 
 def get_all_collections():
     """Get all collections from Firestore."""
@@ -47,5 +49,172 @@ def export_data():
     
     print(f"Export completed. Data saved to {filename}")
 
+def load_cursor(cursor_path):
+    """Load the last checkpoint written for a collection, if any."""
+    if not os.path.exists(cursor_path):
+        return None
+    with open(cursor_path, 'r') as f:
+        return json.load(f)
+
+def save_cursor(cursor_path, cursor):
+    """Atomically persist a collection checkpoint."""
+    tmp_path = cursor_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(cursor, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, cursor_path)
+
+def iter_collection_pages(collection_name, page_size=PAGE_SIZE, start_after_id=None):
+    """Yield a collection one page at a time using document-ID cursors."""
+    query = db.collection(collection_name).order_by(
+        firestore.FieldPath.document_id()
+    ).limit(page_size)
+    cursor = None
+    if start_after_id is not None:
+        cursor = {firestore.FieldPath.document_id(): start_after_id}
+
+    while True:
+        page_query = query.start_after(cursor) if cursor is not None else query
+        page = list(page_query.stream())
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        cursor = page[-1]
+
+def export_collection_stream(collection_name, output_dir, page_size=PAGE_SIZE):
+    """Stream one collection to <output_dir>/<collection>.jsonl, resuming from its cursor."""
+    data_path = os.path.join(output_dir, f'{collection_name}.jsonl')
+    cursor_path = data_path + '.cursor'
+
+    cursor = load_cursor(cursor_path) or {'last_id': None, 'offset': 0, 'count': 0, 'done': False}
+    if cursor['done']:
+        print(f"Skipping completed collection: {collection_name} ({cursor['count']} documents)")
+        return cursor['count']
+    if cursor['last_id'] is not None:
+        print(f"Resuming collection: {collection_name} after {cursor['last_id']}")
+
+    mode = 'r+b' if os.path.exists(data_path) else 'wb'
+    with open(data_path, mode) as f:
+        # Drop anything written after the last checkpoint (a partially written page)
+        f.truncate(cursor['offset'])
+        f.seek(cursor['offset'])
+
+        progress = Progress(collection_name)
+        for page in iter_collection_pages(collection_name, page_size, cursor['last_id']):
+            for doc in page:
+                record = encode_document(doc.id, doc.to_dict())
+                line = json.dumps(record, default=json_default, separators=(',', ':'))
+                f.write(line.encode('utf-8') + b'\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+            cursor['last_id'] = page[-1].id
+            cursor['offset'] = f.tell()
+            cursor['count'] += len(page)
+            save_cursor(cursor_path, cursor)
+            progress.update(len(page))
+
+    cursor['done'] = True
+    save_cursor(cursor_path, cursor)
+    print(f"Exported collection: {collection_name} ({cursor['count']} documents)")
+    return cursor['count']
+
+def export_data_streaming(output_dir=None, max_workers=MAX_WORKERS, page_size=PAGE_SIZE):
+    """Export all collections concurrently, streaming each one to disk page by page.
+
+    Passing the directory of an interrupted export resumes it from the last
+    cursor written for every collection.
+    """
+    if output_dir is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        output_dir = f'firebase_export_{timestamp}'
+    os.makedirs(output_dir, exist_ok=True)
+
+    collections = get_all_collections()
+    counts = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(export_collection_stream, collection, output_dir, page_size): collection
+            for collection in collections
+        }
+        for future in as_completed(futures):
+            counts[futures[future]] = future.result()
+
+    manifest = {
+        'exported_at': datetime.now().isoformat(),
+        'collections': {name: counts[name] for name in sorted(counts)}
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    print(f"Export completed. Data saved to {output_dir}/")
+    return output_dir
+
+def iter_part_file(data_path):
+    """Yield (doc_id, data) from a collection file written by export_collection_stream."""
+    with open(data_path, 'rb') as f:
+        for line in f:
+            yield decode_document(json.loads(line))
+
+def pack_snapshot(output_dir, filename):
+    """Pack a finished streaming export directory into a single snapshot file."""
+    with open(os.path.join(output_dir, 'manifest.json'), 'r') as f:
+        manifest = json.load(f)
+
+    with SnapshotWriter(filename) as writer:
+        for collection in manifest['collections']:
+            data_path = os.path.join(output_dir, f'{collection}.jsonl')
+            writer.write_collection(collection, iter_part_file(data_path))
+
+    print(f"Snapshot written to {filename}")
+    return filename
+
+def export_snapshot(filename=None, page_size=PAGE_SIZE):
+    """Export all collections straight into a .ndjson or .fsnap snapshot."""
+    if filename is None:
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        filename = f'firebase_export_{timestamp}.ndjson'
+
+    with SnapshotWriter(filename) as writer:
+        for collection in get_all_collections():
+            print(f"Exporting collection: {collection}")
+            writer.begin_collection(collection)
+            progress = Progress(collection)
+            for page in iter_collection_pages(collection, page_size):
+                for doc in page:
+                    writer.write(doc.id, doc.to_dict())
+                progress.update(len(page))
+
+    print(f"Export completed. Data saved to {filename}")
+    return filename
+
 if __name__ == "__main__":
-    export_data()
+    parser = argparse.ArgumentParser(description='Export Firestore collections.')
+    parser.add_argument('--stream', action='store_true',
+                        help='paginated, concurrent export streamed to a directory of JSON Lines files')
+    parser.add_argument('--output-dir', help='export directory; pass an existing one to resume')
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+    parser.add_argument('--snapshot', metavar='FILE',
+                        help='write a .ndjson or .fsnap (compressed binary) snapshot')
+    parser.add_argument('--incremental', metavar='DIR',
+                        help='back up only what changed since the last run into DIR (see incremental_export.py)')
+    args = parser.parse_args()
+
+    if args.snapshot and snapshot_format(args.snapshot) == 'json':
+        parser.error('--snapshot must end in .ndjson or .fsnap')
+
+    if args.incremental:
+        from incremental_export import export_incremental
+        export_incremental(args.incremental, args.page_size)
+    elif args.stream or args.output_dir:
+        output_dir = export_data_streaming(args.output_dir, args.workers, args.page_size)
+        if args.snapshot:
+            pack_snapshot(output_dir, args.snapshot)
+    elif args.snapshot:
+        export_snapshot(args.snapshot, args.page_size)
+    else:
+        export_data()
@@ -1,45 +1,52 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import json
-from datetime import datetime
+from firestore_client import db
+import argparse
+from bulk_writer import BulkWriter, MAX_BATCH_SIZE, MAX_WORKERS
+from instrumentation import Progress
+from snapshot import SnapshotReader
 
-# Initialize Firebase Admin, You'll need to update this
-cred = credentials.Certificate('')
-firebase_admin.initialize_app(cred)
+def import_data(filename, batch_size=MAX_BATCH_SIZE, max_workers=MAX_WORKERS, client=None):
+    """Import data from a JSON export or .ndjson/.fsnap snapshot to Firestore.
 
-db = firestore.client()
-
-def import_data(filename):
-    """Import data from JSON file to Firestore."""
+    Writes are committed in parallel batches; pass ``client`` to import into
+    something other than the module's Firestore client (e.g. a FakeClient).
+    """
+    client = client or db
     try:
-        with open(filename, 'r') as f:
-            data = json.load(f)
+        reader = SnapshotReader(filename)
+        writer = BulkWriter(client, batch_size=batch_size, max_workers=max_workers)
         
         # Iterate through each collection
-        for collection_name, collection_data in data.items():
-            print(f"Importing collection: {collection_name}")
-            collection_ref = db.collection(collection_name)
-            
-            # Iterate through each document in the collection
-            for doc_id, doc_data in collection_data.items():
-                print(f"Importing document: {doc_id}")
-                
-                # Convert ISO format strings back to datetime if needed
-                for key, value in doc_data.items():
-                    if isinstance(value, str) and 'T' in value:
-                        try:
-                            doc_data[key] = datetime.fromisoformat(value)
-                        except ValueError:
-                            pass  # Not a valid datetime string, leave as is
+        with writer:
+            for collection_name in reader.collections():
+                print(f"Importing collection: {collection_name}")
+                collection_ref = client.collection(collection_name)
+                progress = Progress(collection_name, total=reader.index[collection_name].get('count'))
                 
-                # Set the document with merge=True to avoid overwriting existing data
-                collection_ref.document(doc_id).set(doc_data, merge=True)
+                # Iterate through each document in the collection
+                # Snapshots restore their recorded timestamps; legacy exports
+                # only get the schema's timestamp fields parsed
+                for doc_id, doc_data in reader.iter_documents(collection_name):
+                    # Set the document with merge=True to avoid overwriting existing data
+                    writer.set(collection_ref.document(doc_id), doc_data, merge=True)
+                    progress.update()
+                progress.done()
         
-        print("Import completed successfully!")
+        print(writer.stats.report())
+        if writer.stats.failed_writes:
+            print("Import finished with errors!")
+        else:
+            print("Import completed successfully!")
+        return writer.stats
         
     except Exception as e:
         print(f"Error during import: {str(e)}")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Import an export or snapshot into Firestore.')
     # You can specify the export file to import
-    import_data("firebase_export_20241209_150215.json")
+    parser.add_argument('filename', nargs='?', default='firebase_export_20241209_150215.json')
+    parser.add_argument('--batch-size', type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    import_data(args.filename, args.batch_size, args.workers)
@@ -1,57 +1,76 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
-import json
-from datetime import datetime
+from firestore_client import db
+import argparse
+from bulk_writer import MAX_BATCH_SIZE
+from content_hash import document_digest
+from snapshot import iter_collection
+from write_plan import WritePlan, execute_plan
 
-# Initialize Firebase Admin
-cred = credentials.Certificate('/Users/mayanksingh/Downloads/bymayanksingh-firebase-adminsdk-jmdt5-aa2d3280d4.json')
-firebase_admin.initialize_app(cred)
+def plan_import(filename, client, replace=False):
+    """Write plan making the projects collection match the export.
+    
+    Every project in the export is set and every other live project deleted;
+    with ``replace`` projects whose content is already identical are skipped.
+    """
+    live = {doc.id: doc.to_dict() for doc in client.collection('projects').stream()}
+    print(f"Found {len(live)} existing projects")
+    
+    plan = WritePlan('replace_projects' if replace else 'delete_and_import_projects')
+    seen = set()
+    # Stream only the projects collection from the export/snapshot
+    for doc_id, project in iter_collection(filename, 'projects'):
+        seen.add(doc_id)
+        before = live.get(doc_id)
+        if replace and before is not None and document_digest(before) == document_digest(project):
+            continue
+        plan.set('projects', doc_id, project, before=before)
+    
+    for doc_id, before in live.items():
+        if doc_id not in seen:
+            plan.delete('projects', doc_id, before=before)
+    return plan, len(seen)
 
-db = firestore.client()
-
-def delete_and_import_projects(filename):
-    """Delete all existing projects and import new data from JSON file to Firestore."""
+def run_import(filename, replace=False, batch_size=MAX_BATCH_SIZE, client=None, dry_run=False, plan_path=None):
+    """Plan the import, then execute it unless ``dry_run``.
+    
+    New and changed projects are written before removed ones are deleted, so
+    the collection is never empty.
+    """
+    client = client or db
     try:
-        # First, delete all existing projects
-        projects_ref = db.collection('projects')
-        docs = projects_ref.stream()
-        deleted_count = 0
-        
-        print("Deleting existing projects...")
-        for doc in docs:
-            doc.reference.delete()
-            deleted_count += 1
-        print(f"Deleted {deleted_count} existing projects")
-
-        # Now import new projects
-        print(f"\nImporting new projects from {filename}")
-        with open(filename, 'r') as f:
-            data = json.load(f)
-        
-        # Get the projects dictionary from the JSON
-        projects_data = data.get('projects', {})
-        
-        imported_count = 0
-        for doc_id, project in projects_data.items():
-            # Convert any ISO format strings to datetime if needed
-            for key, value in project.items():
-                if isinstance(value, str) and 'T' in value:
-                    try:
-                        project[key] = datetime.fromisoformat(value)
-                    except ValueError:
-                        pass  # Not a valid datetime string, leave as is
-            
-            # Add the project to Firestore with the same document ID
-            doc_ref = projects_ref.document(doc_id)
-            doc_ref.set(project)
-            imported_count += 1
-            print(f"Imported project: {project.get('title', 'Untitled')} (ID: {doc_id})")
-        
-        print(f"\nImport completed successfully!")
-        print(f"Summary: Deleted {deleted_count} old projects, imported {imported_count} new projects")
+        plan, imported_count = plan_import(filename, client, replace)
+        print(plan.report(show_diffs=dry_run))
+        if plan_path:
+            plan.save(plan_path)
+            print(f"Plan saved to {plan_path}")
+        if dry_run:
+            return plan
         
+        stats = execute_plan(plan, client, batch_size=batch_size)
+        print(stats.report())
+        counts = plan.counts()
+        print(f"Summary: wrote {counts['set'] - stats.failed_writes} projects, "
+              f"deleted {counts['delete'] - len(stats.skipped)}, "
+              f"left {imported_count - counts['set']} unchanged")
+        return stats
+    
     except Exception as e:
         print(f"Error during operation: {str(e)}")
 
+def delete_and_import_projects(filename, **kwargs):
+    """Replace all existing projects with the ones in a JSON export or snapshot."""
+    return run_import(filename, replace=False, **kwargs)
+
+def replace_projects(filename, batch_size=MAX_BATCH_SIZE, client=None, **kwargs):
+    """Make the projects collection match the snapshot with the fewest writes."""
+    return run_import(filename, replace=True, batch_size=batch_size, client=client, **kwargs)
+
 if __name__ == "__main__":
-    delete_and_import_projects("firebase_export_20241209_150215.json")
+    parser = argparse.ArgumentParser(description='Replace the projects collection from an export.')
+    parser.add_argument('filename', nargs='?', default='firebase_export_20241209_150215.json')
+    parser.add_argument('--replace', action='store_true',
+                        help='diff against the live collection and only write what changed')
+    parser.add_argument('--dry-run', action='store_true', help='print the write plan without executing it')
+    parser.add_argument('--plan', metavar='FILE', help='save the write plan as JSON')
+    args = parser.parse_args()
+
+    run_import(args.filename, replace=args.replace, dry_run=args.dry_run, plan_path=args.plan)
@@ -0,0 +1,137 @@
+"""Shared, lazily created Firestore client for the scripts.
+
+Importing this module is cheap: firebase_admin (and grpc behind it) is only
+imported the first time ``db`` is actually used, and the resulting client,
+with its channel, is reused for the rest of the process. Helpers that never
+touch the database therefore don't pay for the SDK.
+
+The client is picked from the environment on first use:
+
+- FIRESTORE_FAKE: an in-process ``fake_firestore.FakeClient``; if the value
+  is a snapshot/export path the fake is seeded from it.
+- FIRESTORE_MIRROR: the local SQLite mirror at that path (see local_store.py);
+  writes stay local until pushed.
+- FIRESTORE_EMULATOR_HOST: the Firestore emulator, no credentials needed
+  (project from FIREBASE_PROJECT_ID).
+- otherwise firebase_admin with the service account at
+  FIREBASE_ADMIN_SDK_PATH, or application default credentials.
+
+Unless FIRESTORE_METRICS is ``0`` the client is wrapped by
+``instrumentation.InstrumentedClient``, which times and counts every call
+and writes a JSON summary at exit (see instrumentation.py).
+
+``set_db()`` swaps in any client explicitly, e.g. for benchmarks.
+"""
+import os
+import threading
+
+from instrumentation import InstrumentedClient, enable_summary, instrumentation_enabled
+
+DEFAULT_PROJECT_ID = 'bymayanksingh'
+
+_lock = threading.Lock()
+_db = None
+_firestore_module = None
+
+
+def _load_env():
+    try:
+        from dotenv import load_dotenv
+    except ImportError:
+        return
+    load_dotenv()
+
+
+def _fake_client(source):
+    import fake_firestore
+    from snapshot import SnapshotReader
+
+    data = {}
+    if source and source != '1':
+        reader = SnapshotReader(source)
+        for name in reader.collections():
+            data[name] = dict(reader.iter_documents(name))
+    return fake_firestore.FakeClient(data), fake_firestore
+
+
+def _mirror_client(path):
+    import fake_firestore
+    from local_store import LocalStore
+
+    return LocalStore(path), fake_firestore
+
+
+def _emulator_client():
+    from google.auth.credentials import AnonymousCredentials
+    from google.cloud import firestore
+
+    project = os.getenv('FIREBASE_PROJECT_ID', DEFAULT_PROJECT_ID)
+    return firestore.Client(project=project, credentials=AnonymousCredentials()), firestore
+
+
+def _admin_client():
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+
+    if not firebase_admin._apps:
+        cert_path = os.getenv('FIREBASE_ADMIN_SDK_PATH')
+        cred = credentials.Certificate(cert_path) if cert_path else None
+        firebase_admin.initialize_app(cred)
+    return firestore.client(), firestore
+
+
+def get_db():
+    """Return the process-wide Firestore client, creating it on first call."""
+    global _db, _firestore_module
+    if _db is None:
+        with _lock:
+            if _db is None:
+                _load_env()
+                if os.getenv('FIRESTORE_FAKE') is not None:
+                    client, module = _fake_client(os.getenv('FIRESTORE_FAKE'))
+                elif os.getenv('FIRESTORE_MIRROR'):
+                    client, module = _mirror_client(os.getenv('FIRESTORE_MIRROR'))
+                elif os.getenv('FIRESTORE_EMULATOR_HOST'):
+                    client, module = _emulator_client()
+                else:
+                    client, module = _admin_client()
+                if instrumentation_enabled():
+                    client = InstrumentedClient(client)
+                    enable_summary()
+                _firestore_module = module
+                _db = client
+    return _db
+
+
+def get_firestore_module():
+    """The module providing SERVER_TIMESTAMP, FieldPath etc. for the active client."""
+    get_db()
+    return _firestore_module
+
+
+def set_db(client, module=None):
+    """Use ``client`` for the rest of the process (None resets to lazy creation)."""
+    global _db, _firestore_module
+    with _lock:
+        if module is None and client is not None:
+            if type(client).__module__ in ('fake_firestore', 'local_store'):
+                import fake_firestore as module
+            else:
+                from firebase_admin import firestore as module
+        _db = client
+        _firestore_module = module
+
+
+class _LazyProxy:
+    """Forward attribute access to an object created on first use."""
+
+    def __init__(self, loader):
+        self._loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self._loader(), name)
+
+
+# Drop-in replacements for the module-level `db` / `firestore` names the scripts use
+db = _LazyProxy(get_db)
+firestore = _LazyProxy(get_firestore_module)
@@ -0,0 +1,466 @@
+"""Responsive image variants and blurhash placeholders for project images.
+
+    python image_pipeline.py [--output-dir ../public/images] [--base-url /images]
+                             [--refresh] [--dry-run] [--plan FILE]
+
+Every ``coverImage`` and ``gallery`` entry of the projects is run through
+three steps:
+
+1. Each distinct URL is fetched once, concurrently over one pooled aiohttp
+   session, into a content-addressed cache: ``image_cache/originals`` holds
+   the bytes under their SHA-256 and ``image_cache/urls.json`` remembers
+   which hash each URL gave. Known URLs aren't fetched again unless
+   ``--refresh`` is given. Responses that aren't ``image/*`` are rejected.
+2. Each distinct original is resized to RESPONSIVE_WIDTHS (never wider than
+   the original) as WebP and, if Pillow was built with AVIF support, AVIF,
+   in a process pool. The files go to ``OUTPUT_DIR/<hash>/<width>.<ext>``
+   (OUTPUT_DIR defaults to ../public/images, which the Vite build copies
+   into dist/) next to a ``meta.json``. An image whose meta.json was written
+   with the current settings is not processed again.
+3. The entry gets the original's ``width``, ``height``, ``blurhash`` and
+   ``hash`` and its ``variants`` (url, width and type each), with the URLs
+   prefixed by ``--base-url`` (or IMAGE_BASE_URL). The original ``url``
+   and any other keys (credit, caption) are kept.
+
+Unchanged images therefore cost no download, no processing and no write.
+With ``--dry-run`` nothing is downloaded, processed or written: entries are
+described from the images already in the cache and OUTPUT_DIR, and the
+URLs that would be fetched and the images that would be processed are
+reported instead.
+To try it without network access, point the projects at images served by
+unsplash_standin.py, which generates them.
+"""
+import argparse
+import asyncio
+import copy
+import hashlib
+import json
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_CACHE_DIR = 'image_cache'
+DEFAULT_OUTPUT_DIR = os.path.join('..', 'public', 'images')
+DEFAULT_BASE_URL = '/images'
+URLS_FILE = 'urls.json'
+IMAGE_FIELDS = ('coverImage', 'gallery')
+META_FILE = 'meta.json'
+RESPONSIVE_WIDTHS = (320, 640, 960, 1280, 1920)
+QUALITY = {'webp': 80, 'avif': 60}
+CONTENT_TYPES = {'webp': 'image/webp', 'avif': 'image/avif'}
+# Hex digits of the SHA-256 used in public file names
+NAME_LENGTH = 16
+MAX_CONNECTIONS = 8
+REQUEST_TIMEOUT = 30.0
+MAX_IMAGE_BYTES = 25 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+BLURHASH_COMPONENTS = (4, 3)
+BLURHASH_SIZE = 32
+BASE83 = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+
+
+def available_formats():
+    """Output formats this Pillow can write: WebP, plus AVIF when it has the codec."""
+    from PIL import features
+
+    return ('webp', 'avif') if features.check('avif') else ('webp',)
+
+
+def pipeline_settings(widths=RESPONSIVE_WIDTHS, formats=None):
+    """Everything that determines the variants; images made with other settings are redone."""
+    formats = tuple(formats or available_formats())
+    return {'widths': list(widths), 'formats': list(formats),
+            'quality': {fmt: QUALITY[fmt] for fmt in formats}}
+
+
+# BlurHash (https://github.com/woltapp/blurhash), encoded from a small thumbnail
+
+def _base83(value, length):
+    return ''.join(BASE83[value // 83 ** (length - i - 1) % 83] for i in range(length))
+
+
+def _srgb_to_linear(value):
+    value /= 255
+    return value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value):
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def blurhash(image, components=BLURHASH_COMPONENTS):
+    """BlurHash string of a Pillow image."""
+    x_components, y_components = components
+    thumbnail = image.convert('RGB')
+    thumbnail.thumbnail((BLURHASH_SIZE, BLURHASH_SIZE))
+    width, height = thumbnail.size
+    to_linear = [_srgb_to_linear(value) for value in range(256)]
+    pixels = [[to_linear[channel] for channel in pixel] for pixel in thumbnail.getdata()]
+
+    factors = []
+    for j in range(y_components):
+        basis_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            basis_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            r = g = b = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = basis_x[x] * basis_y[y]
+                    pixel = pixels[row + x]
+                    r += basis * pixel[0]
+                    g += basis * pixel[1]
+                    b += basis * pixel[2]
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            factors.append((r * scale, g * scale, b * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _base83(x_components - 1 + (y_components - 1) * 9, 1)
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, int(math.floor(actual_max * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+        result += _base83(quantised_max, 1)
+    else:
+        maximum = 1.0
+        result += _base83(0, 1)
+    result += _base83((_linear_to_srgb(dc[0]) << 16) + (_linear_to_srgb(dc[1]) << 8) + _linear_to_srgb(dc[2]), 4)
+    for factor in ac:
+        r, g, b = (max(0, min(18, int(math.floor(_sign_pow(value / maximum, 0.5) * 9 + 9.5)))) for value in factor)
+        result += _base83(r * 19 * 19 + g * 19 + b, 2)
+    return result
+
+
+def process_image(original_path, output_dir, settings):
+    """Write the variants and meta.json of one original; returns the meta.
+
+    Runs in a worker process, so it only takes and returns plain values.
+    """
+    from PIL import Image, ImageOps
+
+    with Image.open(original_path) as image:
+        # Phone photos are often stored sideways with an EXIF rotation
+        image = ImageOps.exif_transpose(image)
+        width, height = image.size
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or 'A' in image.mode else 'RGB')
+        os.makedirs(output_dir, exist_ok=True)
+        variants = []
+        for target in sorted({min(w, width) for w in settings['widths']}):
+            resized = image if target == width else image.resize(
+                (target, max(1, round(height * target / width))), Image.LANCZOS)
+            for fmt in settings['formats']:
+                name = f"{target}.{fmt}"
+                tmp_path = os.path.join(output_dir, name + '.tmp')
+                resized.save(tmp_path, fmt.upper(), quality=settings['quality'][fmt])
+                os.replace(tmp_path, os.path.join(output_dir, name))
+                variants.append({'file': name, 'width': target, 'height': resized.size[1],
+                                 'type': CONTENT_TYPES[fmt]})
+        meta = {'width': width, 'height': height, 'blurhash': blurhash(image),
+                'variants': variants, 'settings': settings}
+
+    produced = {variant['file'] for variant in variants} | {META_FILE}
+    for name in os.listdir(output_dir):
+        if name not in produced:
+            os.remove(os.path.join(output_dir, name))
+    # Written last: a directory without meta.json is processed again
+    tmp_path = os.path.join(output_dir, META_FILE + '.tmp')
+    with open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp_path, os.path.join(output_dir, META_FILE))
+    return meta
+
+
+def image_entries(project):
+    """(container, key) of every coverImage and gallery entry, so entries can be replaced."""
+    if project.get('coverImage'):
+        yield project, 'coverImage'
+    gallery = project.get('gallery')
+    if isinstance(gallery, list):
+        for index, entry in enumerate(gallery):
+            if entry:
+                yield gallery, index
+
+
+def entry_url(entry):
+    if isinstance(entry, dict):
+        url = entry.get('url')
+    else:
+        url = entry
+    return url if isinstance(url, str) and url.startswith(('http://', 'https://')) else None
+
+
+class OriginalCache:
+    """Downloaded originals by SHA-256, and the hash each URL gave when it was fetched."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        self.urls_path = os.path.join(cache_dir, URLS_FILE)
+        self.urls = {}
+        if os.path.exists(self.urls_path):
+            with open(self.urls_path, 'r') as f:
+                self.urls = json.load(f)
+
+    def path(self, digest):
+        return os.path.join(self.cache_dir, 'originals', digest[:2], digest)
+
+    def lookup(self, url):
+        entry = self.urls.get(url)
+        return entry['hash'] if entry else None
+
+    def store(self, url, tmp_path, digest, content_type):
+        path = self.path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(tmp_path, path)
+        self.urls[url] = {'hash': digest, 'type': content_type, 'fetched_at': time.time()}
+
+    def save(self):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = self.urls_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.urls, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.urls_path)
+
+
+class ImagePipeline:
+    """Fetch, resize and describe every image the given projects reference."""
+
+    def __init__(self, cache=None, output_dir=DEFAULT_OUTPUT_DIR, base_url=None, widths=RESPONSIVE_WIDTHS,
+                 formats=None, refresh=False, max_connections=MAX_CONNECTIONS, timeout=REQUEST_TIMEOUT,
+                 max_workers=None, dry_run=False):
+        self.cache = cache if cache is not None else OriginalCache()
+        self.output_dir = output_dir
+        self.base_url = (base_url or os.getenv('IMAGE_BASE_URL', DEFAULT_BASE_URL)).rstrip('/')
+        self.settings = pipeline_settings(widths, formats)
+        self.refresh = refresh
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_workers = max_workers
+        self.dry_run = dry_run
+        self.stats = {'urls': 0, 'cached': 0, 'fetched': 0, 'failed': 0,
+                      'processed': 0, 'unchanged': 0, 'entries_updated': 0}
+        # With dry_run, the URLs that would be downloaded and processed
+        self.would_fetch = []
+        self.would_process = []
+
+    def _meta_path(self, digest):
+        return os.path.join(self.output_dir, digest[:NAME_LENGTH], META_FILE)
+
+    def current_meta(self, digest):
+        """meta.json of an image if it was made with the current settings."""
+        path = self._meta_path(digest)
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            meta = json.load(f)
+        return meta if meta.get('settings') == self.settings else None
+
+    async def _download(self, session, url):
+        """SHA-256 of the image at ``url``, streamed into the cache; None if it can't be had."""
+        os.makedirs(self.cache.cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache.cache_dir, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                async with session.get(url) as response:
+                    content_type = response.headers.get('Content-Type', '').split(';')[0].strip()
+                    if response.status != 200:
+                        print(f"Image download returned {response.status} for {url}")
+                        return None
+                    if not content_type.startswith('image/'):
+                        print(f"Not an image ({content_type or 'no content type'}): {url}")
+                        return None
+                    digest = hashlib.sha256()
+                    size = 0
+                    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        if size > MAX_IMAGE_BYTES:
+                            print(f"Image larger than {MAX_IMAGE_BYTES} bytes: {url}")
+                            return None
+                        digest.update(chunk)
+                        f.write(chunk)
+            digest = digest.hexdigest()
+            self.cache.store(url, tmp_path, digest, content_type)
+            return digest
+        except Exception as e:
+            print(f"Error downloading image {url}: {e}")
+            return None
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    async def _resolve(self, session, pool, url, tasks):
+        """(url, meta) once the URL's image is downloaded, if needed, and processed, if needed."""
+        self.stats['urls'] += 1
+        digest = None if self.refresh else self.cache.lookup(url)
+        if digest and (self.current_meta(digest) or os.path.exists(self.cache.path(digest))):
+            self.stats['cached'] += 1
+        else:
+            digest = await self._download(session, url)
+            if digest is None:
+                self.stats['failed'] += 1
+                return url, None
+            self.stats['fetched'] += 1
+
+        meta = self.current_meta(digest)
+        if meta is not None:
+            self.stats['unchanged'] += 1
+        else:
+            # URLs giving the same bytes share one processing job
+            started = digest not in tasks
+            if started:
+                output_dir = os.path.dirname(self._meta_path(digest))
+                tasks[digest] = asyncio.get_running_loop().run_in_executor(
+                    pool, process_image, self.cache.path(digest), output_dir, self.settings)
+            try:
+                meta = await tasks[digest]
+            except Exception as e:
+                print(f"Error processing image {url}: {e}")
+                self.stats['failed'] += 1
+                return url, None
+            # Counted once per image, not per URL
+            self.stats['processed'] += started
+        return url, dict(meta, hash=digest[:NAME_LENGTH])
+
+    def resolve_cached(self, urls):
+        """{url: meta} from the cache and OUTPUT_DIR only, noting what a real run would do."""
+        metas = {}
+        for url in dict.fromkeys(urls):
+            self.stats['urls'] += 1
+            digest = None if self.refresh else self.cache.lookup(url)
+            meta = self.current_meta(digest) if digest else None
+            if meta is not None:
+                self.stats['cached'] += 1
+                self.stats['unchanged'] += 1
+                metas[url] = dict(meta, hash=digest[:NAME_LENGTH])
+            elif digest and os.path.exists(self.cache.path(digest)):
+                self.stats['cached'] += 1
+                self.would_process.append(url)
+            else:
+                self.would_fetch.append(url)
+        return metas
+
+    async def resolve_many(self, urls):
+        """{url: meta} for each distinct URL whose image could be fetched and processed."""
+        import aiohttp
+
+        connector = aiohttp.TCPConnector(limit=self.max_connections)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        tasks = {}
+        with ProcessPoolExecutor(self.max_workers) as pool:
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+                results = await asyncio.gather(*(self._resolve(session, pool, url, tasks)
+                                                 for url in dict.fromkeys(urls)))
+        self.cache.save()
+        return {url: meta for url, meta in results if meta is not None}
+
+    def described_entry(self, entry, meta):
+        """The entry with the image's dimensions, placeholder and variant URLs added."""
+        described = dict(entry) if isinstance(entry, dict) else {'url': entry}
+        described.update({
+            'width': meta['width'],
+            'height': meta['height'],
+            'blurhash': meta['blurhash'],
+            'hash': meta['hash'],
+            'variants': [
+                {'url': f"{self.base_url}/{meta['hash']}/{variant['file']}",
+                 'width': variant['width'], 'type': variant['type']}
+                for variant in meta['variants']
+            ],
+        })
+        return described
+
+    def process_projects(self, projects):
+        """Describe every image entry of the projects, in place; returns the projects."""
+        entries = [(container, key) for project in projects for container, key in image_entries(project)]
+        urls = [entry_url(container[key]) for container, key in entries]
+        if self.dry_run:
+            metas = self.resolve_cached(url for url in urls if url)
+        else:
+            metas = asyncio.run(self.resolve_many(url for url in urls if url)) if any(urls) else {}
+        for (container, key), url in zip(entries, urls):
+            if url in metas:
+                described = self.described_entry(container[key], metas[url])
+                if described != container[key]:
+                    container[key] = described
+                    self.stats['entries_updated'] += 1
+        return projects
+
+    def report(self):
+        s = self.stats
+        if self.dry_run:
+            lines = [f"Image pipeline (dry run): {s['urls']} distinct URLs, {s['unchanged']} unchanged, "
+                     f"{len(self.would_fetch)} would be fetched, {len(self.would_process)} more would be "
+                     f"processed; {s['entries_updated']} entries would be updated"]
+            lines += [f"  fetch: {url}" for url in self.would_fetch]
+            lines += [f"  process: {url}" for url in self.would_process]
+            return '\n'.join(lines)
+        return (f"Image pipeline: {s['urls']} distinct URLs, {s['cached']} cached, {s['fetched']} fetched, "
+                f"{s['failed']} failed; {s['processed']} processed, {s['unchanged']} unchanged; "
+                f"{s['entries_updated']} entries updated")
+
+
+def process_project_images(projects, **kwargs):
+    """Run the pipeline over a list of projects in place and print its report."""
+    pipeline = ImagePipeline(**kwargs)
+    pipeline.process_projects(projects)
+    print(pipeline.report())
+    return pipeline
+
+
+def plan_image_updates(projects, **kwargs):
+    """Write plan updating the image fields of the projects whose entries changed."""
+    from write_plan import WritePlan
+
+    originals = {
+        project['id']: {key: copy.deepcopy(project[key]) for key in IMAGE_FIELDS if key in project}
+        for project in projects
+    }
+    process_project_images(projects, **kwargs)
+
+    plan = WritePlan('image_pipeline')
+    for project in projects:
+        fields = {key: project[key] for key in IMAGE_FIELDS if key in project}
+        if fields != originals[project['id']]:
+            plan.update('projects', project['id'], fields, before=originals[project['id']])
+    return plan
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Generate responsive image variants for project images.')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR, help='where the variants are written')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR, help='where downloaded originals are kept')
+    parser.add_argument('--base-url', help=f"URL prefix of the variants (default IMAGE_BASE_URL or {DEFAULT_BASE_URL})")
+    parser.add_argument('--refresh', action='store_true', help='download every URL again')
+    parser.add_argument('--workers', type=int, help='image processing processes (default: one per CPU)')
+    parser.add_argument('--dry-run', action='store_true', help='report the writes without making them')
+    parser.add_argument('--plan', metavar='FILE', help='save the write plan as JSON')
+    args = parser.parse_args()
+
+    from firestore_client import db
+    from write_plan import execute_plan
+
+    projects = []
+    for doc in db.collection('projects').select(list(IMAGE_FIELDS)).stream():
+        project = doc.to_dict()
+        project['id'] = doc.id
+        projects.append(project)
+    print(f"Read {len(projects)} projects")
+
+    plan = plan_image_updates(projects, cache=OriginalCache(args.cache_dir), output_dir=args.output_dir,
+                              base_url=args.base_url, refresh=args.refresh, max_workers=args.workers,
+                              dry_run=args.dry_run)
+    print(plan.report(show_diffs=args.dry_run))
+    if args.plan:
+        plan.save(args.plan)
+        print(f"Plan saved to {args.plan}")
+    if not args.dry_run and plan:
+        print(execute_plan(plan, db).report())
@@ -0,0 +1,228 @@
+"""Async, cached and rate-limited cover image lookups against the Unsplash API.
+
+Projects needing a cover image mostly share a handful of category query
+strings, so lookups are resolved per distinct query rather than per
+project: cached queries are answered from a local JSON file (entries
+expire after ``CACHE_TTL`` seconds), and the remaining ones are fetched
+concurrently over one pooled aiohttp session. A token bucket, persisted in
+the cache file so it carries over between runs, keeps the requests inside
+the API's hourly quota; queries it can't afford get the fallback image and
+are tried again on the next run.
+
+With ``dry_run`` only the cache is consulted: nothing is requested or
+saved, and uncached queries get a would_resolve() placeholder instead.
+
+UNSPLASH_ACCESS_KEY supplies the API key and UNSPLASH_API_URL can point the
+resolver at a local stand-in server.
+"""
+import asyncio
+import json
+import os
+import time
+
+DEFAULT_CACHE = 'unsplash_cache.json'
+DEFAULT_API_URL = 'https://api.unsplash.com'
+CACHE_TTL = 7 * 24 * 3600
+# The public API allows 50 requests per hour
+RATE_LIMIT = 50
+RATE_PERIOD = 3600.0
+MAX_CONNECTIONS = 8
+REQUEST_TIMEOUT = 10.0
+# How long a lookup may wait for a rate limit token before falling back
+MAX_TOKEN_WAIT = 5.0
+
+
+def fallback_image(query):
+    """Image used when the API can't be asked or doesn't answer"""
+    return {
+        'url': f"https://source.unsplash.com/random/800x600/?{query}",
+        'credit': {
+            'name': 'Unsplash',
+            'link': 'https://unsplash.com'
+        }
+    }
+
+
+def would_resolve(query):
+    """Placeholder a dry run uses for a query it would look up"""
+    return {'url': None, 'would_resolve': query}
+
+
+def parse_photo(data):
+    """Cover image dict from an Unsplash /photos/random response"""
+    return {
+        'url': data['urls']['regular'],
+        'credit': {
+            'name': data['user']['name'],
+            'link': data['user']['links']['html']
+        }
+    }
+
+
+class TokenBucket:
+    """Token bucket holding up to ``capacity`` tokens, refilled at ``rate`` per second."""
+
+    def __init__(self, capacity=RATE_LIMIT, rate=RATE_LIMIT / RATE_PERIOD, tokens=None, updated=None):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity if tokens is None else tokens
+        # Wall clock, so the state can be saved and restored across runs
+        self.updated = time.time() if updated is None else updated
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.time()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self):
+        self._refill()
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    async def acquire(self, max_wait=MAX_TOKEN_WAIT):
+        """Take a token, waiting up to ``max_wait`` seconds; False if none came."""
+        async with self._lock:
+            self._refill()
+            wait = (1 - self.tokens) / self.rate if self.tokens < 1 else 0.0
+            if wait > max_wait:
+                return False
+            if wait:
+                await asyncio.sleep(wait)
+            return self.try_acquire()
+
+    def limit_remaining(self, remaining):
+        """Trust the server's count of remaining requests when it is lower."""
+        self._refill()
+        self.tokens = min(self.tokens, remaining)
+
+    def state(self):
+        self._refill()
+        return {'tokens': self.tokens, 'updated': self.updated}
+
+
+class ImageCache:
+    """Query -> image results with fetch times, plus the saved rate limit state."""
+
+    def __init__(self, path=DEFAULT_CACHE, ttl=CACHE_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.entries = {}
+        self.rate_limit = None
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                saved = json.load(f)
+            self.entries = saved.get('queries', {})
+            self.rate_limit = saved.get('rate_limit')
+
+    def get(self, query):
+        entry = self.entries.get(query)
+        if entry and time.time() - entry['fetched_at'] < self.ttl:
+            return entry['image']
+        return None
+
+    def put(self, query, image):
+        self.entries[query] = {'image': image, 'fetched_at': time.time()}
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'queries': self.entries, 'rate_limit': self.rate_limit}, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
+class ImageResolver:
+    """Resolve cover images for many queries with one session and one API call per query."""
+
+    def __init__(self, cache=None, bucket=None, api_url=None, access_key=None,
+                 max_connections=MAX_CONNECTIONS, timeout=REQUEST_TIMEOUT, max_token_wait=MAX_TOKEN_WAIT,
+                 dry_run=False):
+        self.cache = cache if cache is not None else ImageCache()
+        if bucket is None:
+            bucket = TokenBucket(**(self.cache.rate_limit or {}))
+        self.bucket = bucket
+        self.api_url = (api_url or os.getenv('UNSPLASH_API_URL', DEFAULT_API_URL)).rstrip('/')
+        self.access_key = access_key or os.getenv('UNSPLASH_ACCESS_KEY', 'YOUR_UNSPLASH_ACCESS_KEY')
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.max_token_wait = max_token_wait
+        self.dry_run = dry_run
+        self.stats = {'queries': 0, 'cached': 0, 'fetched': 0, 'rate_limited': 0, 'failed': 0,
+                      'would_resolve': 0}
+
+    async def _fetch(self, session, query):
+        if not await self.bucket.acquire(self.max_token_wait):
+            self.stats['rate_limited'] += 1
+            return None
+        try:
+            async with session.get(f"{self.api_url}/photos/random",
+                                   params={'query': query, 'orientation': 'landscape'}) as response:
+                remaining = response.headers.get('X-Ratelimit-Remaining')
+                if remaining is not None and remaining.isdigit():
+                    self.bucket.limit_remaining(int(remaining))
+                if response.status != 200:
+                    print(f"Unsplash returned {response.status} for '{query}'")
+                    self.stats['failed'] += 1
+                    return None
+                image = parse_photo(await response.json())
+        except Exception as e:
+            print(f"Error fetching Unsplash image: {e}")
+            self.stats['failed'] += 1
+            return None
+        self.stats['fetched'] += 1
+        self.cache.put(query, image)
+        return image
+
+    async def resolve_many(self, queries):
+        """Map each distinct query to an image dict (fallback when it can't be fetched)."""
+        results = {}
+        missing = []
+        for query in dict.fromkeys(queries):
+            self.stats['queries'] += 1
+            image = self.cache.get(query)
+            if image is not None:
+                self.stats['cached'] += 1
+                results[query] = image
+            else:
+                missing.append(query)
+
+        if self.dry_run:
+            self.stats['would_resolve'] += len(missing)
+            results.update((query, would_resolve(query)) for query in missing)
+            return results
+
+        if missing:
+            import aiohttp
+
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            timeout = aiohttp.ClientTimeout(total=self.timeout)
+            headers = {'Authorization': f"Client-ID {self.access_key}"}
+            async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=headers) as session:
+                images = await asyncio.gather(*(self._fetch(session, query) for query in missing))
+            for query, image in zip(missing, images):
+                results[query] = image or fallback_image(query)
+
+        self.cache.rate_limit = self.bucket.state()
+        self.cache.save()
+        return results
+
+    def resolve(self, queries):
+        """Blocking wrapper around resolve_many()"""
+        return asyncio.run(self.resolve_many(queries))
+
+    def report(self):
+        s = self.stats
+        if self.dry_run:
+            return (f"Images (dry run): {s['queries']} distinct queries, {s['cached']} cached, "
+                    f"{s['would_resolve']} would be resolved")
+        return (f"Images: {s['queries']} distinct queries, {s['cached']} cached, {s['fetched']} fetched, "
+                f"{s['rate_limited']} rate limited, {s['failed']} failed")
+
+
+def resolve_images(queries, **kwargs):
+    """Resolve cover images for an iterable of queries; returns {query: image}"""
+    return ImageResolver(**kwargs).resolve(queries)
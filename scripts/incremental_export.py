@@ -0,0 +1,288 @@
+"""Incremental Firestore backups driven by ``updated_at`` watermarks.
+
+A backup directory holds one full snapshot (the base), the delta snapshots
+written by the runs since, and ``state.json``, which records for every
+collection the highest ``updated_at`` exported so far (the watermark) and
+the ID and content digest of every document backed up.
+
+    python incremental_export.py BACKUP_DIR            # base on first run, then deltas
+    python incremental_export.py BACKUP_DIR --compact  # fold the deltas into a new base
+
+A delta run only queries documents with ``updated_at >= watermark``. If a
+collection's document count, or its count of documents with a timestamp
+``updated_at`` (both cheap aggregation queries), then differs from the
+manifest, a keys-only scan finds deleted IDs, recorded as tombstones, and
+new documents the watermark missed. Collections in which some document
+has no timestamp ``updated_at`` can't be tracked that way and are re-read
+in full, writing only the documents whose digest changed.
+
+A deletion offset by a new document whose ``updated_at`` is already older
+than the watermark leaves both counts unchanged and goes unnoticed until
+they differ or ``--verify-ids`` forces the ID scan.
+"""
+import argparse
+import json
+import os
+from datetime import datetime
+
+from content_hash import document_digest
+from firebase_export import PAGE_SIZE, get_all_collections, iter_collection_pages
+from firestore_client import db
+from project_queries import KEYS_ONLY
+from snapshot import SnapshotReader, SnapshotWriter
+from timestamps import parse_timestamp
+
+STATE_FILE = 'state.json'
+WATERMARK_FIELD = 'updated_at'
+SNAPSHOT_EXTENSION = '.fsnap'
+
+
+def load_state(backup_dir):
+    path = os.path.join(backup_dir, STATE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def save_state(backup_dir, state):
+    """Atomically replace the backup state."""
+    path = os.path.join(backup_dir, STATE_FILE)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _snapshot_name(kind):
+    return f"{kind}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}{SNAPSHOT_EXTENSION}"
+
+
+class _DeltaWriter:
+    """SnapshotWriter wrapper that only opens a collection section once it has output."""
+
+    def __init__(self, writer):
+        self.writer = writer
+        self.collection = None
+        self.writes = 0
+        self.tombstones = 0
+
+    def _begin(self, name):
+        if self.collection != name:
+            self.writer.begin_collection(name)
+            self.collection = name
+
+    def write(self, name, doc_id, data):
+        self._begin(name)
+        self.writer.write(doc_id, data)
+        self.writes += 1
+
+    def tombstone(self, name, doc_id):
+        self._begin(name)
+        self.writer.write_tombstone(doc_id)
+        self.tombstones += 1
+
+
+class CollectionState:
+    """Watermark and ID -> digest manifest of one backed-up collection."""
+
+    def __init__(self, watermark=None, tracked=False, documents=None):
+        self.watermark = watermark
+        self.tracked = tracked
+        self.documents = documents if documents is not None else {}
+
+    @classmethod
+    def from_json(cls, entry):
+        watermark = parse_timestamp(entry['watermark']) if entry.get('watermark') else None
+        return cls(watermark, entry['tracked'], entry['documents'])
+
+    def to_json(self):
+        return {
+            'watermark': self.watermark.isoformat() if self.watermark else None,
+            'tracked': self.tracked,
+            'documents': self.documents,
+        }
+
+    def observe(self, data):
+        """Advance the watermark past a document; False if it has no timestamp to track."""
+        value = data.get(WATERMARK_FIELD)
+        if not isinstance(value, datetime):
+            return False
+        if self.watermark is None or value > self.watermark:
+            self.watermark = value
+        return True
+
+    def record(self, doc_id, data):
+        """Remember a document's digest; True if it differs from the last backup."""
+        digest = document_digest(data)
+        changed = self.documents.get(doc_id) != digest
+        self.documents[doc_id] = digest
+        return changed
+
+
+def _full_pass(name, state, out, page_size, write_all=False):
+    """Re-read a whole collection, writing new or changed documents and tombstones."""
+    new_state = CollectionState(tracked=True)
+    for page in iter_collection_pages(name, page_size):
+        for doc in page:
+            data = doc.to_dict()
+            new_state.tracked &= new_state.observe(data)
+            new_state.documents[doc.id] = document_digest(data)
+            if write_all or state.documents.get(doc.id) != new_state.documents[doc.id]:
+                out.write(name, doc.id, data)
+    for doc_id in state.documents:
+        if doc_id not in new_state.documents:
+            out.tombstone(name, doc_id)
+    return new_state
+
+
+def _iter_changed(name, since, page_size):
+    """Documents with updated_at >= since, a page at a time in updated_at order."""
+    query = db.collection(name).where(WATERMARK_FIELD, '>=', since).order_by(WATERMARK_FIELD).limit(page_size)
+    cursor = None
+    while True:
+        page = list((query.start_after(cursor) if cursor is not None else query).stream())
+        yield from page
+        if len(page) < page_size:
+            return
+        cursor = page[-1]
+
+
+def _count(query):
+    return query.count().get()[0][0].value
+
+
+def _watermark_pass(name, state, out, page_size, verify_ids=False):
+    """Export the documents changed since the watermark, then reconcile IDs if needed."""
+    # >= rather than >: documents written in the same instant as the watermark
+    # document may have been missed last time; unchanged ones are skipped by digest
+    for doc in _iter_changed(name, state.watermark, page_size):
+        data = doc.to_dict()
+        state.observe(data)
+        if state.record(doc.id, data):
+            out.write(name, doc.id, data)
+
+    collection_ref = db.collection(name)
+    if not verify_ids:
+        # Any timestamp at all; match the stored values' timezone awareness
+        earliest = datetime.min.replace(tzinfo=state.watermark.tzinfo)
+        stamped = _count(collection_ref.where(WATERMARK_FIELD, '>=', earliest))
+        if stamped == len(state.documents) and _count(collection_ref) == stamped:
+            return state
+
+    live_ids = {doc.id for doc in collection_ref.select(KEYS_ONLY).stream()}
+    for doc_id in [doc_id for doc_id in state.documents if doc_id not in live_ids]:
+        del state.documents[doc_id]
+        out.tombstone(name, doc_id)
+
+    unseen = [collection_ref.document(doc_id) for doc_id in live_ids if doc_id not in state.documents]
+    for doc in db.get_all(unseen):
+        data = doc.to_dict()
+        if data is None:
+            continue
+        state.record(doc.id, data)
+        out.write(name, doc.id, data)
+        # Found only by its ID, so the watermark can't see this collection whole
+        state.tracked &= state.observe(data)
+    return state
+
+
+def export_incremental(backup_dir, page_size=PAGE_SIZE, verify_ids=False):
+    """Write a base snapshot on the first run and a delta snapshot on every later one."""
+    os.makedirs(backup_dir, exist_ok=True)
+    saved = load_state(backup_dir)
+    first_run = saved is None
+    states = {}
+    if not first_run:
+        states = {name: CollectionState.from_json(entry) for name, entry in saved['collections'].items()}
+
+    filename = _snapshot_name('base' if first_run else 'delta')
+    path = os.path.join(backup_dir, filename)
+    live = get_all_collections()
+    with SnapshotWriter(path) as writer:
+        out = _DeltaWriter(writer)
+        for name in live:
+            state = states.get(name)
+            if state is not None and state.tracked and state.watermark is not None:
+                print(f"Exporting changes to {name} since {state.watermark.isoformat()}")
+                states[name] = _watermark_pass(name, state, out, page_size, verify_ids)
+            else:
+                print(f"Exporting collection: {name}")
+                states[name] = _full_pass(name, state or CollectionState(), out, page_size,
+                                          write_all=state is None)
+        for name in [name for name in states if name not in live]:
+            print(f"Collection removed: {name}")
+            for doc_id in states.pop(name).documents:
+                out.tombstone(name, doc_id)
+
+    if first_run:
+        saved = {'base': filename, 'deltas': []}
+    elif out.writes or out.tombstones:
+        saved['deltas'].append(filename)
+    else:
+        os.remove(path)
+        filename = None
+    saved['collections'] = {name: state.to_json() for name, state in states.items()}
+    save_state(backup_dir, saved)
+
+    if filename:
+        print(f"Wrote {filename}: {out.writes} documents, {out.tombstones} deletions")
+    else:
+        print("No changes since the last export")
+    return filename
+
+
+def compact_backup(backup_dir):
+    """Fold the delta snapshots into a new base snapshot and drop the old files."""
+    state = load_state(backup_dir)
+    if state is None:
+        raise ValueError(f"No incremental backup in {backup_dir}")
+    if not state['deltas']:
+        print("Nothing to compact")
+        return state['base']
+
+    # Deltas are small; the latest version of every changed document wins
+    overlay = {}
+    for delta in state['deltas']:
+        for name, doc_id, data in SnapshotReader(os.path.join(backup_dir, delta)):
+            overlay.setdefault(name, {})[doc_id] = data
+
+    filename = _snapshot_name('base')
+    base = SnapshotReader(os.path.join(backup_dir, state['base']))
+    with SnapshotWriter(os.path.join(backup_dir, filename)) as writer:
+        out = _DeltaWriter(writer)
+        for name in base.collections() + [name for name in overlay if name not in base.index]:
+            changes = overlay.get(name, {})
+            for doc_id, data in base.iter_documents(name):
+                data = changes.pop(doc_id, data)
+                if data is not None:
+                    out.write(name, doc_id, data)
+            for doc_id, data in changes.items():
+                if data is not None:
+                    out.write(name, doc_id, data)
+
+    old_files = [state['base']] + state['deltas']
+    state['base'] = filename
+    state['deltas'] = []
+    save_state(backup_dir, state)
+    for old in old_files:
+        os.remove(os.path.join(backup_dir, old))
+    print(f"Compacted {len(old_files) - 1} deltas into {filename} ({out.writes} documents)")
+    return filename
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Incremental Firestore backups.')
+    parser.add_argument('backup_dir')
+    parser.add_argument('--compact', action='store_true', help='fold the deltas into a new base snapshot')
+    parser.add_argument('--page-size', type=int, default=PAGE_SIZE)
+    parser.add_argument('--verify-ids', action='store_true',
+                        help='always compare document IDs, even when the counts match')
+    args = parser.parse_args()
+
+    if args.compact:
+        compact_backup(args.backup_dir)
+    else:
+        export_incremental(args.backup_dir, args.page_size, args.verify_ids)
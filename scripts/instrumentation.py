@@ -0,0 +1,378 @@
+"""Counts, bytes, latency histograms and retries for every Firestore call.
+
+firestore_client wraps the client it creates in InstrumentedClient, so
+every ``stream()``, ``get()``, ``set()``, ``update()``, ``delete()`` and
+batch commit the scripts make through ``db`` is timed and counted in the
+process-wide ``metrics``, with no changes to the calling code. Document
+sizes are estimated from their top-level fields (see _size()).
+
+At exit a JSON summary is written to FIRESTORE_METRICS (default
+``firestore_metrics.json``; set it to ``0`` to turn instrumentation off)
+and a one-line digest is printed.
+
+Progress replaces per-document print() calls with a status line printed
+at most every few seconds.
+"""
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left
+from datetime import datetime
+
+DEFAULT_SUMMARY = 'firestore_metrics.json'
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+PROGRESS_INTERVAL = 2.0
+# Bytes counted for a number, timestamp, map entry or other non-string value
+VALUE_SIZE = 8
+
+
+def _size(data):
+    """Rough size of a document or write payload, in bytes.
+
+    Only the top level is walked: field names and string values count their
+    length, lists of strings the length of their items, and any other value
+    VALUE_SIZE bytes per element, so a streamed document costs a few dict
+    lookups instead of a JSON encoding.
+    """
+    if not data:
+        return 0
+    size = 0
+    for key, value in data.items():
+        size += len(key)
+        if isinstance(value, str):
+            size += len(value)
+        elif isinstance(value, (list, tuple)):
+            for item in value:
+                size += len(item) if isinstance(item, str) else VALUE_SIZE
+        elif isinstance(value, dict):
+            size += VALUE_SIZE * len(value)
+        else:
+            size += VALUE_SIZE
+    return size
+
+
+class OperationStats:
+    """Counters and latency histogram for one kind of operation."""
+
+    def __init__(self):
+        self.calls = 0
+        self.documents = 0
+        self.bytes = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.histogram = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def record(self, elapsed_ms, documents, size, error):
+        self.calls += 1
+        self.documents += documents
+        self.bytes += size
+        self.errors += error
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.histogram[bisect_left(LATENCY_BUCKETS_MS, elapsed_ms)] += 1
+
+    def percentile(self, fraction):
+        """Upper bound of the bucket holding the given fraction of calls (ms)."""
+        target = fraction * self.calls
+        seen = 0
+        for bound, count in zip(LATENCY_BUCKETS_MS + (self.max_ms,), self.histogram):
+            seen += count
+            if count and seen >= target:
+                return min(bound, self.max_ms)
+        return self.max_ms
+
+    def summary(self):
+        buckets = {f"<={bound}": count for bound, count in zip(LATENCY_BUCKETS_MS, self.histogram)}
+        buckets[f">{LATENCY_BUCKETS_MS[-1]}"] = self.histogram[-1]
+        return {
+            'calls': self.calls,
+            'documents': self.documents,
+            'bytes': self.bytes,
+            'errors': self.errors,
+            'retries': self.retries,
+            'latency_ms': {
+                'mean': round(self.total_ms / self.calls, 3) if self.calls else 0.0,
+                'p50': round(self.percentile(0.5), 3),
+                'p95': round(self.percentile(0.95), 3),
+                'max': round(self.max_ms, 3),
+                'histogram': {bucket: count for bucket, count in buckets.items() if count},
+            },
+        }
+
+
+class Metrics:
+    """Thread-safe per-operation stats for a run."""
+
+    def __init__(self):
+        self.started = time.time()
+        self.operations = {}
+        self._lock = threading.Lock()
+
+    def _stats(self, operation):
+        if operation not in self.operations:
+            self.operations[operation] = OperationStats()
+        return self.operations[operation]
+
+    def record(self, operation, elapsed, documents=0, size=0, error=False):
+        with self._lock:
+            self._stats(operation).record(elapsed * 1000.0, documents, size, error)
+
+    def record_retry(self, operation):
+        with self._lock:
+            self._stats(operation).retries += 1
+
+    def summary(self):
+        with self._lock:
+            operations = {name: stats.summary() for name, stats in sorted(self.operations.items())}
+        elapsed = time.time() - self.started
+        return {
+            'script': os.path.basename(sys.argv[0]) if sys.argv and sys.argv[0] else None,
+            'started_at': datetime.fromtimestamp(self.started).isoformat(),
+            'elapsed_seconds': round(elapsed, 3),
+            'operations': operations,
+        }
+
+    def digest(self):
+        """One line: calls, documents and p95 latency per operation."""
+        parts = []
+        with self._lock:
+            for name, stats in sorted(self.operations.items()):
+                parts.append(f"{name} {stats.calls} calls/{stats.documents} docs "
+                             f"p95 {stats.percentile(0.95):.0f}ms")
+        return 'Firestore: ' + (', '.join(parts) if parts else 'no calls')
+
+    def write_summary(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.summary(), f, indent=2)
+        os.replace(tmp_path, path)
+        return path
+
+
+metrics = Metrics()
+
+
+def record_retry(operation='commit'):
+    """Count a retried call (used by BulkWriter's backoff loop)."""
+    metrics.record_retry(operation)
+
+
+class _Timer:
+    def __init__(self, operation, documents=0, size=0):
+        self.operation = operation
+        self.documents = documents
+        self.size = size
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        metrics.record(self.operation, time.perf_counter() - self.start,
+                       self.documents, self.size, exc_type is not None)
+
+
+def _unwrap(value):
+    if isinstance(value, _Instrumented):
+        return value._target
+    if isinstance(value, list):
+        return [_unwrap(item) for item in value]
+    if isinstance(value, tuple):
+        return tuple(_unwrap(item) for item in value)
+    return value
+
+
+def _unwrap_kwargs(kwargs):
+    return {key: _unwrap(value) for key, value in kwargs.items()}
+
+
+def _is_snapshot(value):
+    return hasattr(value, 'to_dict') and hasattr(value, 'reference')
+
+
+class _Instrumented:
+    """Proxy forwarding to a client object, timing the calls that reach Firestore."""
+
+    # Methods returning another client object that should stay instrumented
+    BUILDERS = frozenset({
+        'collection', 'document', 'batch', 'where', 'order_by', 'limit', 'limit_to_last',
+        'offset', 'select', 'start_at', 'start_after', 'end_at', 'end_before', 'count',
+    })
+
+    def __init__(self, target):
+        self._target = target
+        self._writes = []
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if name in ('reference', 'parent'):
+            return _Instrumented(value)
+        if not callable(value):
+            return value
+        if name in self.BUILDERS:
+            return lambda *args, **kwargs: _Instrumented(value(*_unwrap(args), **_unwrap_kwargs(kwargs)))
+        handler = getattr(self, '_call_' + name, None)
+        if handler is not None:
+            return lambda *args, **kwargs: handler(value, *_unwrap(args), **_unwrap_kwargs(kwargs))
+        return lambda *args, **kwargs: value(*_unwrap(args), **_unwrap_kwargs(kwargs))
+
+    def __repr__(self):
+        return f"Instrumented({self._target!r})"
+
+    def _is_batch(self):
+        return hasattr(self._target, 'commit')
+
+    def _call_stream(self, method, *args, **kwargs):
+        iterator = iter(method(*args, **kwargs))
+        elapsed = 0.0
+        documents = 0
+        size = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    snapshot = next(iterator)
+                except StopIteration:
+                    elapsed += time.perf_counter() - start
+                    break
+                elapsed += time.perf_counter() - start
+                documents += 1
+                size += _size(snapshot.to_dict())
+                yield _Instrumented(snapshot)
+        except GeneratorExit:
+            # The caller stopped reading early
+            metrics.record('stream', elapsed, documents, size)
+            raise
+        except BaseException:
+            metrics.record('stream', elapsed, documents, size, error=True)
+            raise
+        metrics.record('stream', elapsed, documents, size)
+
+    def _call_get(self, method, *args, **kwargs):
+        operation = 'aggregate' if type(self._target).__name__.startswith('Aggregation') else 'get'
+        with _Timer(operation) as timer:
+            result = method(*args, **kwargs)
+            # Counted before the timer records the call
+            if _is_snapshot(result):
+                timer.documents = 1
+                timer.size = _size(result.to_dict())
+            elif isinstance(result, list) and result and _is_snapshot(result[0]):
+                timer.documents = len(result)
+                timer.size = sum(_size(snapshot.to_dict()) for snapshot in result)
+        if _is_snapshot(result):
+            return _Instrumented(result)
+        if isinstance(result, list) and result and _is_snapshot(result[0]):
+            return [_Instrumented(snapshot) for snapshot in result]
+        return result
+
+    def _call_get_all(self, method, *args, **kwargs):
+        with _Timer('get_all') as timer:
+            snapshots = list(method(*args, **kwargs))
+            timer.documents = len(snapshots)
+        return [_Instrumented(snapshot) for snapshot in snapshots]
+
+    def _call_collections(self, method, *args, **kwargs):
+        with _Timer('list_collections'):
+            collections = list(method(*args, **kwargs))
+        return [_Instrumented(collection) for collection in collections]
+
+    def _write(self, operation, method, args, kwargs, data):
+        if self._is_batch():
+            # Timed as part of the commit
+            self._writes.append(_size(data))
+            return method(*args, **kwargs)
+        with _Timer(operation, documents=1, size=_size(data)):
+            return method(*args, **kwargs)
+
+    def _call_set(self, method, *args, **kwargs):
+        data = args[1] if self._is_batch() else (args[0] if args else kwargs.get('document_data'))
+        return self._write('set', method, args, kwargs, data)
+
+    def _call_update(self, method, *args, **kwargs):
+        data = args[1] if self._is_batch() else (args[0] if args else kwargs.get('field_updates'))
+        return self._write('update', method, args, kwargs, data)
+
+    def _call_delete(self, method, *args, **kwargs):
+        return self._write('delete', method, args, kwargs, None)
+
+    def _call_commit(self, method, *args, **kwargs):
+        with _Timer('commit', documents=len(self._writes), size=sum(self._writes)):
+            result = method(*args, **kwargs)
+        self._writes = []
+        return result
+
+
+class InstrumentedClient(_Instrumented):
+    """Firestore client wrapper feeding ``metrics``; behaves like the client it wraps."""
+
+
+def instrumentation_enabled():
+    return os.getenv('FIRESTORE_METRICS') != '0'
+
+
+_summary_registered = False
+
+
+def enable_summary(path=None):
+    """Write the summary (and print the digest) when the process exits."""
+    global _summary_registered
+    if _summary_registered:
+        return
+    _summary_registered = True
+    path = path or os.getenv('FIRESTORE_METRICS') or DEFAULT_SUMMARY
+
+    def write():
+        if not metrics.operations:
+            return
+        metrics.write_summary(path)
+        print(f"{metrics.digest()} (details in {path})", file=sys.stderr)
+
+    atexit.register(write)
+
+
+class Progress:
+    """Rate-limited progress line for long loops.
+
+    Call ``update()`` once per item; a line with the count, rate and (if the
+    total is known) percentage is printed at most every ``interval`` seconds,
+    plus once more from ``done()``.
+    """
+
+    def __init__(self, label, total=None, interval=PROGRESS_INTERVAL, stream=None):
+        self.label = label
+        self.total = total
+        self.interval = interval
+        self.stream = stream or sys.stderr
+        self.count = 0
+        self.started = time.monotonic()
+        self._last = self.started
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.done()
+
+    def update(self, count=1):
+        self.count += count
+        now = time.monotonic()
+        if now - self._last >= self.interval:
+            self._last = now
+            self._print(now)
+
+    def _print(self, now):
+        elapsed = now - self.started
+        rate = self.count / elapsed if elapsed else 0.0
+        line = f"{self.label}: {self.count}"
+        if self.total:
+            line += f"/{self.total} ({100.0 * self.count / self.total:.0f}%)"
+        print(f"{line}, {rate:.1f}/s", file=self.stream, flush=True)
+
+    def done(self):
+        self._print(time.monotonic())
@@ -0,0 +1,294 @@
+"""SQLite-backed local mirror of the Firestore collections.
+
+    python local_store.py mirror.db load firebase_export.json   # or a .ndjson/.fsnap snapshot
+    python local_store.py mirror.db sync backups/                # apply an incremental backup's new deltas
+    FIRESTORE_MIRROR=mirror.db python merge_projects.py          # run any script against the mirror
+    python local_store.py mirror.db status
+    python local_store.py mirror.db push [--dry-run]             # send the pending writes to Firestore
+
+LocalStore is a fake_firestore.FakeClient whose documents live in SQLite
+instead of dicts, so the scripts get the same query surface (collection,
+document, where, order_by, select, stream, get, batch, ...) at disk speed.
+Documents are keyed by (collection, id) and also indexed by slug, title and
+normalized title; equality filters on those fields are answered from the
+indexes rather than by scanning the collection.
+
+Writes made through the store change the mirror and are also recorded as
+pending, coalesced to the final state of each document, so after any
+number of local runs ``push`` sends exactly one write per touched document.
+"""
+import argparse
+import json
+import os
+import sqlite3
+
+from fake_firestore import FakeClient
+from snapshot import SnapshotReader, decode_document, encode_document
+from text_normalize import normalize_title
+
+# Fields with their own SQLite index, and the columns holding them
+INDEXED_FIELDS = {'slug': 'slug', 'title': 'title'}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT NOT NULL,
+    slug TEXT,
+    title TEXT,
+    title_key TEXT,
+    PRIMARY KEY (collection, id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS documents_slug ON documents (collection, slug);
+CREATE INDEX IF NOT EXISTS documents_title ON documents (collection, title);
+CREATE INDEX IF NOT EXISTS documents_title_key ON documents (collection, title_key);
+CREATE TABLE IF NOT EXISTS pending_writes (
+    collection TEXT NOT NULL,
+    id TEXT NOT NULL,
+    data TEXT,
+    PRIMARY KEY (collection, id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+def _encode(doc_id, data):
+    return json.dumps(encode_document(doc_id, data), default=str, separators=(',', ':'))
+
+
+def _decode(payload):
+    return decode_document(json.loads(payload))[1]
+
+
+def _index_values(data):
+    slug = data.get('slug')
+    title = data.get('title')
+    if not isinstance(slug, str):
+        slug = None
+    if not isinstance(title, str):
+        title = None
+    return slug, title, normalize_title(title) if title else None
+
+
+class LocalStore(FakeClient):
+    """Firestore client stand-in reading and writing a local SQLite mirror."""
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self):
+        self._conn.close()
+
+    # Storage primitives used by the fake client's queries and writes
+
+    def _collection_paths(self):
+        return [row[0] for row in self._conn.execute('SELECT DISTINCT collection FROM documents')]
+
+    def _documents(self, collection_path, filters=()):
+        sql = 'SELECT id, data FROM documents WHERE collection = ?'
+        params = [collection_path]
+        for field_path, op, value in filters:
+            if op != '==' or not isinstance(value, str):
+                continue
+            if field_path in INDEXED_FIELDS:
+                sql += f' AND {INDEXED_FIELDS[field_path]} = ?'
+                params.append(value)
+            elif field_path == '__name__':
+                sql += ' AND id = ?'
+                params.append(value)
+        # The query still applies every filter to these candidates
+        return [(doc_id, _decode(data)) for doc_id, data in self._conn.execute(sql, params)]
+
+    def _get_document(self, collection_path, doc_id):
+        row = self._conn.execute(
+            'SELECT data FROM documents WHERE collection = ? AND id = ?', (collection_path, doc_id)
+        ).fetchone()
+        return _decode(row[0]) if row else None
+
+    def _store_document(self, collection_path, doc_id, data):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO documents (collection, id, data, slug, title, title_key) '
+            'VALUES (?, ?, ?, ?, ?, ?)',
+            (collection_path, doc_id, _encode(doc_id, data)) + _index_values(data)
+        )
+
+    def _remove_document(self, collection_path, doc_id):
+        self._conn.execute('DELETE FROM documents WHERE collection = ? AND id = ?', (collection_path, doc_id))
+
+    def _put_document(self, collection_path, doc_id, data):
+        self._store_document(collection_path, doc_id, data)
+        self._record_pending(collection_path, doc_id, data)
+
+    def _delete_document(self, collection_path, doc_id):
+        self._remove_document(collection_path, doc_id)
+        self._record_pending(collection_path, doc_id, None)
+
+    def _record_pending(self, collection_path, doc_id, data):
+        payload = _encode(doc_id, data) if data is not None else None
+        self._conn.execute('INSERT OR REPLACE INTO pending_writes VALUES (?, ?, ?)',
+                           (collection_path, doc_id, payload))
+
+    def _apply_writes(self, writes):
+        # One transaction per commit: a failing write rolls back the whole batch
+        with self._lock, self._conn:
+            for write in writes:
+                self._apply_locked(write)
+
+    # Indexed lookups
+
+    def find_by_slug(self, collection_path, slug):
+        """(doc_id, data) pairs with the given slug"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, data FROM documents WHERE collection = ? AND slug = ?', (collection_path, slug)
+            ).fetchall()
+        return [(doc_id, _decode(data)) for doc_id, data in rows]
+
+    def find_by_title(self, collection_path, title):
+        """(doc_id, data) pairs whose title normalizes to the same key as ``title``"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT id, data FROM documents WHERE collection = ? AND title_key = ?',
+                (collection_path, normalize_title(title))
+            ).fetchall()
+        return [(doc_id, _decode(data)) for doc_id, data in rows]
+
+    # Populating the mirror
+
+    def _get_meta(self, key, default=None):
+        row = self._conn.execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def _set_meta(self, key, value):
+        self._conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', (key, json.dumps(value)))
+
+    def _apply_snapshot(self, filename):
+        """Copy a snapshot's documents in; null records (tombstones) delete."""
+        count = 0
+        for collection_path, doc_id, data in SnapshotReader(filename):
+            if data is None:
+                self._remove_document(collection_path, doc_id)
+            else:
+                self._store_document(collection_path, doc_id, data)
+            count += 1
+        return count
+
+    def _reapply_pending(self):
+        # Local edits not pushed yet win over what was just loaded
+        rows = self._conn.execute('SELECT collection, id, data FROM pending_writes').fetchall()
+        for collection_path, doc_id, payload in rows:
+            if payload is None:
+                self._remove_document(collection_path, doc_id)
+            else:
+                self._store_document(collection_path, doc_id, _decode(payload))
+
+    def load_snapshot(self, filename):
+        """Replace the mirror's documents with an export or snapshot."""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM documents')
+            count = self._apply_snapshot(filename)
+            self._reapply_pending()
+            self._set_meta('source', {'snapshot': os.path.abspath(filename)})
+        return count
+
+    def sync_backup(self, backup_dir):
+        """Bring the mirror up to date with an incremental_export backup directory.
+
+        Only deltas not applied yet are read; a new base (after compaction or
+        when switching backups) reloads the mirror from it.
+        """
+        from incremental_export import load_state
+
+        state = load_state(backup_dir)
+        if state is None:
+            raise ValueError(f"No incremental backup in {backup_dir}")
+        source = self._get_meta('source', {})
+        count = 0
+        with self._lock, self._conn:
+            if source.get('backup') != os.path.abspath(backup_dir) or source.get('base') != state['base']:
+                self._conn.execute('DELETE FROM documents')
+                count += self._apply_snapshot(os.path.join(backup_dir, state['base']))
+                source = {'backup': os.path.abspath(backup_dir), 'base': state['base'], 'deltas': []}
+            for delta in state['deltas']:
+                if delta not in source['deltas']:
+                    count += self._apply_snapshot(os.path.join(backup_dir, delta))
+                    source['deltas'].append(delta)
+            self._reapply_pending()
+            self._set_meta('source', source)
+        return count
+
+    # Pending writes
+
+    def pending_writes(self):
+        """[(collection, doc_id, data or None for a delete)] not pushed yet"""
+        with self._lock:
+            rows = self._conn.execute(
+                'SELECT collection, id, data FROM pending_writes ORDER BY collection, id'
+            ).fetchall()
+        return [(c, doc_id, _decode(payload) if payload is not None else None) for c, doc_id, payload in rows]
+
+    def push(self, client, dry_run=False):
+        """Send the pending writes to ``client`` in batches and clear them."""
+        from bulk_writer import BulkWriter
+
+        writes = self.pending_writes()
+        if dry_run:
+            for collection_path, doc_id, data in writes:
+                print(f"  {'delete' if data is None else 'set'} {collection_path}/{doc_id}")
+            return None
+        with BulkWriter(client) as writer:
+            for collection_path, doc_id, data in writes:
+                reference = client.collection(collection_path).document(doc_id)
+                if data is None:
+                    writer.delete(reference)
+                else:
+                    writer.set(reference, data)
+        if not writer.stats.failed_writes:
+            with self._lock, self._conn:
+                self._conn.execute('DELETE FROM pending_writes')
+        print(writer.stats.report())
+        return writer.stats
+
+    def status(self):
+        with self._lock:
+            counts = self._conn.execute(
+                'SELECT collection, COUNT(*) FROM documents GROUP BY collection ORDER BY collection'
+            ).fetchall()
+            pending = self._conn.execute('SELECT COUNT(*) FROM pending_writes').fetchone()[0]
+        return {'collections': dict(counts), 'pending_writes': pending, 'source': self._get_meta('source')}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local SQLite mirror of the Firestore collections.')
+    parser.add_argument('mirror', help='SQLite file holding the mirror')
+    commands = parser.add_subparsers(dest='command', required=True)
+    load_parser = commands.add_parser('load', help='replace the mirror with an export or snapshot')
+    load_parser.add_argument('snapshot')
+    sync_parser = commands.add_parser('sync', help='apply an incremental backup directory')
+    sync_parser.add_argument('backup_dir')
+    commands.add_parser('status', help='document and pending write counts')
+    push_parser = commands.add_parser('push', help='send the pending writes to Firestore')
+    push_parser.add_argument('--dry-run', action='store_true')
+    args = parser.parse_args()
+
+    store = LocalStore(args.mirror)
+    if args.command == 'load':
+        print(f"Loaded {store.load_snapshot(args.snapshot)} documents from {args.snapshot}")
+    elif args.command == 'sync':
+        print(f"Applied {store.sync_backup(args.backup_dir)} records from {args.backup_dir}")
+    elif args.command == 'status':
+        print(json.dumps(store.status(), indent=2))
+    elif args.command == 'push':
+        from firestore_client import db
+        writes = store.pending_writes()
+        print(f"{len(writes)} pending writes")
+        store.push(db, dry_run=args.dry_run)
+    store.close()
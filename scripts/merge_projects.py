@@ -1,156 +1,158 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+from firestore_client import db
+import argparse
+import copy
 from datetime import datetime
-import difflib
-import re
+from content_hash import content_hash
+from instrumentation import Progress
+from text_normalize import normalize_titles
+from title_index import SIMILARITY_THRESHOLD, find_similar_pairs
+from write_plan import WritePlan, execute_plan
 
-# Initialize Firebase Admin SDK
-cred = credentials.Certificate('/Users/admin/Downloads/bymayanksingh-firebase-adminsdk-jmdt5-f612894ec8.json')
-firebase_admin.initialize_app(cred)
-db = firestore.client()
-
-def normalize_title(title):
-    """Normalize title for comparison"""
-    # Convert numbers to words and words to numbers
-    number_word_map = {
-        '0': 'zero', '1': 'one', '2': 'two', '3': 'three', '4': 'four',
-        '5': 'five', '6': 'six', '7': 'seven', '8': 'eight', '9': 'nine',
-        'zero': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4',
-        'five': '5', 'six': '6', 'seven': '7', 'eight': '8', 'nine': '9'
-    }
-    
-    # Convert to lowercase and remove special characters
-    title = re.sub(r'[^\w\s]', '', title.lower().strip())
+class DisjointSet:
+    """Union-find over item indices, with path halving and union by size"""
     
-    # Handle special cases like "Connect4"
-    title = re.sub(r'(\w+)(\d+)', r'\1 \2', title)  # Split words and numbers
+    def __init__(self, size):
+        self.parent = list(range(size))
+        self.size = [1] * size
     
-    # Split into words
-    words = title.split()
-    normalized = []
+    def find(self, item):
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
     
-    for word in words:
-        # Convert numbers to words
-        if word.isdigit():
-            word = number_word_map.get(word, word)
-        # Convert number words to numbers
-        elif word in number_word_map:
-            word = number_word_map[word]
-        # Remove common words
-        if word not in {'a', 'an', 'the', 'and', 'or', 'but', 'game'}:
-            normalized.append(word)
+    def union(self, a, b):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.size[root_a] < self.size[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parent[root_b] = root_a
+        self.size[root_a] += self.size[root_b]
     
-    return ' '.join(normalized)
+    def groups(self):
+        """Members of every set, each list in ascending index order"""
+        groups = {}
+        for item in range(len(self.parent)):
+            groups.setdefault(self.find(item), []).append(item)
+        return list(groups.values())
 
-def get_similarity_ratio(str1, str2):
-    """Calculate similarity ratio between two strings"""
-    norm1 = normalize_title(str1)
-    norm2 = normalize_title(str2)
-    print(f"Comparing normalized titles: '{norm1}' vs '{norm2}'")
-    return difflib.SequenceMatcher(None, norm1, norm2).ratio()
+def completeness(project):
+    """Number of non-empty fields"""
+    return sum(1 for v in project.values() if v)
 
-def merge_projects(projects):
-    """Merge similar projects and return merged projects and projects to delete"""
+def merge_into(base, other):
+    """Fill fields missing or empty in base from other"""
+    for key, value in other.items():
+        if key not in base or (not base[key] and value):
+            base[key] = value
+
+def merge_projects(projects, minhash=False):
+    """Merge similar projects and return merged projects and projects to delete
+    
+    ``minhash`` finds similar titles with title_index's MinHashIndex, which is
+    faster on very large collections but can miss a few pairs.
+    """
     merged = {}
     to_delete = set()
     
     # First pass: Group by normalized title matches
-    for project in projects:
-        title = project.get('title', '').strip()
+    titles = [project.get('title', '').strip() for project in projects]
+    for project, title, norm_title in zip(projects, titles, normalize_titles(titles)):
         if not title:
             continue
             
-        norm_title = normalize_title(title)
         if norm_title not in merged:
             merged[norm_title] = project
         else:
             print(f"Found exact match after normalization: '{title}' matches '{merged[norm_title]['title']}'")
             # Merge data, keeping the most complete information
-            base = merged[norm_title]
-            for key, value in project.items():
-                if key not in base or (not base[key] and value):
-                    base[key] = value
+            merge_into(merged[norm_title], project)
             to_delete.add(project['id'])
     
-    # Second pass: Find similar titles
+    # Second pass: Cluster similar titles. Pairs come from title_index over the
+    # already normalized titles; union-find makes similarity transitive so
+    # chains of near-duplicates collapse into one cluster.
     titles = list(merged.keys())
-    for i in range(len(titles)):
-        for j in range(i + 1, len(titles)):
-            similarity = get_similarity_ratio(titles[i], titles[j])
-            if similarity > 0.7:  # Lower threshold to catch more cases
-                print(f"Found similar titles: '{merged[titles[i]]['title']}' and '{merged[titles[j]]['title']}' (similarity: {similarity:.2f})")
-                # Keep the more complete project
-                proj1 = merged[titles[i]]
-                proj2 = merged[titles[j]]
-                
-                # Compare completeness (number of non-empty fields)
-                completeness1 = sum(1 for v in proj1.values() if v)
-                completeness2 = sum(1 for v in proj2.values() if v)
-                
-                if completeness1 >= completeness2:
-                    # Merge proj2 into proj1
-                    for key, value in proj2.items():
-                        if key not in proj1 or (not proj1[key] and value):
-                            proj1[key] = value
-                    to_delete.add(proj2['id'])
-                    del merged[titles[j]]
-                    print(f"Merged '{proj2['title']}' into '{proj1['title']}'")
-                else:
-                    # Merge proj1 into proj2
-                    for key, value in proj1.items():
-                        if key not in proj2 or (not proj2[key] and value):
-                            proj2[key] = value
-                    to_delete.add(proj1['id'])
-                    del merged[titles[i]]
-                    print(f"Merged '{proj1['title']}' into '{proj2['title']}'")
-                break
+    clusters = DisjointSet(len(titles))
+    for i, j, similarity in find_similar_pairs(titles, SIMILARITY_THRESHOLD, minhash):
+        print(f"Found similar titles: '{merged[titles[i]]['title']}' and '{merged[titles[j]]['title']}' (similarity: {similarity:.2f})")
+        clusters.union(i, j)
+    
+    for members in clusters.groups():
+        if len(members) < 2:
+            continue
+        # Keep the most complete project; ties go to the one seen first
+        cluster = [merged[titles[k]] for k in members]
+        survivor = max(cluster, key=completeness)
+        for k, project in zip(members, cluster):
+            if project is survivor:
+                continue
+            merge_into(survivor, project)
+            to_delete.add(project['id'])
+            del merged[titles[k]]
+            print(f"Merged '{project['title']}' into '{survivor['title']}'")
     
     return list(merged.values()), list(to_delete)
 
-def main():
+def plan_merge(projects, minhash=False):
+    """Write plan merging similar projects: sets for changed survivors, deletes for the rest"""
+    originals = {project['id']: copy.deepcopy(project) for project in projects}
+    merged_projects, to_delete = merge_projects(projects, minhash)
+    
+    plan = WritePlan('merge_projects')
+    now = datetime.now()
+    for project in merged_projects:
+        before = originals[project['id']]
+        if content_hash(project) == content_hash(before):
+            continue
+        data = {key: value for key, value in project.items() if key != 'id'}
+        data['updated_at'] = now
+        plan.set('projects', project['id'], data, before={k: v for k, v in before.items() if k != 'id'})
+    for project_id in to_delete:
+        plan.delete('projects', project_id, before=originals[project_id])
+    return plan
+
+def main(dry_run=False, plan_path=None, minhash=False):
     # Get all projects
     projects_ref = db.collection('projects')
     projects = []
-    for doc in projects_ref.stream():
-        project_data = doc.to_dict()
-        project_data['id'] = doc.id
-        projects.append(project_data)
-        print(f"Found project: {project_data['title']} (ID: {doc.id})")
+    with Progress('Reading projects') as progress:
+        for doc in projects_ref.stream():
+            project_data = doc.to_dict()
+            project_data['id'] = doc.id
+            projects.append(project_data)
+            progress.update()
     
     print(f"\nFound {len(projects)} projects")
     
     # Merge similar projects
-    merged_projects, to_delete = merge_projects(projects)
+    plan = plan_merge(projects, minhash)
+    print()
+    print(plan.report())
+    if plan_path:
+        plan.save(plan_path)
+        print(f"\nPlan saved to {plan_path}")
     
-    print(f"\nMerged into {len(merged_projects)} projects")
-    print(f"Projects to delete: {len(to_delete)}")
-    
-    if to_delete:
-        print("\nProjects that will be deleted:")
-        for project in projects:
-            if project['id'] in to_delete:
-                print(f"- {project['title']} (ID: {project['id']})")
-        
-        # Update Firebase
-        batch = db.batch()
-        
-        # Update merged projects
-        for project in merged_projects:
-            project_id = project.pop('id')  # Remove id from data
-            project['updated_at'] = datetime.now().isoformat()
-            doc_ref = projects_ref.document(project_id)
-            batch.set(doc_ref, project)
-        
-        # Delete duplicate projects
-        for project_id in to_delete:
-            doc_ref = projects_ref.document(project_id)
-            batch.delete(doc_ref)
-        
-        # Commit the batch
-        batch.commit()
-        print("\nSuccessfully updated Firebase!")
-    else:
+    if not plan:
         print("\nNo changes needed in Firebase.")
+    elif dry_run:
+        print("\nDry run: nothing written.")
+    else:
+        # Update Firebase: merged projects first, then the duplicates are deleted
+        stats = execute_plan(plan, db)
+        print(stats.report())
+        if stats.failed_writes:
+            print("\nSome writes failed; duplicates of unmerged projects were kept.")
+        else:
+            print("\nSuccessfully updated Firebase!")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description='Merge duplicate projects.')
+    parser.add_argument('--dry-run', action='store_true', help='print the write plan without executing it')
+    parser.add_argument('--plan', metavar='FILE', help='save the write plan as JSON')
+    parser.add_argument('--minhash', action='store_true',
+                        help='approximate title matching for very large collections (can miss 1-2%% of pairs)')
+    args = parser.parse_args()
+    
+    main(args.dry_run, args.plan, args.minhash)
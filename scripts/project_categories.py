@@ -0,0 +1,95 @@
+"""Keyword based project category classifier.
+
+Categories are declared as an ordered keyword table; a project gets the
+first category (in table order) any of whose keywords occurs in its tech
+stack, as a case-insensitive substring. All keywords are compiled into one
+regex alternation that finds, in one pass over the lowercased tech stack,
+each position where some keyword starts (restarting one character after
+each hit, so overlapping keywords are seen). Every keyword starting with
+that character is then checked at the position, because the alternation
+only reports one of several keywords sharing a prefix ("rest" and
+"restful"). The cost per project depends on the text, not on how many
+keywords the table holds. Results are memoized per tech stack, which
+repeat a lot across projects.
+"""
+import re
+from collections import defaultdict
+from functools import lru_cache
+
+# Checked in order: the first category with a matching keyword wins
+CATEGORY_KEYWORDS = [
+    ('Backend Development', ('api', 'rest')),
+    ('Frontend Development', ('react', 'vue', 'css')),
+    ('Game Development', ('pygame', 'game')),
+    ('Full Stack Development', ('flask', 'django')),
+]
+DEFAULT_CATEGORY = 'Software Development'
+CACHE_SIZE = 4096
+
+
+def tech_stack_text(tech_stack):
+    """Technologies as one string, whether stored as a list or a comma-separated string."""
+    if not tech_stack:
+        return ''
+    if isinstance(tech_stack, (list, tuple)):
+        return ', '.join(str(tech) for tech in tech_stack)
+    return str(tech_stack)
+
+
+class CategoryClassifier:
+    """Classify tech stacks against an ordered keyword -> category table."""
+
+    def __init__(self, rules=CATEGORY_KEYWORDS, default=DEFAULT_CATEGORY, cache_size=CACHE_SIZE):
+        self.categories = [category for category, _ in rules]
+        self.default = default
+        self.priority = {}
+        for rank, (_, keywords) in enumerate(rules):
+            for keyword in keywords:
+                # A keyword listed under several categories belongs to the first
+                self.priority.setdefault(keyword.lower(), rank)
+        self.pattern = re.compile('|'.join(re.escape(k) for k in sorted(self.priority) if k))
+        # (keyword, rank) by first character, best rank first
+        self.starting_with = defaultdict(list)
+        for keyword, rank in sorted(self.priority.items(), key=lambda item: item[1]):
+            if keyword:
+                self.starting_with[keyword[0]].append((keyword, rank))
+        self._classify_text = lru_cache(maxsize=cache_size)(self._scan)
+
+    def _scan(self, text):
+        text = text.lower()
+        search = self.pattern.search
+        best = len(self.categories)
+        match = search(text)
+        while match is not None:
+            start = match.start()
+            for keyword, rank in self.starting_with[text[start]]:
+                if rank >= best:
+                    break
+                if text.startswith(keyword, start):
+                    best = rank
+                    break
+            if best == 0:
+                break
+            match = search(text, start + 1)
+        return self.categories[best] if best < len(self.categories) else self.default
+
+    def classify(self, tech_stack):
+        """Category for one tech stack (list or string)"""
+        return self._classify_text(tech_stack_text(tech_stack))
+
+    def classify_projects(self, projects):
+        """Categories for a batch of project dicts, in order"""
+        return [self.classify(project.get('technologies', '')) for project in projects]
+
+
+_default_classifier = CategoryClassifier()
+
+
+def classify_tech_stack(tech_stack):
+    """Category for a tech stack using the default keyword table"""
+    return _default_classifier.classify(tech_stack)
+
+
+def classify_projects(projects):
+    """Categories for a batch of projects using the default keyword table"""
+    return _default_classifier.classify_projects(projects)
@@ -0,0 +1,82 @@
+"""Filtered, projected queries used by the project maintenance scripts.
+
+Each helper pushes as much of its filter down to Firestore as the query
+language allows and uses select() so only the fields the caller needs
+are sent back. Filters Firestore can't express (e.g. "field is missing"
+or "field is not an array") are finished client-side on the projected
+documents.
+
+Every query here is a single-field equality or range filter, which
+Firestore serves from its automatic single-field indexes, so none needs a
+composite index. firestore.indexes.json instead exempts the large text
+fields no query touches from indexing.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+PROJECTS = 'projects'
+
+# Projection that returns document names only
+KEYS_ONLY = ['__name__']
+# Most values Firestore accepts in one 'in' filter
+IN_QUERY_LIMIT = 30
+MAX_WORKERS = 4
+
+
+def projects_with_unsplit_technologies(db, fields=('title', 'technologies')):
+    """Projects that have a technologies field which isn't a list.
+
+    That covers strings and null but also numbers, booleans, maps and any
+    other type. A query can only match one type at a time, so this scans
+    the collection, fetching only ``fields`` and technologies.
+    """
+    fields = list(dict.fromkeys(list(fields) + ['technologies']))
+    for doc in db.collection(PROJECTS).select(fields).stream():
+        data = doc.to_dict()
+        if 'technologies' in data and not isinstance(data['technologies'], list):
+            yield doc
+
+
+def projects_missing_slug(db, fields=('title', 'slug')):
+    """Projects with a missing, empty or null slug.
+
+    Firestore can't query for a missing field, so this scans the collection,
+    but fetches only ``fields`` of each document.
+    """
+    for doc in db.collection(PROJECTS).select(list(fields)).stream():
+        if not doc.to_dict().get('slug'):
+            yield doc
+
+
+def project_refs_by_slug(db, slug):
+    """References to every project with the given slug, without their data."""
+    query = db.collection(PROJECTS).where('slug', '==', slug).select(KEYS_ONLY)
+    return [doc.reference for doc in query.stream()]
+
+
+def project_ids_by_slugs(db, slugs, max_workers=MAX_WORKERS):
+    """{slug: [doc_id, ...]} for the given slugs; slugs without a project are left out.
+
+    Slugs are looked up IN_QUERY_LIMIT at a time with 'in' queries, run
+    concurrently, fetching only the slug of each match.
+    """
+    slugs = list(dict.fromkeys(slugs))
+    chunks = [slugs[start:start + IN_QUERY_LIMIT] for start in range(0, len(slugs), IN_QUERY_LIMIT)]
+
+    def lookup(chunk):
+        query = db.collection(PROJECTS).where('slug', 'in', chunk).select(['slug'])
+        return [(doc.to_dict()['slug'], doc.id) for doc in query.stream()]
+
+    found = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for matches in executor.map(lookup, chunks):
+            for slug, doc_id in matches:
+                found.setdefault(slug, []).append(doc_id)
+    return found
+
+
+def projects_where(db, filters, fields=('slug',)):
+    """Projects matching every (field, op, value) filter, with only ``fields`` fetched."""
+    query = db.collection(PROJECTS)
+    for field_path, op, value in filters:
+        query = query.where(field_path, op, value)
+    return query.select(list(fields)).stream()
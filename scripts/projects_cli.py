@@ -0,0 +1,135 @@
+"""Run several project maintenance passes over a single scan of the collection.
+
+    python projects_cli.py standardize images technologies slugify dedup [--dry-run]
+
+Any subset of passes can be given; they always run in the order below,
+because standardize rebuilds documents from a fixed set of fields, images
+describes the cover images standardize may have added (see
+image_pipeline.py) and dedup needs the per-document fixes applied first.
+Each document is read once, run through the per-document transforms,
+then dedup runs over the whole set, and finally every changed document
+is written at most once (deleted duplicates are removed) by executing
+one write plan.
+"""
+import argparse
+import copy
+from datetime import datetime
+from functools import partial
+
+from content_hash import content_hash
+from firestore_client import db
+from fix_project_technologies import split_technologies
+from image_pipeline import process_project_images
+from merge_projects import merge_projects
+from text_normalize import create_slug
+from update_projects import resolve_cover_images, standardize_project
+from write_plan import WritePlan, execute_plan
+
+
+def standardize_pass(project, images=None):
+    standardized = standardize_project(project, images)
+    # standardize_project() keeps a fixed schema; don't lose the id or slug
+    standardized['id'] = project['id']
+    if project.get('slug'):
+        standardized['slug'] = project['slug']
+    return standardized
+
+
+def technologies_pass(project):
+    if not isinstance(project.get('technologies', []), list):
+        project['technologies'] = split_technologies(project['technologies'])
+    return project
+
+
+def slugify_pass(project):
+    if not project.get('slug') and project.get('title'):
+        project['slug'] = create_slug(project['title'])
+    return project
+
+
+DOCUMENT_PASSES = {
+    'standardize': standardize_pass,
+    'technologies': technologies_pass,
+    'slugify': slugify_pass,
+}
+PASS_ORDER = ['standardize', 'images', 'technologies', 'slugify', 'dedup']
+
+
+def run_passes(projects, passes, dry_run=False):
+    """Apply the passes to a list of projects (each with an 'id').
+
+    Returns (projects to write, ids to delete); projects that came out
+    unchanged are left out. With ``dry_run`` nothing is fetched: standardize
+    only uses cached cover images and the images pass only images already
+    downloaded and processed.
+    """
+    original_hashes = {project['id']: content_hash(project) for project in projects}
+
+    for name in PASS_ORDER:
+        if name == 'images' and name in passes:
+            # Downloads and resizes all the images together
+            process_project_images(projects, dry_run=dry_run)
+        elif name in DOCUMENT_PASSES and name in passes:
+            transform = DOCUMENT_PASSES[name]
+            if name == 'standardize':
+                # Look up the missing cover images together, once per query
+                transform = partial(standardize_pass, images=resolve_cover_images(projects, dry_run=dry_run))
+            projects = [transform(project) for project in projects]
+
+    to_delete = set()
+    if 'dedup' in passes:
+        _, duplicates = merge_projects(projects)
+        to_delete = set(duplicates)
+
+    to_write = [
+        project for project in projects
+        if project['id'] not in to_delete and content_hash(project) != original_hashes[project['id']]
+    ]
+    return to_write, sorted(to_delete)
+
+
+def plan_passes(projects, passes, dry_run=False):
+    """Write plan for the passes: a set per changed project, a delete per duplicate."""
+    originals = {project['id']: copy.deepcopy(project) for project in projects}
+    to_write, to_delete = run_passes(projects, passes, dry_run)
+
+    plan = WritePlan('projects_cli ' + ' '.join(p for p in PASS_ORDER if p in passes))
+    now = datetime.now()
+    for project in to_write:
+        data = {key: value for key, value in project.items() if key != 'id'}
+        data['updated_at'] = now
+        before = {key: value for key, value in originals[project['id']].items() if key != 'id'}
+        plan.set('projects', project['id'], data, before=before)
+    for project_id in to_delete:
+        plan.delete('projects', project_id, before=originals[project_id])
+    return plan
+
+
+def run(passes, dry_run=False, plan_path=None):
+    """Scan the projects collection once, run the passes and write the result."""
+    projects = []
+    for doc in db.collection('projects').stream():
+        project = doc.to_dict()
+        project['id'] = doc.id
+        projects.append(project)
+    print(f"Read {len(projects)} projects")
+
+    plan = plan_passes(projects, passes, dry_run)
+    print(plan.report(show_diffs=dry_run))
+    if plan_path:
+        plan.save(plan_path)
+        print(f"Plan saved to {plan_path}")
+    if not dry_run:
+        print(execute_plan(plan, db).report())
+    return plan
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Project maintenance passes over one collection scan.')
+    parser.add_argument('passes', nargs='+', choices=PASS_ORDER, metavar='PASS',
+                        help=f"one or more of: {', '.join(PASS_ORDER)}")
+    parser.add_argument('--dry-run', action='store_true', help='report the writes without making them')
+    parser.add_argument('--plan', metavar='FILE', help='save the write plan as JSON')
+    args = parser.parse_args()
+
+    run(set(args.passes), dry_run=args.dry_run, plan_path=args.plan)
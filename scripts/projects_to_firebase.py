@@ -1,18 +1,5 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+from firestore_client import db
 import datetime
-import os
-from dotenv import load_dotenv
-
-# Load environment variables
-load_dotenv()
-
-# Initialize Firebase Admin
-cred = credentials.Certificate(os.getenv('FIREBASE_ADMIN_SDK_PATH'))
-if not firebase_admin._apps:
-    firebase_admin.initialize_app(cred)
-
-db = firestore.client()
 
 # Project data with all required fields
 projects = [
@@ -0,0 +1,109 @@
+"""Single-pass field coverage and type profiling for Firestore documents.
+
+Every document is visited once and folded into per-field column counters
+(presence, nulls, value types), so documents can come from a live stream
+or a snapshot reader without all of them being held in memory. Maps are
+profiled down to ``max_depth`` levels as dotted paths (``coverImage.url``)
+and list elements under ``field[]``.
+"""
+from collections import Counter, defaultdict
+from datetime import datetime
+
+
+def type_name(value):
+    """Firestore-flavoured name of a value's type."""
+    if value is None:
+        return 'null'
+    if isinstance(value, bool):
+        return 'boolean'
+    if isinstance(value, int):
+        return 'integer'
+    if isinstance(value, float):
+        return 'double'
+    if isinstance(value, str):
+        return 'string'
+    if isinstance(value, datetime):
+        return 'timestamp'
+    if isinstance(value, dict):
+        return 'map'
+    if isinstance(value, (list, tuple)):
+        return 'array'
+    return type(value).__name__
+
+
+class SchemaProfile:
+    """Column counters for every field path seen across a set of documents."""
+
+    def __init__(self, max_depth=2):
+        self.max_depth = max_depth
+        self.documents = 0
+        self.present = Counter()
+        self.empty = Counter()
+        self.types = defaultdict(Counter)
+
+    @classmethod
+    def from_documents(cls, documents, max_depth=2):
+        profile = cls(max_depth)
+        for document in documents:
+            profile.add(document)
+        return profile
+
+    def add(self, document):
+        self.documents += 1
+        self._add_map(document, '', 0)
+
+    def _add_map(self, mapping, prefix, depth):
+        for key, value in mapping.items():
+            path = prefix + key
+            kind = type_name(value)
+            self.present[path] += 1
+            self.types[path][kind] += 1
+            if kind in ('string', 'array', 'map') and not value:
+                self.empty[path] += 1
+            if kind == 'map' and depth + 1 < self.max_depth:
+                self._add_map(value, path + '.', depth + 1)
+            elif kind == 'array':
+                element_path = path + '[]'
+                for element in value:
+                    self.present[element_path] += 1
+                    self.types[element_path][type_name(element)] += 1
+
+    def total(self, path):
+        """How many values the path could have had: documents, parent maps or list elements."""
+        if path.endswith('[]'):
+            return self.present[path]
+        if '.' in path:
+            return self.types[path.rsplit('.', 1)[0]]['map']
+        return self.documents
+
+    def fields(self):
+        """Top-level field names, sorted."""
+        return sorted(path for path in self.present if '.' not in path and not path.endswith('[]'))
+
+    def summary(self):
+        """Plain dict of the profile, e.g. for dumping to JSON."""
+        return {
+            path: {
+                'present': self.present[path],
+                'total': self.total(path),
+                'null': self.types[path]['null'],
+                'empty': self.empty[path],
+                'types': dict(self.types[path].most_common()),
+            }
+            for path in sorted(self.present)
+        }
+
+    def report(self, label='projects'):
+        """Coverage, null/empty counts and type mix for every field path."""
+        lines = []
+        for path, stats in self.summary().items():
+            types = ', '.join(f"{kind} {count}" for kind, count in stats['types'].items())
+            if path.endswith('[]'):
+                lines.append(f"{path}: {stats['present']} elements ({types})")
+                continue
+            of = label if '.' not in path else 'maps'
+            lines.append(
+                f"{path}: {stats['present']}/{stats['total']} {of}, "
+                f"null {stats['null']}, empty {stats['empty']} ({types})"
+            )
+        return '\n'.join(lines)
@@ -0,0 +1,344 @@
+"""Offline full-text search index for projects and publications.
+
+    python search_index.py build [INDEX_DIR] [--snapshot FILE] [--full]
+    python search_index.py search [INDEX_DIR] "query words" [--limit N]
+
+Documents are tokenized with text_normalize.normalize_words(), the same
+normalization normalize_title() applies for duplicate detection, except
+that 'game' is kept as a search term and punctuation separates words
+instead of being deleted: "node.js" gives ``node`` and ``js`` plus the
+glued ``nodejs``, and language names like ``c++`` and ``c#`` are kept
+whole (deleting the symbols would leave ``c``, a prefix of everything).
+Each field's words count with the field's weight in FIELD_WEIGHTS, and
+every posting stores its precomputed BM25 score, so answering a query
+just adds up the postings of its terms; the last query word also matches
+as a prefix (``dock`` finds ``docker``).
+
+INDEX_DIR (default ``search_index``) holds:
+
+- ``meta.json``: the documents (collection, id, title, slug) by number,
+  the BM25 parameters and which shard holds which term prefix.
+- ``terms-<prefix>.json``: the sorted terms starting with that prefix
+  (searched by bisection for prefix matches) and, per term, its postings
+  as delta-encoded document numbers and scores scaled by SCORE_SCALE.
+- ``state.json``: each document's term frequencies and version, from
+  which the shards are rebuilt, and the TOKENIZER_VERSION they were
+  tokenized with (a build after a tokenizer change starts over).
+
+A rebuild only re-reads and re-tokenizes documents whose ``updated_at``
+changed since the last build. Documents without a timestamp are compared
+by content (from a snapshot) or fetched again (from Firestore), and
+deleted documents are dropped. Every build rewrites the shards, because
+BM25 scores depend on the collection-wide statistics.
+"""
+import argparse
+import json
+import math
+import os
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from content_hash import document_digest
+from snapshot import SnapshotReader
+from text_normalize import STOP_WORDS, normalize_words
+
+DEFAULT_INDEX_DIR = 'search_index'
+STATE_FILE = 'state.json'
+META_FILE = 'meta.json'
+INDEXED_COLLECTIONS = ('projects', 'publications')
+FIELD_WEIGHTS = {'title': 3.0, 'technologies': 2.0, 'description': 1.0, 'details': 1.0}
+VERSION_FIELD = 'updated_at'
+# Standard BM25 parameters
+K1 = 1.2
+B = 0.75
+SCORE_SCALE = 1000
+SHARD_PREFIX_LENGTH = 1
+# Bumped when tokenize() changes, so documents indexed by an older version get re-tokenized
+TOKENIZER_VERSION = 2
+# 'game' is only dropped to match titles like "Snake Game" and "Snake"
+SEARCH_STOP_WORDS = STOP_WORDS - {'game'}
+# Words, with the ++ or # of names like c++ and c#; any other punctuation separates them
+_SEARCH_WORDS = re.compile(r'\w+(?:\+\+|#)?')
+
+
+def field_text(value):
+    """Searchable text of a field holding a string or a list of strings."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, list):
+        return ' '.join(item for item in value if isinstance(item, str))
+    return ''
+
+
+def tokenize(text):
+    """Search terms of a text, with the glued form of punctuated words as an extra term."""
+    terms = []
+    for chunk in text.lower().split():
+        words = _SEARCH_WORDS.findall(chunk)
+        for word in words:
+            if word.endswith(('+', '#')):
+                terms.append(word)
+            else:
+                terms += normalize_words(word, SEARCH_STOP_WORDS)
+        if len(words) > 1:
+            glued = normalize_words(''.join(words), SEARCH_STOP_WORDS)
+            if len(glued) == 1 and glued[0] not in words:
+                terms += glued
+    return terms
+
+
+def term_frequencies(data):
+    """{term: weighted frequency} over the indexed fields of a document."""
+    frequencies = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for term in tokenize(field_text(data.get(field))):
+            frequencies[term] += weight
+    return frequencies
+
+
+def document_version(data):
+    """The document's updated_at, or a digest of its indexed fields if it has none."""
+    value = data.get(VERSION_FIELD)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return document_digest({field: data.get(field) for field in FIELD_WEIGHTS})
+
+
+def _shard_key(term):
+    return term[:SHARD_PREFIX_LENGTH]
+
+
+class SearchIndexBuilder:
+    """Per-document term frequencies, kept between builds, and the shards built from them."""
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        self.index_dir = index_dir
+        self.documents = {}
+        path = os.path.join(index_dir, STATE_FILE)
+        if os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            if state.get('tokenizer') == TOKENIZER_VERSION:
+                self.documents = state['documents']
+        self.indexed = 0
+        self.removed = 0
+
+    @staticmethod
+    def key(collection, doc_id):
+        return f"{collection}/{doc_id}"
+
+    def is_current(self, collection, doc_id, version):
+        entry = self.documents.get(self.key(collection, doc_id))
+        return entry is not None and entry['version'] == version
+
+    def add(self, collection, doc_id, data):
+        self.documents[self.key(collection, doc_id)] = {
+            'version': document_version(data),
+            'title': data.get('title') if isinstance(data.get('title'), str) else None,
+            'slug': data.get('slug') if isinstance(data.get('slug'), str) else None,
+            'terms': term_frequencies(data),
+        }
+        self.indexed += 1
+
+    def remove_missing(self, collection, live_ids):
+        """Drop the collection's documents that aren't in ``live_ids`` any more."""
+        prefix = collection + '/'
+        for key in [key for key in self.documents if key.startswith(prefix)]:
+            if key[len(prefix):] not in live_ids:
+                del self.documents[key]
+                self.removed += 1
+
+    def update_from_snapshot(self, reader, collection):
+        live_ids = set()
+        for doc_id, data in reader.iter_documents(collection):
+            if data is None:
+                continue
+            live_ids.add(doc_id)
+            if not self.is_current(collection, doc_id, document_version(data)):
+                self.add(collection, doc_id, data)
+        self.remove_missing(collection, live_ids)
+
+    def update_from_firestore(self, db, collection):
+        """Fetch only the new documents and those whose updated_at changed."""
+        collection_ref = db.collection(collection)
+        live_ids = set()
+        stale = []
+        for doc in collection_ref.select([VERSION_FIELD]).stream():
+            live_ids.add(doc.id)
+            value = doc.to_dict().get(VERSION_FIELD)
+            # Without a timestamp there's no telling whether it changed
+            if not isinstance(value, datetime) or not self.is_current(collection, doc.id, value.isoformat()):
+                stale.append(collection_ref.document(doc.id))
+        if stale:
+            for doc in db.get_all(stale):
+                data = doc.to_dict()
+                if data is not None and not self.is_current(collection, doc.id, document_version(data)):
+                    self.add(collection, doc.id, data)
+        self.remove_missing(collection, live_ids)
+
+    def _shards(self):
+        """(documents table, {shard key: {term: postings}}) with BM25 scores."""
+        keys = sorted(self.documents)
+        table = []
+        lengths = []
+        for key in keys:
+            entry = self.documents[key]
+            collection, doc_id = key.split('/', 1)
+            table.append([collection, doc_id, entry['title'], entry['slug']])
+            lengths.append(sum(entry['terms'].values()))
+        count = len(keys)
+        average_length = sum(lengths) / count if count else 0.0
+
+        postings = defaultdict(list)
+        for number, key in enumerate(keys):
+            for term, frequency in self.documents[key]['terms'].items():
+                postings[term].append((number, frequency))
+
+        shards = defaultdict(dict)
+        for term, entries in postings.items():
+            idf = math.log(1 + (count - len(entries) + 0.5) / (len(entries) + 0.5))
+            encoded = []
+            previous = 0
+            for number, frequency in entries:
+                norm = K1 * (1 - B + B * lengths[number] / average_length)
+                score = idf * frequency * (K1 + 1) / (frequency + norm)
+                encoded += [number - previous, max(1, round(score * SCORE_SCALE))]
+                previous = number
+            shards[_shard_key(term)][term] = encoded
+        return table, average_length, shards
+
+    def save(self):
+        """Write the shards, meta.json and the state, replacing the previous build."""
+        os.makedirs(self.index_dir, exist_ok=True)
+        table, average_length, shards = self._shards()
+        old_files = {name for name in os.listdir(self.index_dir) if name.startswith('terms-')}
+        files = {}
+        for shard_key, terms in shards.items():
+            name = f"terms-{shard_key.encode('utf-8').hex()}.json"
+            ordered = sorted(terms)
+            _write_json(os.path.join(self.index_dir, name),
+                        {'terms': ordered, 'postings': [terms[term] for term in ordered]})
+            files[shard_key] = name
+        _write_json(os.path.join(self.index_dir, META_FILE), {
+            'built_at': datetime.now().isoformat(),
+            'k1': K1,
+            'b': B,
+            'score_scale': SCORE_SCALE,
+            'average_length': average_length,
+            'prefix_length': SHARD_PREFIX_LENGTH,
+            'shards': files,
+            'documents': table,
+        })
+        for name in old_files - set(files.values()):
+            os.remove(os.path.join(self.index_dir, name))
+        # Written last: a build interrupted before this point is redone in full next time
+        _write_json(os.path.join(self.index_dir, STATE_FILE),
+                    {'tokenizer': TOKENIZER_VERSION, 'documents': self.documents})
+        return len(table), len(files)
+
+
+def _write_json(path, value):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(value, f, separators=(',', ':'), ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def build_index(index_dir=DEFAULT_INDEX_DIR, snapshot=None, full=False, collections=INDEXED_COLLECTIONS):
+    """Bring the index in ``index_dir`` up to date with a snapshot or the live collections."""
+    builder = SearchIndexBuilder(index_dir)
+    if full:
+        builder.documents = {}
+    if snapshot:
+        reader = SnapshotReader(snapshot)
+        for collection in collections:
+            builder.update_from_snapshot(reader, collection)
+    else:
+        from firestore_client import db
+        for collection in collections:
+            builder.update_from_firestore(db, collection)
+    documents, shards = builder.save()
+    print(f"Indexed {builder.indexed} new or changed documents, removed {builder.removed}; "
+          f"{documents} documents in {shards} shards in {index_dir}")
+    return builder
+
+
+class SearchIndex:
+    """Query side: loads meta.json up front and term shards only when a query needs them."""
+
+    def __init__(self, index_dir=DEFAULT_INDEX_DIR):
+        self.index_dir = index_dir
+        with open(os.path.join(index_dir, META_FILE), 'r') as f:
+            self.meta = json.load(f)
+        self._shards = {}
+
+    def _shard(self, shard_key):
+        if shard_key not in self._shards:
+            name = self.meta['shards'].get(shard_key)
+            shard = {'terms': [], 'postings': []}
+            if name:
+                with open(os.path.join(self.index_dir, name), 'r') as f:
+                    shard = json.load(f)
+            self._shards[shard_key] = shard
+        return self._shards[shard_key]
+
+    def matching_terms(self, word, prefix=False):
+        """Indexed terms equal to ``word`` or, with ``prefix``, starting with it: [(term, postings)]"""
+        shard = self._shard(word[:self.meta['prefix_length']])
+        terms = shard['terms']
+        position = bisect_left(terms, word)
+        matches = []
+        while position < len(terms) and (terms[position] == word or (prefix and terms[position].startswith(word))):
+            matches.append((terms[position], shard['postings'][position]))
+            position += 1
+            if not prefix:
+                break
+        return matches
+
+    def search(self, query, limit=10, prefix=True):
+        """[(score, collection, doc_id, title, slug)] best first."""
+        words = list(dict.fromkeys(tokenize(query)))
+        scores = Counter()
+        for position, word in enumerate(words):
+            # The last word may still be being typed
+            as_prefix = prefix and position == len(words) - 1
+            best = {}
+            for _, postings in self.matching_terms(word, as_prefix):
+                number = 0
+                for i in range(0, len(postings), 2):
+                    number += postings[i]
+                    best[number] = max(best.get(number, 0), postings[i + 1])
+            # A word expanding to several terms counts once per document
+            for number, score in best.items():
+                scores[number] += score
+        documents = self.meta['documents']
+        scale = self.meta['score_scale']
+        return [
+            (score / scale, *documents[number])
+            for number, score in scores.most_common(limit)
+        ]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build or query the offline search index.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='create or update the index')
+    build_parser.add_argument('index_dir', nargs='?', default=DEFAULT_INDEX_DIR)
+    build_parser.add_argument('--snapshot', metavar='FILE', help='index an export or snapshot instead of Firestore')
+    build_parser.add_argument('--full', action='store_true', help='re-tokenize every document')
+    search_parser = commands.add_parser('search', help='query the index')
+    search_parser.add_argument('index_dir', nargs='?', default=DEFAULT_INDEX_DIR)
+    search_parser.add_argument('query')
+    search_parser.add_argument('--limit', type=int, default=10)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        build_index(args.index_dir, args.snapshot, args.full)
+    else:
+        results = SearchIndex(args.index_dir).search(args.query, args.limit)
+        for score, collection, doc_id, title, slug in results:
+            print(f"{score:7.3f}  {collection}/{doc_id}  {title or ''}")
+        if not results:
+            print("No matches")
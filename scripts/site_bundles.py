@@ -0,0 +1,244 @@
+"""Static, precompressed JSON bundles of the site's collections.
+
+    python site_bundles.py [OUTPUT_DIR]                  # from Firestore
+    python site_bundles.py [OUTPUT_DIR] --snapshot FILE  # from an export or snapshot
+
+The site reads projects, timeline, skills, certificates, affiliations and
+publications from Firestore on every visit. This writes them as static
+files the CDN can serve instead (OUTPUT_DIR defaults to ../public/data, which
+the Vite build copies into dist/):
+
+- ``index.json``: per collection its document count, content hash and shard
+  files, each with its own hash, so the front end can load the index first
+  and then only the shards it needs.
+- ``<collection>-<n>.json``: the documents, SHARD_SIZE per file, in the order
+  the site queries them (projects newest first, affiliations by ``order``).
+  As with the site's queries, documents without the ordered field are left
+  out. Projects are sharded as list summaries (the fields project cards
+  show), each with the ``detail`` path of the project's full document:
+  ``projects/<slug>.json``, or ``projects/<id>.json`` if the slug isn't a
+  safe file name or another project has it too.
+
+Every file is written minified alongside ``.gz`` and, if the brotli
+package is installed, ``.br`` versions. Files are only rewritten when
+their content hash changed since the last build, which is recorded in
+``bundle_hashes.json`` in the output directory. Files a build no longer
+produces are removed.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+from collections import Counter
+from datetime import datetime, timezone
+
+from content_hash import document_digest
+from snapshot import SnapshotReader, json_default
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BUNDLE_COLLECTIONS = ('projects', 'timeline', 'skills', 'certificates', 'affiliations', 'publications')
+DEFAULT_OUTPUT_DIR = os.path.join('..', 'public', 'data')
+HASH_FILE = 'bundle_hashes.json'
+SHARD_SIZE = 50
+# Field sorted on, and whether descending, matching the site's queries
+ORDER_BY = {'projects': ('created_at', True), 'affiliations': ('order', False)}
+# Project fields a list card needs; the rest stay in the per-project file
+PROJECT_SUMMARY_FIELDS = ('title', 'slug', 'description', 'category', 'status', 'featured',
+                          'year', 'technologies', 'coverImage', 'created_at')
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+SAFE_NAME = re.compile(r'^[A-Za-z0-9][A-Za-z0-9_-]*$')
+
+
+def iter_live_documents(name):
+    """(doc_id, data) for a Firestore collection, read a page at a time."""
+    from firebase_export import iter_collection_pages
+
+    for page in iter_collection_pages(name):
+        for doc in page:
+            yield doc.id, doc.to_dict()
+
+
+def _sort_value(value):
+    """Sort key following Firestore's value ordering: null, booleans, numbers
+    (NaN first), timestamps, strings, bytes, arrays, then maps."""
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (1, value)
+    if isinstance(value, (int, float)):
+        return (2, 0) if value != value else (2, 1, value)
+    if isinstance(value, datetime):
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        return (3, value)
+    if isinstance(value, str):
+        return (4, value)
+    if isinstance(value, bytes):
+        return (5, value)
+    if isinstance(value, (list, tuple)):
+        return (8, [_sort_value(item) for item in value])
+    if isinstance(value, dict):
+        return (9, [(key, _sort_value(value[key])) for key in sorted(value)])
+    return (6, str(value))
+
+
+def ordered_documents(name, documents):
+    """Documents as dicts with their ``id``, in the order the site shows them."""
+    # Firestore returns documents in ID order unless asked otherwise
+    documents = sorted(((doc_id, data) for doc_id, data in documents if data is not None), key=lambda item: item[0])
+    if name in ORDER_BY:
+        field, descending = ORDER_BY[name]
+        # Like a Firestore order_by: documents without the field are left out, an
+        # explicit null sorts before any other value and ties go by ID, all in
+        # the query's direction
+        documents = [(doc_id, data) for doc_id, data in documents if field in data]
+        documents.sort(key=lambda item: (_sort_value(item[1][field]), item[0]), reverse=descending)
+    # Like the site's {id: doc.id, ...doc.data()}, an id field in the data wins
+    return [dict({'id': doc_id}, **data) for doc_id, data in documents]
+
+
+def project_summary(project):
+    summary = {key: project[key] for key in PROJECT_SUMMARY_FIELDS if key in project}
+    summary['id'] = project['id']
+    cover = summary.get('coverImage')
+    if isinstance(cover, dict):
+        # Cards only show the image; credits are on the project page
+        summary['coverImage'] = cover.get('url')
+    return summary
+
+
+def detail_names(projects):
+    """File name stems of the projects' full documents, in the same order.
+
+    The stem is the project's slug, or its ID if the slug won't do as a
+    file name or is shared with another project (or another project's ID).
+    """
+    slugs = Counter(project.get('slug') for project in projects)
+    ids = {project['id'] for project in projects}
+    names = []
+    for project in projects:
+        slug = project.get('slug')
+        usable = (isinstance(slug, str) and SAFE_NAME.match(slug) and slugs[slug] == 1
+                  and (slug == project['id'] or slug not in ids))
+        names.append(slug if usable else project['id'])
+    return names
+
+
+def encode_bundle(value):
+    return json.dumps(value, default=json_default, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+class BundleBuilder:
+    """Writes bundle files, skipping the ones whose content hash is unchanged."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.hash_path = os.path.join(output_dir, HASH_FILE)
+        self.previous = {}
+        if os.path.exists(self.hash_path):
+            with open(self.hash_path, 'r') as f:
+                self.previous = json.load(f)
+        self.hashes = {}
+        self.written = 0
+        self.unchanged = 0
+
+    def write(self, relative_path, value, digest=None):
+        """Write one bundle (and its compressed copies) if it changed; returns its hash.
+
+        ``digest`` overrides the hash of ``value``, e.g. to leave out a build time.
+        """
+        digest = digest or document_digest(value)[:16]
+        self.hashes[relative_path] = digest
+        path = os.path.join(self.output_dir, relative_path)
+        variants = [path, path + '.gz'] + ([path + '.br'] if brotli else [])
+        if self.previous.get(relative_path) == digest and all(os.path.exists(p) for p in variants):
+            self.unchanged += 1
+            return digest
+
+        payload = encode_bundle(value)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        outputs = [(path, payload), (path + '.gz', gzip.compress(payload, 9, mtime=0))]
+        if brotli:
+            outputs.append((path + '.br', brotli.compress(payload, quality=11)))
+        for output_path, data in outputs:
+            tmp_path = output_path + '.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, output_path)
+        self.written += 1
+        return digest
+
+    def write_shards(self, prefix, documents):
+        """Split documents into SHARD_SIZE files; returns the index entries for them."""
+        shards = []
+        for number, start in enumerate(range(0, len(documents), SHARD_SIZE)):
+            shard = documents[start:start + SHARD_SIZE]
+            relative_path = f"{prefix}-{number}.json"
+            shards.append({'path': relative_path, 'hash': self.write(relative_path, shard), 'count': len(shard)})
+        return shards
+
+    def finish(self):
+        """Remove the files of bundles this build didn't produce and save the hashes."""
+        removed = 0
+        for relative_path in self.previous:
+            if relative_path in self.hashes:
+                continue
+            base = os.path.join(self.output_dir, relative_path)
+            for path in [base] + [base + suffix for suffix in COMPRESSED_SUFFIXES]:
+                if os.path.exists(path):
+                    os.remove(path)
+            removed += 1
+        tmp_path = self.hash_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.hashes, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.hash_path)
+        return removed
+
+
+def build_bundles(output_dir=DEFAULT_OUTPUT_DIR, snapshot=None, collections=BUNDLE_COLLECTIONS):
+    """Write the bundles and index.json for ``collections`` from Firestore or a snapshot."""
+    reader = SnapshotReader(snapshot) if snapshot else None
+    builder = BundleBuilder(output_dir)
+    index = {'collections': {}}
+    for name in collections:
+        documents = reader.iter_documents(name) if reader else iter_live_documents(name)
+        docs = ordered_documents(name, documents)
+        entry = {'count': len(docs), 'hash': document_digest(docs)[:16]}
+        if name == 'projects':
+            summaries = []
+            for project, detail in zip(docs, detail_names(docs)):
+                summary = project_summary(project)
+                summary['detail'] = f"projects/{detail}.json"
+                builder.write(summary['detail'], project)
+                summaries.append(summary)
+            entry['shards'] = builder.write_shards('projects', summaries)
+        else:
+            entry['shards'] = builder.write_shards(name, docs)
+        index['collections'][name] = entry
+        print(f"{name}: {len(docs)} documents in {len(entry['shards'])} shards")
+
+    index['compression'] = ['gzip'] + (['br'] if brotli else [])
+    # The build time doesn't count as a change, so an unchanged build leaves the index alone
+    digest = document_digest(index)[:16]
+    index['generated_at'] = datetime.now(timezone.utc).isoformat()
+    builder.write('index.json', index, digest)
+    removed = builder.finish()
+
+    print(f"Bundles in {output_dir}: {builder.written} written, {builder.unchanged} unchanged, {removed} removed")
+    if not brotli:
+        print("brotli is not installed; wrote .gz files only")
+    return index
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Build static JSON bundles of the site data.')
+    parser.add_argument('output_dir', nargs='?', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--snapshot', metavar='FILE', help='read an export or snapshot instead of Firestore')
+    args = parser.parse_args()
+
+    build_bundles(args.output_dir, args.snapshot)
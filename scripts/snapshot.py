@@ -0,0 +1,339 @@
+"""Streaming snapshot format for Firestore exports.
+
+Two encodings share the same layout: a run of documents per collection,
+each run introduced by a small header, followed by an index of where every
+collection starts so a reader can seek straight to it.
+
+NDJSON (``.ndjson``), one JSON value per line:
+
+    {"snapshot": 1, "created_at": "..."}
+    {"collection": "projects"}
+    {"id": "abc", "data": {...}, "types": {"created_at": "timestamp"}}
+    ...
+    {"index": {"projects": {"offset": 38, "count": 4, "sorted": true}, ...}}
+
+Binary (``.fsnap``): ``MAGIC``, then one independently zlib-compressed
+section per collection holding length-prefixed (4-byte big-endian) JSON
+records, the first of which is the collection header. The file ends with
+the JSON index and the 8-byte big-endian offset of that index.
+
+An index entry's ``sorted`` flag says whether the collection's documents
+were written in ascending ID order, as firebase_export.py writes them
+(snapshot_diff.py merges such collections without sorting them first).
+
+A record whose ``data`` is null is a tombstone: delta snapshots written by
+incremental_export.py use them for documents deleted since the last run.
+
+A document record's optional ``types`` map names the fields that held
+timestamps (see timestamps.py); readers turn those back into datetimes, so
+they round-trip exactly.
+
+Legacy ``firebase_export_*.json`` files can still be read, but have to be
+loaded whole, and carry no type information: the reader parses the
+schema's timestamp fields (timestamps.TIMESTAMP_FIELDS) of their documents
+instead.
+"""
+import json
+import os
+import struct
+import zlib
+from datetime import datetime
+
+from timestamps import apply_types, coerce_timestamps, timestamp_types
+
+FORMAT_VERSION = 1
+MAGIC = b'FSNAP\x00\x01\n'
+BINARY_EXTENSIONS = ('.fsnap',)
+NDJSON_EXTENSIONS = ('.ndjson',)
+READ_CHUNK_SIZE = 64 * 1024
+
+_LENGTH = struct.Struct('>I')
+_OFFSET = struct.Struct('>Q')
+
+
+def json_default(value):
+    """Serialize values json can't handle natively (timestamps, references...)."""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return str(value)
+
+
+def _encode(value):
+    return json.dumps(value, default=json_default, separators=(',', ':')).encode('utf-8')
+
+
+def encode_document(doc_id, data):
+    """Snapshot record for a document, noting which fields are timestamps."""
+    record = {'id': doc_id, 'data': data}
+    types = timestamp_types(data) if data is not None else None
+    if types:
+        record['types'] = types
+    return record
+
+
+def decode_document(record):
+    """(doc_id, data) from a snapshot record, with its timestamps restored."""
+    data = record['data']
+    if data is not None and 'types' in record:
+        apply_types(data, record['types'])
+    return record['id'], data
+
+
+def snapshot_format(filename):
+    """Return 'binary', 'ndjson' or 'json' based on the file extension."""
+    lowered = filename.lower()
+    if lowered.endswith(BINARY_EXTENSIONS):
+        return 'binary'
+    if lowered.endswith(NDJSON_EXTENSIONS):
+        return 'ndjson'
+    return 'json'
+
+
+class SnapshotWriter:
+    """Write a snapshot one document at a time.
+
+    Documents of a collection must be written contiguously; starting a new
+    collection closes the previous one.
+    """
+
+    def __init__(self, filename, binary=None, compression_level=6):
+        if binary is None:
+            binary = snapshot_format(filename) == 'binary'
+        self.filename = filename
+        self.binary = binary
+        self.compression_level = compression_level
+        self._file = open(filename, 'wb')
+        self._index = {}
+        self._collection = None
+        self._last_id = None
+        self._compressor = None
+        if binary:
+            self._file.write(MAGIC)
+        else:
+            self._file.write(_encode({
+                'snapshot': FORMAT_VERSION,
+                'created_at': datetime.now().isoformat()
+            }) + b'\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def begin_collection(self, name):
+        """Start the section for a collection."""
+        if name in self._index:
+            raise ValueError(f"Collection already written: {name}")
+        self._end_collection()
+        self._collection = name
+        self._index[name] = {'offset': self._file.tell(), 'count': 0, 'sorted': True}
+        self._last_id = None
+        if self.binary:
+            self._compressor = zlib.compressobj(self.compression_level)
+        self._write_record({'collection': name})
+
+    def write(self, doc_id, data):
+        """Append one document to the current collection."""
+        if self._collection is None:
+            raise ValueError("begin_collection() must be called before write()")
+        self._write_record(encode_document(doc_id, data))
+        entry = self._index[self._collection]
+        entry['count'] += 1
+        if self._last_id is not None and doc_id <= self._last_id:
+            entry['sorted'] = False
+        self._last_id = doc_id
+
+    def write_tombstone(self, doc_id):
+        """Record that a document was deleted (delta snapshots only)."""
+        self.write(doc_id, None)
+
+    def write_collection(self, name, documents):
+        """Write a whole collection from an iterable of (doc_id, data) pairs."""
+        self.begin_collection(name)
+        for doc_id, data in documents:
+            self.write(doc_id, data)
+
+    def _write_record(self, record):
+        payload = _encode(record)
+        if self.binary:
+            self._file.write(self._compressor.compress(_LENGTH.pack(len(payload)) + payload))
+        else:
+            self._file.write(payload + b'\n')
+
+    def _end_collection(self):
+        if self._collection is None:
+            return
+        if self.binary:
+            self._file.write(self._compressor.flush())
+            self._compressor = None
+            entry = self._index[self._collection]
+            entry['length'] = self._file.tell() - entry['offset']
+        self._collection = None
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._end_collection()
+        if self.binary:
+            index_offset = self._file.tell()
+            self._file.write(_encode({'index': self._index}))
+            self._file.write(_OFFSET.pack(index_offset))
+        else:
+            self._file.write(_encode({'index': self._index}) + b'\n')
+        self._file.close()
+
+
+class SnapshotReader:
+    """Read a snapshot written by SnapshotWriter (or a legacy JSON export)."""
+
+    def __init__(self, filename):
+        self.filename = filename
+        self.format = snapshot_format(filename)
+        self._legacy = None
+        self._index = None
+
+    @property
+    def index(self):
+        if self._index is None:
+            if self.format == 'binary':
+                self._index = self._read_binary_index()
+            elif self.format == 'ndjson':
+                self._index = self._read_ndjson_index()
+            else:
+                self._index = {
+                    name: {'count': len(documents)} for name, documents in self._load_legacy().items()
+                }
+        return self._index
+
+    def collections(self):
+        """Names of the collections in the snapshot, in file order."""
+        return list(self.index)
+
+    def iter_documents(self, collection_name):
+        """Yield (doc_id, data) for one collection without parsing the others."""
+        if collection_name not in self.index:
+            return
+        if self.format == 'binary':
+            yield from self._iter_binary_section(self.index[collection_name])
+        elif self.format == 'ndjson':
+            yield from self._iter_ndjson_section(self.index[collection_name])
+        else:
+            for doc_id, data in self._load_legacy()[collection_name].items():
+                yield doc_id, coerce_timestamps(data) if isinstance(data, dict) else data
+
+    def __iter__(self):
+        """Yield (collection, doc_id, data) for every document."""
+        for name in self.collections():
+            for doc_id, data in self.iter_documents(name):
+                yield name, doc_id, data
+
+    def _load_legacy(self):
+        if self._legacy is None:
+            with open(self.filename, 'r') as f:
+                self._legacy = json.load(f)
+        return self._legacy
+
+    def _read_ndjson_index(self):
+        # The index is the last line; read backwards until its newline
+        with open(self.filename, 'rb') as f:
+            f.seek(0, os.SEEK_END)
+            end = f.tell()
+            position = end
+            tail = b''
+            while position > 0:
+                step = min(READ_CHUNK_SIZE, position)
+                position -= step
+                f.seek(position)
+                tail = f.read(step) + tail
+                if tail.rstrip(b'\n').count(b'\n') >= 1:
+                    break
+        last_line = tail.rstrip(b'\n').rsplit(b'\n', 1)[-1]
+        record = json.loads(last_line)
+        if 'index' not in record:
+            raise ValueError(f"{self.filename} has no snapshot index (truncated?)")
+        return record['index']
+
+    def _iter_ndjson_section(self, entry):
+        with open(self.filename, 'rb') as f:
+            f.seek(entry['offset'])
+            f.readline()  # collection header
+            for line in f:
+                record = json.loads(line)
+                if 'id' not in record:
+                    return
+                yield decode_document(record)
+
+    def _read_binary_index(self):
+        with open(self.filename, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{self.filename} is not a binary snapshot")
+            f.seek(-_OFFSET.size, os.SEEK_END)
+            footer_offset = f.tell()
+            (index_offset,) = _OFFSET.unpack(f.read(_OFFSET.size))
+            f.seek(index_offset)
+            return json.loads(f.read(footer_offset - index_offset))['index']
+
+    def _iter_binary_section(self, entry):
+        decompressor = zlib.decompressobj()
+        buffer = b''
+        header_seen = False
+        with open(self.filename, 'rb') as f:
+            f.seek(entry['offset'])
+            remaining = entry['length']
+            while True:
+                if remaining > 0:
+                    chunk = f.read(min(READ_CHUNK_SIZE, remaining))
+                    remaining -= len(chunk)
+                    buffer += decompressor.decompress(chunk)
+                    if remaining == 0:
+                        buffer += decompressor.flush()
+
+                position = 0
+                while len(buffer) - position >= _LENGTH.size:
+                    (length,) = _LENGTH.unpack_from(buffer, position)
+                    start = position + _LENGTH.size
+                    if len(buffer) < start + length:
+                        break
+                    record = json.loads(buffer[start:start + length])
+                    position = start + length
+                    if not header_seen:
+                        header_seen = True
+                        continue
+                    yield decode_document(record)
+                buffer = buffer[position:]
+
+                if remaining == 0:
+                    if buffer:
+                        raise ValueError(f"{self.filename}: truncated record in section")
+                    return
+
+
+def iter_snapshot(filename):
+    """Yield (collection, doc_id, data) for every document in any snapshot format."""
+    return iter(SnapshotReader(filename))
+
+
+def iter_collection(filename, collection_name):
+    """Yield (doc_id, data) for a single collection of a snapshot."""
+    return SnapshotReader(filename).iter_documents(collection_name)
+
+
+def convert_snapshot(source, destination):
+    """Re-encode a snapshot (e.g. a legacy JSON export) in another format."""
+    reader = SnapshotReader(source)
+    with SnapshotWriter(destination) as writer:
+        for name in reader.collections():
+            writer.write_collection(name, reader.iter_documents(name))
+    return destination
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) != 3:
+        print("Usage: python snapshot.py <source> <destination.ndjson|.fsnap>")
+        sys.exit(1)
+    convert_snapshot(sys.argv[1], sys.argv[2])
+    print(f"Wrote {sys.argv[2]} ({os.path.getsize(sys.argv[2])} bytes, "
+          f"source {os.path.getsize(sys.argv[1])} bytes)")
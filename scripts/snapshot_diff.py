@@ -0,0 +1,194 @@
+"""Compare two snapshots in one streaming pass.
+
+    python snapshot_diff.py OLD NEW                    # changed documents with field diffs
+    python snapshot_diff.py OLD NEW --summary          # counts only
+    python snapshot_diff.py OLD NEW --output changes.ndjson
+    python snapshot_diff.py CURRENT BACKUP --plan restore.json
+    python write_plan.py execute restore.json
+
+Both snapshots are read one collection at a time and merged in document ID
+order, so memory doesn't grow with their size. Collections the snapshot
+index marks as written in ID order (firebase_export.py always writes them
+that way) are merged as they are read; others are first sorted through
+temporary files, SORT_RUN_SIZE documents at a time. Legacy JSON exports
+are loaded whole anyway and are sorted in memory, with their ISO string
+timestamps parsed so they compare equal to typed ones.
+
+The changes are what turns OLD into NEW: documents only in NEW are added,
+documents only in OLD removed, and documents whose content differs
+changed. As a write plan (a set per added or changed document, a delete
+per removed one) that is the fewest writes making a database holding OLD
+hold NEW, so restoring a backup is the diff from the current state to it.
+--plan streams the plan to its file as the changes are found (see
+write_plan.PlanWriter), so it doesn't grow memory either; executing it
+with write_plan.py loads it whole.
+"""
+import argparse
+import heapq
+import json
+import tempfile
+from collections import Counter
+from itertools import islice
+
+from content_hash import document_digest
+from snapshot import SnapshotReader, decode_document, encode_document, json_default
+from write_plan import PlanWriter, WritePlan, field_diff
+
+SORT_RUN_SIZE = 50000
+CHANGES = ('added', 'removed', 'changed')
+
+
+def _doc_id(item):
+    return item[0]
+
+
+def _spill(run):
+    """Write a run of documents to a temporary file, sorted by ID."""
+    f = tempfile.TemporaryFile()
+    for doc_id, data in sorted(run, key=_doc_id):
+        record = encode_document(doc_id, data)
+        f.write(json.dumps(record, default=json_default, separators=(',', ':')).encode('utf-8') + b'\n')
+    f.seek(0)
+    return f
+
+
+def _read_run(f):
+    with f:
+        for line in f:
+            yield decode_document(json.loads(line))
+
+
+def external_sort(documents, run_size=SORT_RUN_SIZE):
+    """Yield (doc_id, data) pairs in ID order, holding at most ``run_size`` of them in memory."""
+    documents = iter(documents)
+    runs = []
+    while True:
+        run = list(islice(documents, run_size))
+        if not runs and len(run) < run_size:
+            # Small enough to sort in memory
+            yield from sorted(run, key=_doc_id)
+            return
+        if not run:
+            break
+        runs.append(_spill(run))
+    yield from heapq.merge(*[_read_run(f) for f in runs], key=_doc_id)
+
+
+def _check_order(documents, label):
+    last = None
+    for doc_id, data in documents:
+        if last is not None and doc_id <= last:
+            raise ValueError(f"{label} is not in document ID order at {doc_id!r}")
+        last = doc_id
+        yield doc_id, data
+
+
+def iter_sorted(reader, name, run_size=SORT_RUN_SIZE):
+    """(doc_id, data) of one collection in ID order; tombstones are left out."""
+    if name not in reader.index:
+        return iter(())
+    documents = ((doc_id, data) for doc_id, data in reader.iter_documents(name) if data is not None)
+    if reader.format == 'json':
+        return iter(sorted(documents, key=_doc_id))
+    if reader.index[name].get('sorted'):
+        return _check_order(documents, f"{reader.filename}/{name}")
+    return external_sort(documents, run_size)
+
+
+def _differs(before, after):
+    # Digests also treat equal naive and timezone-aware timestamps as the same
+    return before != after and document_digest(before) != document_digest(after)
+
+
+def diff_collection(old, new):
+    """Yield (change, doc_id, before, after) from two ID-ordered (doc_id, data) streams."""
+    old = iter(old)
+    new = iter(new)
+    old_item = next(old, None)
+    new_item = next(new, None)
+    while old_item is not None or new_item is not None:
+        if new_item is None or (old_item is not None and old_item[0] < new_item[0]):
+            yield 'removed', old_item[0], old_item[1], None
+            old_item = next(old, None)
+        elif old_item is None or new_item[0] < old_item[0]:
+            yield 'added', new_item[0], None, new_item[1]
+            new_item = next(new, None)
+        else:
+            if _differs(old_item[1], new_item[1]):
+                yield 'changed', new_item[0], old_item[1], new_item[1]
+            old_item = next(old, None)
+            new_item = next(new, None)
+
+
+def diff_snapshots(old_filename, new_filename, run_size=SORT_RUN_SIZE):
+    """Yield (change, collection, doc_id, before, after) turning the old snapshot into the new one."""
+    old = SnapshotReader(old_filename)
+    new = SnapshotReader(new_filename)
+    for name in sorted(set(old.collections()) | set(new.collections())):
+        changes = diff_collection(iter_sorted(old, name, run_size), iter_sorted(new, name, run_size))
+        for change, doc_id, before, after in changes:
+            yield change, name, doc_id, before, after
+
+
+def add_to_plan(plan, change, name, doc_id, before, after):
+    """Plan the write for one change: a set for added and changed documents, a delete for removed."""
+    if change == 'removed':
+        plan.delete(name, doc_id, before=before)
+    else:
+        plan.set(name, doc_id, after, before=before)
+
+
+def plan_from_diff(changes, source='snapshot_diff'):
+    """WritePlan applying diff_snapshots() output."""
+    plan = WritePlan(source)
+    for change in changes:
+        add_to_plan(plan, *change)
+    return plan
+
+
+def format_change(change, name, doc_id, before, after):
+    """One line for the document, then one per changed field."""
+    marker = {'added': '+', 'removed': '-', 'changed': '~'}[change]
+    lines = [f"{marker} {name}/{doc_id}"]
+    if change == 'changed':
+        for field, values in field_diff(before, after).items():
+            old = json.dumps(values['old'], default=json_default) if 'old' in values else '(missing)'
+            new = json.dumps(values['new'], default=json_default) if 'new' in values else '(removed)'
+            lines.append(f"      {field}: {old[:60]} -> {new[:60]}")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Streaming diff of two Firestore snapshots.')
+    parser.add_argument('old', help='snapshot or export to diff from')
+    parser.add_argument('new', help='snapshot or export to diff to')
+    parser.add_argument('--summary', action='store_true', help='print only the counts per collection')
+    parser.add_argument('--output', metavar='FILE', help='write one JSON line per change with its field diff')
+    parser.add_argument('--plan', metavar='FILE', help='save a write plan turning OLD into NEW')
+    parser.add_argument('--run-size', type=int, default=SORT_RUN_SIZE,
+                        help='documents sorted in memory at a time for unsorted collections')
+    args = parser.parse_args()
+
+    counts = Counter()
+    plan = PlanWriter(args.plan, f"snapshot_diff {args.old} -> {args.new}") if args.plan else None
+    output = open(args.output, 'w') if args.output else None
+    for change, name, doc_id, before, after in diff_snapshots(args.old, args.new, args.run_size):
+        counts[name, change] += 1
+        if not args.summary:
+            print(format_change(change, name, doc_id, before, after))
+        if output:
+            record = {'change': change, 'collection': name, 'id': doc_id, 'diff': field_diff(before, after)}
+            output.write(json.dumps(record, default=json_default, separators=(',', ':')) + '\n')
+        if plan is not None:
+            add_to_plan(plan, change, name, doc_id, before, after)
+    if output:
+        output.close()
+        print(f"Changes written to {args.output}")
+    if plan is not None:
+        plan.close()
+        print(f"Plan with {len(plan)} writes saved to {args.plan}")
+
+    for name in sorted({name for name, _ in counts}):
+        print(f"{name}: " + ', '.join(f"{counts[name, change]} {change}" for change in CHANGES))
+    if not counts:
+        print("Snapshots are identical")
@@ -0,0 +1,24 @@
+"""The scripts import each other as top-level modules, so put scripts/ on the path."""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Don't write firestore_metrics.json from test runs
+os.environ.setdefault('FIRESTORE_METRICS', '0')
+
+
+@pytest.fixture
+def fake_db():
+    """Install a FakeClient seeded with the given data as the scripts' ``db``."""
+    from fake_firestore import FakeClient
+    from firestore_client import set_db
+
+    def install(data=None):
+        client = FakeClient(data)
+        set_db(client)
+        return client
+
+    yield install
+    set_db(None)
@@ -0,0 +1,99 @@
+import threading
+import time
+
+from bulk_writer import BulkWriter
+from fake_firestore import FakeClient, InvalidArgument
+
+
+class ConcurrencyTrackingClient(FakeClient):
+    """FakeClient that records how many commits run at the same time."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.active = 0
+        self.max_active = 0
+        self._active_lock = threading.Lock()
+
+    def _rpc(self, kind):
+        if kind != 'commit':
+            return super()._rpc(kind)
+        with self._active_lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0.02)
+        finally:
+            with self._active_lock:
+                self.active -= 1
+        with self._lock:
+            self.rpc_counts[kind] += 1
+
+
+def write_projects(writer, client, count):
+    for number in range(count):
+        writer.set(client.collection('projects').document(f"p{number:03d}"), {'number': number})
+
+
+def test_counts_writes_and_batches():
+    client = FakeClient()
+    with BulkWriter(client, batch_size=10) as writer:
+        write_projects(writer, client, 25)
+    stats = writer.stats
+    assert stats.writes == 25
+    assert stats.batches == 3
+    assert stats.retries == 0
+    assert stats.failed_writes == 0
+    assert stats.finished is not None
+    assert len(client.dump()['projects']) == 25
+    assert client.rpc_counts['commit'] == 3
+
+
+def test_retries_transient_errors():
+    client = FakeClient()
+    client.fail_commits = 2
+    with BulkWriter(client, batch_size=10, max_workers=1, base_delay=0.001) as writer:
+        write_projects(writer, client, 10)
+    assert writer.stats.retries == 2
+    assert writer.stats.writes == 10
+    assert writer.stats.failed_writes == 0
+    assert len(client.dump()['projects']) == 10
+
+
+def test_gives_up_after_max_retries():
+    client = FakeClient()
+    client.fail_commits = 10
+    with BulkWriter(client, batch_size=10, max_workers=1, max_retries=2, base_delay=0.001) as writer:
+        write_projects(writer, client, 5)
+    assert writer.stats.retries == 2
+    assert writer.stats.writes == 0
+    assert writer.stats.failed_writes == 5
+    assert writer.stats.errors == ['Aborted: simulated failure']
+    assert 'projects' not in client.dump()
+
+
+def test_does_not_retry_permanent_errors():
+    client = FakeClient()
+    client.fail_commits = 1
+    client.failure = InvalidArgument
+    with BulkWriter(client, batch_size=5, max_workers=1, base_delay=0.001) as writer:
+        write_projects(writer, client, 10)
+    assert writer.stats.retries == 0
+    assert writer.stats.failed_writes == 5
+    assert writer.stats.writes == 5
+    assert writer.stats.batches == 1
+
+
+def test_bounds_batches_in_flight():
+    client = ConcurrencyTrackingClient()
+    with BulkWriter(client, batch_size=1, max_workers=8, max_in_flight=2) as writer:
+        write_projects(writer, client, 12)
+    assert writer.stats.writes == 12
+    assert client.max_active == 2
+
+
+def test_workers_bound_concurrency_by_default():
+    client = ConcurrencyTrackingClient()
+    with BulkWriter(client, batch_size=1, max_workers=3) as writer:
+        write_projects(writer, client, 12)
+    assert writer.stats.batches == 12
+    assert 1 < client.max_active <= 3
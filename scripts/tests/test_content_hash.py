@@ -0,0 +1,32 @@
+from datetime import datetime, timezone
+
+from content_hash import HashManifest, content_hash
+
+
+def test_content_hash_ignores_key_order_and_updated_at():
+    first = {'title': 'Chat', 'tags': ['a', 'b'], 'updated_at': datetime(2020, 1, 1)}
+    second = {'tags': ['a', 'b'], 'title': 'Chat', 'updated_at': datetime(2024, 1, 1)}
+    assert content_hash(first) == content_hash(second)
+    assert content_hash(first) != content_hash(dict(first, title='Chat app'))
+
+
+def test_content_hash_treats_naive_timestamps_as_utc():
+    naive = {'created_at': datetime(2021, 5, 1, 12, 0)}
+    aware = {'created_at': datetime(2021, 5, 1, 12, 0, tzinfo=timezone.utc)}
+    assert content_hash(naive) == content_hash(aware)
+
+
+def test_manifest_persists_per_namespace(tmp_path):
+    path = str(tmp_path / 'hashes.json')
+    project = {'title': 'Chat'}
+    with HashManifest('update_projects', path) as manifest:
+        manifest.record('projects', 'p1', project)
+
+    manifest = HashManifest('update_projects', path)
+    assert manifest.matches('projects', 'p1', project)
+    assert not manifest.matches('projects', 'p1', {'title': 'Chat app'})
+    assert not manifest.matches('projects', 'p2', project)
+    assert not HashManifest('other_migration', path).matches('projects', 'p1', project)
+
+    manifest.forget('projects', 'p1')
+    assert not manifest.matches('projects', 'p1', project)
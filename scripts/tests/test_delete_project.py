@@ -0,0 +1,34 @@
+import os
+
+from delete_project import delete_projects
+from fake_firestore import FakeClient
+
+
+def projects_client():
+    return FakeClient({'projects': {
+        'a': {'slug': 'chat', 'status': 'Live'},
+        'b': {'slug': 'chat', 'status': 'Archived'},
+        'c': {'slug': 'tracker', 'status': 'Archived'},
+        'd': {'slug': 'notes', 'status': 'Live'},
+    }})
+
+
+def test_deletes_by_slug_and_filter(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = projects_client()
+    delete_projects(['chat', 'missing'], client=client)
+    assert sorted(client.dump()['projects']) == ['c', 'd']
+
+    delete_projects(filters=[('status', '==', 'Archived')], client=client)
+    assert sorted(client.dump()['projects']) == ['d']
+    # No local state left behind
+    assert os.listdir(tmp_path) == []
+
+
+def test_dry_run_deletes_nothing(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    client = projects_client()
+    plan = delete_projects(['chat', 'tracker'], dry_run=True, client=client)
+    assert sorted(operation['id'] for operation in plan) == ['a', 'b', 'c']
+    assert len(client.dump()['projects']) == 4
+    assert os.listdir(tmp_path) == []
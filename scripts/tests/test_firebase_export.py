@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import firebase_export
+from firebase_export import export_collection_stream, iter_part_file
+
+PROJECTS = {
+    f'p{i}': {'title': f'Project {i}', 'created_at': datetime(2021, 1, i + 1, tzinfo=timezone.utc)}
+    for i in range(5)
+}
+
+
+class Interrupted(Exception):
+    pass
+
+
+def test_resume_after_partial_file(tmp_path, fake_db, monkeypatch):
+    fake_db({'projects': PROJECTS})
+    pages = firebase_export.iter_collection_pages
+
+    def first_page_only(*args, **kwargs):
+        for i, page in enumerate(pages(*args, **kwargs)):
+            if i == 1:
+                raise Interrupted()
+            yield page
+
+    monkeypatch.setattr(firebase_export, 'iter_collection_pages', first_page_only)
+    with pytest.raises(Interrupted):
+        export_collection_stream('projects', str(tmp_path), page_size=2)
+    data_path = tmp_path / 'projects.jsonl'
+    # A page torn off after the checkpoint was written
+    with open(data_path, 'ab') as f:
+        f.write(b'{"id":"p2","data":{"ti')
+
+    monkeypatch.setattr(firebase_export, 'iter_collection_pages', pages)
+    assert export_collection_stream('projects', str(tmp_path), page_size=2) == 5
+    assert dict(iter_part_file(str(data_path))) == PROJECTS
+    assert [doc_id for doc_id, _ in iter_part_file(str(data_path))] == sorted(PROJECTS)
+
+    # A finished collection isn't exported again
+    assert export_collection_stream('projects', str(tmp_path), page_size=2) == 5
@@ -0,0 +1,42 @@
+from datetime import datetime, timezone
+
+from fake_firestore import FakeClient
+from firebase_import_with_delete import delete_and_import_projects, replace_projects
+from snapshot import SnapshotWriter
+
+PROJECTS = {
+    'a': {'title': 'Chat', 'created_at': datetime(2021, 5, 1, tzinfo=timezone.utc)},
+    'b': {'title': 'Tracker', 'tags': ['web', 'api']},
+}
+
+
+def write_export(path, projects):
+    with SnapshotWriter(str(path)) as writer:
+        writer.write_collection('projects', projects.items())
+    return str(path)
+
+
+def test_replace_with_identical_data_writes_nothing(tmp_path):
+    filename = write_export(tmp_path / 'export.fsnap', PROJECTS)
+    client = FakeClient({'projects': PROJECTS})
+    replace_projects(filename, client=client)
+    assert client.rpc_counts['commit'] == 0
+    assert client.dump()['projects'] == PROJECTS
+
+
+def test_replace_writes_only_changes(tmp_path):
+    exported = {'a': PROJECTS['a'], 'c': {'title': 'Notes'}}
+    filename = write_export(tmp_path / 'export.ndjson', exported)
+    client = FakeClient({'projects': PROJECTS})
+    plan = replace_projects(filename, client=client, dry_run=True)
+    assert [(operation['op'], operation['id']) for operation in plan] == [('set', 'c'), ('delete', 'b')]
+
+    replace_projects(filename, client=client)
+    assert client.dump()['projects'] == exported
+
+
+def test_delete_and_import_rewrites_everything(tmp_path):
+    filename = write_export(tmp_path / 'export.fsnap', PROJECTS)
+    client = FakeClient({'projects': PROJECTS})
+    plan = delete_and_import_projects(filename, client=client, dry_run=True)
+    assert plan.counts()['set'] == 2
@@ -0,0 +1,88 @@
+import copy
+import os
+
+import pytest
+
+pytest.importorskip('aiohttp')
+pytest.importorskip('PIL')
+
+from image_pipeline import ImagePipeline, OriginalCache
+from unsplash_standin import start_standin
+
+WIDTHS = (320, 640)
+
+
+@pytest.fixture
+def server():
+    server = start_standin()
+    yield server
+    server.shutdown()
+
+
+def sample_projects(server):
+    image = f"{server.url}/images/one.jpg"
+    return [
+        {'id': 'a', 'coverImage': {'url': image, 'credit': 'Someone'},
+         # Another URL for the same bytes
+         'gallery': [f"{image}?w=1600"]},
+        {'id': 'b', 'coverImage': f"{server.url}/images/two.jpg", 'gallery': [None]},
+    ]
+
+
+def pipeline_for(tmp_path, **kwargs):
+    return ImagePipeline(cache=OriginalCache(str(tmp_path / 'cache')), output_dir=str(tmp_path / 'public'),
+                         base_url='/images', widths=WIDTHS, formats=['webp'], max_workers=1, **kwargs)
+
+
+def test_describes_images_and_skips_unchanged_ones(server, tmp_path):
+    projects = sample_projects(server)
+    first = pipeline_for(tmp_path)
+    first.process_projects(projects)
+
+    cover = projects[0]['coverImage']
+    assert cover['url'] == f"{server.url}/images/one.jpg"
+    assert cover['credit'] == 'Someone'
+    assert (cover['width'], cover['height']) == (1600, 900)
+    assert len(cover['blurhash']) == 2 + 4 + 2 * (4 * 3 - 1)
+    assert [(v['width'], v['type']) for v in cover['variants']] == [(320, 'image/webp'), (640, 'image/webp')]
+    for variant in cover['variants']:
+        assert os.path.exists(tmp_path / 'public' / variant['url'][len('/images/'):])
+    # Both URLs gave the same bytes: one image, processed once
+    assert projects[0]['gallery'][0]['variants'] == cover['variants']
+    assert dict(server.downloads) == {'one': 2, 'two': 1}
+    assert first.stats['fetched'] == 3
+    assert first.stats['processed'] == 2
+    assert first.stats['entries_updated'] == 3
+    assert len(os.listdir(tmp_path / 'public')) == 2
+
+    described = copy.deepcopy(projects)
+    server.downloads.clear()
+    second = pipeline_for(tmp_path)
+    second.process_projects(projects)
+    assert projects == described
+    assert sum(server.downloads.values()) == 0
+    assert second.stats['cached'] == 3
+    assert second.stats['processed'] == 0
+    assert second.stats['entries_updated'] == 0
+
+
+def test_dry_run_writes_nothing(server, tmp_path):
+    projects = sample_projects(server)
+    pipeline = pipeline_for(tmp_path, dry_run=True)
+    pipeline.process_projects(projects)
+    assert projects == sample_projects(server)
+    assert sum(server.downloads.values()) == 0
+    assert not os.path.exists(tmp_path / 'cache')
+    assert not os.path.exists(tmp_path / 'public')
+    assert len(pipeline.would_fetch) == 3
+    assert 'would be fetched' in pipeline.report()
+
+    pipeline_for(tmp_path).process_projects(sample_projects(server))
+    server.downloads.clear()
+    projects = sample_projects(server)
+    pipeline = pipeline_for(tmp_path, dry_run=True)
+    pipeline.process_projects(projects)
+    assert sum(server.downloads.values()) == 0
+    assert pipeline.would_fetch == []
+    assert pipeline.stats['entries_updated'] == 3
+    assert projects[1]['coverImage']['variants'][0]['width'] == 320
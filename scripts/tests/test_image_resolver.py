@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+pytest.importorskip('aiohttp')
+
+from image_resolver import CACHE_TTL, ImageCache, ImageResolver, TokenBucket, fallback_image
+from unsplash_standin import start_standin
+
+
+@pytest.fixture
+def server():
+    server = start_standin(limit=100)
+    yield server
+    server.shutdown()
+
+
+def resolver_for(server, cache_path, **kwargs):
+    return ImageResolver(cache=ImageCache(str(cache_path)), api_url=server.url, access_key='test', **kwargs)
+
+
+def test_one_request_per_distinct_query(server, tmp_path):
+    resolver = resolver_for(server, tmp_path / 'cache.json')
+    images = resolver.resolve(['server,api', 'website,ui', 'server,api', 'server,api'])
+    assert dict(server.requests) == {'server,api': 1, 'website,ui': 1}
+    assert images['server,api']['url'].endswith('/server-api.jpg')
+    assert images['website,ui']['credit']['name'] == 'Photographer website-ui'
+    assert resolver.stats['queries'] == 2
+    assert resolver.stats['fetched'] == 2
+
+
+def test_cached_queries_are_not_requested_until_they_expire(server, tmp_path):
+    cache_path = tmp_path / 'cache.json'
+    first = resolver_for(server, cache_path).resolve(['server,api', 'website,ui'])
+
+    resolver = resolver_for(server, cache_path)
+    assert resolver.resolve(['server,api', 'website,ui']) == first
+    assert resolver.stats['cached'] == 2
+    assert sum(server.requests.values()) == 2
+
+    saved = json.loads(cache_path.read_text())
+    saved['queries']['server,api']['fetched_at'] -= CACHE_TTL + 1
+    cache_path.write_text(json.dumps(saved))
+    resolver = resolver_for(server, cache_path)
+    resolver.resolve(['server,api', 'website,ui'])
+    assert resolver.stats['cached'] == 1
+    assert resolver.stats['fetched'] == 1
+    assert dict(server.requests) == {'server,api': 2, 'website,ui': 1}
+
+
+def test_rate_limited_queries_get_the_fallback(tmp_path):
+    server = start_standin(limit=1)
+    try:
+        resolver = resolver_for(server, tmp_path / 'cache.json')
+        images = resolver.resolve(['server,api', 'website,ui'])
+    finally:
+        server.shutdown()
+    assert sum(server.requests.values()) == 2
+    assert resolver.stats['fetched'] == 1
+    assert resolver.stats['failed'] == 1
+    # The 403 response is a fallback and isn't cached, so it is asked for again next time
+    failed = [query for query, image in images.items() if image == fallback_image(query)]
+    assert len(failed) == 1
+    assert failed[0] not in resolver.cache.entries
+    # X-Ratelimit-Remaining: 0 emptied the bucket
+    assert resolver.bucket.tokens < 1
+
+
+def test_empty_bucket_skips_the_request(server, tmp_path):
+    bucket = TokenBucket(capacity=1, rate=1e-6)
+    resolver = resolver_for(server, tmp_path / 'cache.json', bucket=bucket, max_token_wait=0.01)
+    images = resolver.resolve(['server,api', 'website,ui'])
+    assert sum(server.requests.values()) == 1
+    assert resolver.stats['rate_limited'] == 1
+    assert sorted(images) == ['server,api', 'website,ui']
+
+
+def test_bucket_state_is_saved_with_the_cache(server, tmp_path):
+    cache_path = tmp_path / 'cache.json'
+    resolver_for(server, cache_path).resolve(['server,api'])
+    rate_limit = json.loads(cache_path.read_text())['rate_limit']
+    assert rate_limit['tokens'] < 49.5
+    assert resolver_for(server, cache_path).bucket.tokens < 49.5
+
+
+def test_dry_run_only_reads_the_cache(server, tmp_path):
+    cache_path = tmp_path / 'cache.json'
+    cached = resolver_for(server, cache_path).resolve(['server,api'])
+    saved = cache_path.read_text()
+
+    resolver = resolver_for(server, cache_path, dry_run=True)
+    images = resolver.resolve(['server,api', 'website,ui'])
+    assert images == {'server,api': cached['server,api'],
+                      'website,ui': {'url': None, 'would_resolve': 'website,ui'}}
+    assert dict(server.requests) == {'server,api': 1}
+    assert cache_path.read_text() == saved
+    assert '1 would be resolved' in resolver.report()
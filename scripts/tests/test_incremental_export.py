@@ -0,0 +1,55 @@
+from datetime import datetime, timedelta, timezone
+
+from incremental_export import compact_backup, export_incremental, load_state
+from snapshot import SnapshotReader
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def stamped(title, hours):
+    return {'title': title, 'updated_at': START + timedelta(hours=hours)}
+
+
+def read(backup_dir, filename):
+    return list(SnapshotReader(str(backup_dir / filename)))
+
+
+def test_deltas_record_deletes_and_compact(tmp_path, fake_db):
+    client = fake_db({
+        'projects': {'a': stamped('Chat', 1), 'b': stamped('Tracker', 2), 'c': stamped('Notes', 3)},
+        # No updated_at, so re-read in full every run
+        'skills': {'python': {'level': 5}, 'go': {'level': 2}},
+    })
+    base = export_incremental(str(tmp_path), page_size=2)
+    assert len(read(tmp_path, base)) == 5
+
+    projects = client.collection('projects')
+    projects.document('b').delete()
+    projects.document('a').set(stamped('Chat v2', 4))
+    client.collection('skills').document('go').delete()
+    delta = export_incremental(str(tmp_path), page_size=2)
+    assert sorted(read(tmp_path, delta), key=lambda item: item[:2]) == [
+        ('projects', 'a', stamped('Chat v2', 4)),
+        ('projects', 'b', None),
+        ('skills', 'go', None),
+    ]
+    assert export_incremental(str(tmp_path), page_size=2) is None
+
+    compacted = compact_backup(str(tmp_path))
+    assert load_state(str(tmp_path))['deltas'] == []
+    snapshot = {(name, doc_id): data for name, doc_id, data in read(tmp_path, compacted)}
+    assert snapshot == {(name, doc_id): data for name, documents in client.dump().items()
+                        for doc_id, data in documents.items()}
+
+
+def test_delete_offset_by_late_document_is_found_by_id_scan(tmp_path, fake_db):
+    client = fake_db({'projects': {'a': stamped('Chat', 1), 'b': stamped('Tracker', 2)}})
+    export_incremental(str(tmp_path))
+    projects = client.collection('projects')
+    projects.document('a').delete()
+    # Older than the watermark, and keeps both counts the same
+    projects.document('z').set(stamped('Imported', 0))
+
+    assert export_incremental(str(tmp_path)) is None
+    delta = export_incremental(str(tmp_path), verify_ids=True)
+    assert sorted(read(tmp_path, delta)) == [('projects', 'a', None), ('projects', 'z', stamped('Imported', 0))]
@@ -0,0 +1,38 @@
+import pytest
+
+import instrumentation
+from fake_firestore import FakeClient
+from instrumentation import VALUE_SIZE, InstrumentedClient, _size
+
+
+def test_size_counts_top_level_fields():
+    data = {'title': 'Demo', 'tags': ['ai', 'web', 3], 'views': 12, 'meta': {'a': 1, 'b': 2}}
+    assert _size(data) == (5 + 4) + (4 + 2 + 3 + VALUE_SIZE) + (5 + VALUE_SIZE) + (4 + 2 * VALUE_SIZE)
+
+
+def test_size_of_missing_document():
+    assert _size(None) == 0
+    assert _size({}) == 0
+
+
+@pytest.fixture
+def recorded():
+    saved = instrumentation.metrics.operations
+    instrumentation.metrics.operations = {}
+    yield instrumentation.metrics.operations
+    instrumentation.metrics.operations = saved
+
+
+def test_gets_count_documents_and_bytes(recorded):
+    projects = {'a': {'title': 'One'}, 'b': {'title': 'Two'}, 'c': {'title': 'Six', 'views': 1}}
+    client = InstrumentedClient(FakeClient({'projects': projects}))
+
+    assert client.collection('projects').document('a').get().to_dict() == {'title': 'One'}
+    assert recorded['get'].documents == 1
+    assert recorded['get'].bytes == _size(projects['a'])
+
+    snapshots = client.collection('projects').where('title', '>=', 'Six').get()
+    assert sorted(snapshot.id for snapshot in snapshots) == ['b', 'c']
+    assert recorded['get'].calls == 2
+    assert recorded['get'].documents == 3
+    assert recorded['get'].bytes == sum(_size(data) for data in projects.values())
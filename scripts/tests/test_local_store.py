@@ -0,0 +1,70 @@
+import pytest
+
+from fake_firestore import FakeClient
+from local_store import LocalStore
+from snapshot import SnapshotWriter
+
+PROJECTS = {
+    'a': {'title': 'Chess Engine', 'slug': 'chess-engine', 'status': 'Live', 'year': 2021},
+    'b': {'title': 'The Chess Engine!', 'slug': 'chess-engine-2', 'status': 'Archived', 'year': 2019},
+    'c': {'title': 'Notes', 'slug': 'notes', 'status': 'Live', 'year': 2023},
+}
+
+
+@pytest.fixture
+def store(tmp_path):
+    snapshot = str(tmp_path / 'export.ndjson')
+    with SnapshotWriter(snapshot) as writer:
+        writer.write_collection('projects', sorted(PROJECTS.items()))
+    store = LocalStore(str(tmp_path / 'mirror.db'))
+    store.load_snapshot(snapshot)
+    yield store
+    store.close()
+
+
+def ids(documents):
+    return [doc.id for doc in documents]
+
+
+def test_queries(store):
+    projects = store.collection('projects')
+    assert ids(projects.where('slug', '==', 'notes').stream()) == ['c']
+    assert ids(projects.where('status', '==', 'Live').order_by('year').stream()) == ['a', 'c']
+    assert ids(projects.where('year', '<', 2022).stream()) == ['a', 'b']
+    [snapshot] = projects.where('slug', '==', 'chess-engine').select(['title']).stream()
+    assert snapshot.to_dict() == {'title': 'Chess Engine'}
+    assert projects.document('b').get().to_dict() == PROJECTS['b']
+    assert sorted(doc_id for doc_id, _ in store.find_by_title('projects', 'chess engine')) == ['a', 'b']
+
+
+def test_writes_are_pending_until_pushed(store):
+    projects = store.collection('projects')
+    projects.document('a').update({'status': 'Archived'})
+    projects.document('a').update({'year': 2020})
+    projects.document('c').delete()
+    assert store.pending_writes() == [
+        ('projects', 'a', dict(PROJECTS['a'], status='Archived', year=2020)),
+        ('projects', 'c', None),
+    ]
+
+    remote = FakeClient({'projects': PROJECTS})
+    store.push(remote)
+    assert remote.dump()['projects'] == {'a': dict(PROJECTS['a'], status='Archived', year=2020),
+                                         'b': PROJECTS['b']}
+    assert store.pending_writes() == []
+
+
+@pytest.mark.parametrize('make_client', ['mirror', 'fake'])
+def test_batches_are_all_or_nothing(store, make_client):
+    client = store if make_client == 'mirror' else FakeClient({'projects': PROJECTS})
+    projects = client.collection('projects')
+    batch = client.batch()
+    batch.set(projects.document('d'), {'title': 'New'})
+    batch.delete(projects.document('c'))
+    batch.update(projects.document('missing'), {'title': 'Nope'})
+    with pytest.raises(KeyError):
+        batch.commit()
+    assert not projects.document('d').get().exists
+    assert projects.document('c').get().to_dict() == PROJECTS['c']
+    if make_client == 'mirror':
+        assert store.pending_writes() == []
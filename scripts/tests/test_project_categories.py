@@ -0,0 +1,37 @@
+from project_categories import CategoryClassifier, classify_projects, classify_tech_stack
+
+
+def test_default_table():
+    assert classify_tech_stack('Python, Django, PostgreSQL') == 'Full Stack Development'
+    assert classify_tech_stack(['React', 'CSS']) == 'Frontend Development'
+    assert classify_tech_stack('Pygame') == 'Game Development'
+    assert classify_tech_stack('Django Rest Framework') == 'Backend Development'
+    assert classify_tech_stack('C++, OpenGL') == 'Software Development'
+    assert classify_tech_stack(None) == 'Software Development'
+
+
+def test_first_category_in_table_order_wins():
+    assert classify_tech_stack('Vue, Express API') == 'Backend Development'
+    assert classify_projects([{'technologies': 'Flask'}, {}]) == ['Full Stack Development', 'Software Development']
+
+
+def test_keywords_sharing_a_prefix_are_all_seen():
+    rules = [('Backend', ('rest',)), ('APIs', ('restful',))]
+    assert CategoryClassifier(rules).classify('RESTful services') == 'Backend'
+    rules = [('Mobile', ('react native',)), ('Frontend', ('react',))]
+    assert CategoryClassifier(rules).classify('React Native') == 'Mobile'
+    assert CategoryClassifier(rules).classify('React') == 'Frontend'
+    rules = [('Frontend', ('react',)), ('Mobile', ('react native',))]
+    assert CategoryClassifier(rules).classify('React Native') == 'Frontend'
+
+
+def test_overlapping_keywords_are_all_seen():
+    rules = [('Game', ('game',)), ('Python', ('pygame',))]
+    assert CategoryClassifier(rules).classify('pygame') == 'Game'
+
+
+def test_keyword_listed_twice_belongs_to_the_first_category():
+    rules = [('First', ('api',)), ('Second', ('api', 'vue'))]
+    classifier = CategoryClassifier(rules)
+    assert classifier.classify('API') == 'First'
+    assert classifier.classify('Vue') == 'Second'
@@ -0,0 +1,36 @@
+from fake_firestore import FakeClient
+from fix_project_technologies import split_technologies
+from project_queries import projects_with_unsplit_technologies
+
+PROJECTS = {
+    'string': {'title': 'A', 'technologies': 'Python, Django', 'details': 'long text'},
+    'empty': {'title': 'B', 'technologies': ''},
+    'null': {'title': 'C', 'technologies': None},
+    'number': {'title': 'D', 'technologies': 3},
+    'boolean': {'title': 'E', 'technologies': False},
+    'map': {'title': 'F', 'technologies': {'backend': 'Python'}},
+    'list': {'title': 'G', 'technologies': ['Python']},
+    'empty-list': {'title': 'H', 'technologies': []},
+    'missing': {'title': 'I'},
+}
+
+
+def test_unsplit_technologies_covers_every_non_list_type():
+    client = FakeClient({'projects': PROJECTS})
+    docs = {doc.id: doc.to_dict() for doc in projects_with_unsplit_technologies(client)}
+    assert sorted(docs) == ['boolean', 'empty', 'map', 'null', 'number', 'string']
+    # Only the requested fields come back
+    assert docs['string'] == {'title': 'A', 'technologies': 'Python, Django'}
+
+
+def test_unsplit_technologies_always_fetches_technologies():
+    client = FakeClient({'projects': PROJECTS})
+    docs = {doc.id: doc.to_dict() for doc in projects_with_unsplit_technologies(client, fields=('title',))}
+    assert docs['number'] == {'title': 'D', 'technologies': 3}
+
+
+def test_non_list_technologies_are_reset_like_before():
+    assert split_technologies('Python, Django') == ['Python', 'Django']
+    for value in ('', None, 3, False, {'backend': 'Python'}):
+        assert split_technologies(value) == []
+
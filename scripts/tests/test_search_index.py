@@ -0,0 +1,45 @@
+import json
+
+from search_index import STATE_FILE, SearchIndex, SearchIndexBuilder, tokenize
+from text_normalize import normalize_title
+
+
+def test_punctuation_separates_words():
+    assert tokenize('Real-time chat') == ['real', 'time', 'realtime', 'chat']
+    assert tokenize('Built on Node.js') == ['built', 'on', 'node', 'js', 'nodejs']
+    assert tokenize('C++ and C# engines') == ['c++', 'c#', 'engines']
+
+
+def test_normalize_title_still_deletes_punctuation():
+    assert normalize_title('Real-time Node.js Chat') == 'realtime nodejs chat'
+
+
+def build(index_dir, projects):
+    builder = SearchIndexBuilder(str(index_dir))
+    for doc_id, data in projects.items():
+        builder.add('projects', doc_id, data)
+    builder.save()
+    return SearchIndex(str(index_dir))
+
+
+def test_search_finds_punctuated_terms(tmp_path):
+    index = build(tmp_path, {
+        'cpp': {'title': 'Ray tracer', 'technologies': ['C++', 'OpenGL']},
+        'node': {'title': 'Real-time chat', 'technologies': ['Node.js']},
+        'css': {'title': 'Landing page', 'technologies': ['CSS', 'HTML']},
+    })
+    assert [hit[2] for hit in index.search('c++')] == ['cpp']
+    assert [hit[2] for hit in index.search('realtime')] == ['node']
+    assert [hit[2] for hit in index.search('node.js')] == ['node']
+    assert [hit[2] for hit in index.search('time chat')] == ['node']
+
+
+def test_older_tokenizer_state_is_rebuilt(tmp_path):
+    build(tmp_path, {'node': {'title': 'Real-time chat'}})
+    path = tmp_path / STATE_FILE
+    with open(path) as f:
+        state = json.load(f)
+    del state['tokenizer']
+    with open(path, 'w') as f:
+        json.dump(state, f)
+    assert SearchIndexBuilder(str(tmp_path)).documents == {}
@@ -0,0 +1,67 @@
+import json
+import os
+from datetime import datetime, timezone
+
+from site_bundles import build_bundles, detail_names, ordered_documents
+from snapshot import SnapshotWriter
+
+
+def timestamp(year):
+    return datetime(year, 1, 1, tzinfo=timezone.utc)
+
+
+def test_order_by_leaves_out_missing_fields_and_sorts_nulls_like_firestore():
+    documents = {
+        'a': {'order': 2},
+        'b': {'order': None},
+        'c': {'title': 'no order'},
+        'd': {'order': 1},
+        'e': {'order': None},
+    }
+    ids = [doc['id'] for doc in ordered_documents('affiliations', documents.items())]
+    assert ids == ['b', 'e', 'd', 'a']
+
+    projects = {
+        'a': {'created_at': timestamp(2020)},
+        'b': {'created_at': None},
+        'c': {'title': 'no timestamp'},
+        'd': {'created_at': timestamp(2023)},
+        'e': {'created_at': timestamp(2020)},
+    }
+    # Descending: nulls last, ties by ID descending
+    ids = [doc['id'] for doc in ordered_documents('projects', projects.items())]
+    assert ids == ['d', 'e', 'a', 'b']
+
+
+def test_detail_names_fall_back_to_id():
+    projects = [
+        {'id': 'p1', 'slug': 'shared'},
+        {'id': 'p2', 'slug': 'shared'},
+        {'id': 'p3', 'slug': 'unique'},
+        {'id': 'p4', 'slug': 'not/safe'},
+        {'id': 'p5', 'slug': 'p1'},
+        {'id': 'p6'},
+    ]
+    assert detail_names(projects) == ['p1', 'p2', 'unique', 'p4', 'p5', 'p6']
+
+
+def test_index_lists_each_projects_detail_path(tmp_path):
+    projects = {
+        'p1': {'title': 'One', 'slug': 'demo', 'created_at': timestamp(2021)},
+        'p2': {'title': 'Two', 'slug': 'demo', 'created_at': timestamp(2022)},
+        'p3': {'title': 'Three', 'slug': 'three', 'created_at': timestamp(2023)},
+    }
+    snapshot = str(tmp_path / 'export.ndjson')
+    with SnapshotWriter(snapshot) as writer:
+        writer.write_collection('projects', projects.items())
+    output_dir = tmp_path / 'data'
+    build_bundles(str(output_dir), snapshot, collections=('projects',))
+
+    with open(output_dir / 'projects-0.json') as f:
+        summaries = json.load(f)
+    assert [(s['id'], s['detail']) for s in summaries] == [
+        ('p3', 'projects/three.json'), ('p2', 'projects/p2.json'), ('p1', 'projects/p1.json')]
+    for summary in summaries:
+        with open(output_dir / summary['detail']) as f:
+            assert json.load(f)['title'] == projects[summary['id']]['title']
+    assert not os.path.exists(output_dir / 'projects' / 'demo.json')
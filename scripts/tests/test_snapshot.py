@@ -0,0 +1,68 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from snapshot import SnapshotReader, SnapshotWriter, convert_snapshot
+
+COLLECTIONS = {
+    'projects': {
+        'b': {'title': 'Tracker', 'created_at': datetime(2021, 5, 1, 12, tzinfo=timezone.utc),
+              'cover': {'url': 'x.png', 'date': datetime(2022, 1, 2, tzinfo=timezone.utc)}},
+        'a': {'title': 'Chat', 'stars': 3, 'tags': ['web'], 'created_at': '2021-05-01'},
+    },
+    'skills': {'python': {'level': 5}},
+    'empty': {},
+}
+
+
+def write(path, collections=COLLECTIONS):
+    with SnapshotWriter(str(path)) as writer:
+        for name, documents in collections.items():
+            writer.write_collection(name, documents.items())
+    return str(path)
+
+
+@pytest.mark.parametrize('extension', ['.ndjson', '.fsnap'])
+def test_round_trip(tmp_path, extension):
+    reader = SnapshotReader(write(tmp_path / f'export{extension}'))
+    assert reader.collections() == list(COLLECTIONS)
+    for name, documents in COLLECTIONS.items():
+        assert dict(reader.iter_documents(name)) == documents
+    # Strings that only look like timestamps stay strings
+    assert dict(reader.iter_documents('projects'))['a']['created_at'] == '2021-05-01'
+    assert reader.index['projects']['count'] == 2
+    assert not reader.index['projects']['sorted']
+    assert reader.index['skills']['sorted']
+    assert list(reader.iter_documents('missing')) == []
+
+
+@pytest.mark.parametrize('source, destination', [('.ndjson', '.fsnap'), ('.fsnap', '.ndjson')])
+def test_convert_between_formats(tmp_path, source, destination):
+    converted = convert_snapshot(write(tmp_path / f'export{source}'), str(tmp_path / f'export{destination}'))
+    assert list(SnapshotReader(converted)) == list(SnapshotReader(str(tmp_path / f'export{source}')))
+
+
+def test_tombstones_read_back_as_none(tmp_path):
+    path = str(tmp_path / 'delta.fsnap')
+    with SnapshotWriter(path) as writer:
+        writer.begin_collection('projects')
+        writer.write('a', {'title': 'Chat'})
+        writer.write_tombstone('b')
+    assert list(SnapshotReader(path)) == [('projects', 'a', {'title': 'Chat'}), ('projects', 'b', None)]
+
+
+def test_truncated_ndjson_is_rejected(tmp_path):
+    path = write(tmp_path / 'export.ndjson')
+    with open(path, 'rb') as f:
+        lines = f.readlines()
+    with open(path, 'wb') as f:
+        f.writelines(lines[:-1])
+    with pytest.raises(ValueError):
+        SnapshotReader(path).collections()
+
+
+def test_legacy_json_export(tmp_path):
+    path = tmp_path / 'firebase_export_20210501_000000.json'
+    path.write_text(json.dumps({'projects': {'a': {'title': 'Chat'}}}))
+    assert list(SnapshotReader(str(path))) == [('projects', 'a', {'title': 'Chat'})]
@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+from fake_firestore import FakeClient
+from snapshot import SnapshotWriter
+from snapshot_diff import add_to_plan, diff_snapshots
+from write_plan import PlanWriter, WritePlan, execute_plan
+
+OLD = {
+    'd': {'title': 'Removed'},
+    'a': {'title': 'Same'},
+    'c': {'title': 'Before', 'date': datetime(2021, 5, 1, tzinfo=timezone.utc)},
+    'e': {'title': 'Same too'},
+}
+NEW = {
+    'c': {'title': 'After', 'date': datetime(2021, 5, 1, tzinfo=timezone.utc)},
+    'e': {'title': 'Same too'},
+    'b': {'title': 'Added'},
+    'a': {'title': 'Same'},
+}
+
+
+def write_snapshot(path, documents):
+    with SnapshotWriter(str(path)) as writer:
+        writer.write_collection('projects', documents.items())
+    return str(path)
+
+
+def test_unsorted_snapshots_diff_in_id_order(tmp_path):
+    old = write_snapshot(tmp_path / 'old.ndjson', OLD)
+    new = write_snapshot(tmp_path / 'new.ndjson', NEW)
+    # A run size smaller than the collections makes the sort spill to disk
+    changes = [(change, doc_id) for change, _, doc_id, _, _ in diff_snapshots(old, new, run_size=2)]
+    assert changes == [('added', 'b'), ('changed', 'c'), ('removed', 'd')]
+
+
+def test_streamed_plan_applies_the_diff(tmp_path):
+    old = write_snapshot(tmp_path / 'old.fsnap', OLD)
+    new = write_snapshot(tmp_path / 'new.fsnap', NEW)
+    plan_path = str(tmp_path / 'plan.json')
+    with PlanWriter(plan_path, 'test') as plan:
+        for change in diff_snapshots(old, new, run_size=2):
+            add_to_plan(plan, *change)
+    assert len(plan) == 3
+
+    loaded = WritePlan.load(plan_path)
+    assert loaded.source == 'test'
+    assert len(loaded) == 3
+    client = FakeClient({'projects': OLD})
+    execute_plan(loaded, client)
+    assert client.dump()['projects'] == NEW
@@ -0,0 +1,45 @@
+import json
+from datetime import datetime, timezone
+
+import pytest
+
+from fake_firestore import FakeClient
+from firebase_export import export_snapshot
+from firebase_import import import_data
+from snapshot import SnapshotReader
+
+PROJECT = {
+    'title': 'Tracker',
+    # A string that happens to look like a timestamp stays a string
+    'date': '2021-05-01',
+    'created_at': datetime(2021, 5, 1, 12, 30, tzinfo=timezone.utc),
+    'meta': {'reviewed_at': datetime(2022, 1, 2, tzinfo=timezone.utc)},
+}
+
+
+@pytest.mark.parametrize('extension', ['.ndjson', '.fsnap'])
+def test_snapshot_round_trip_keeps_types(fake_db, tmp_path, extension):
+    fake_db({'projects': {'p1': PROJECT}})
+    filename = export_snapshot(str(tmp_path / ('export' + extension)))
+
+    target = FakeClient()
+    import_data(filename, client=target)
+    assert target.dump()['projects']['p1'] == PROJECT
+
+
+def test_legacy_exports_parse_schema_timestamps(tmp_path):
+    filename = tmp_path / 'firebase_export.json'
+    with open(filename, 'w') as f:
+        json.dump({'projects': {'p1': {
+            'date': '2021',
+            'date_built': '2019-02-01 00:00:00+00:00',
+            'created_at': '2021-05-01T12:30:00+00:00',
+            'summary': '2021-05-01',
+        }}}, f)
+    [(doc_id, data)] = SnapshotReader(str(filename)).iter_documents('projects')
+    assert data == {
+        'date': '2021',
+        'date_built': datetime(2019, 2, 1, tzinfo=timezone.utc),
+        'created_at': datetime(2021, 5, 1, 12, 30, tzinfo=timezone.utc),
+        'summary': '2021-05-01',
+    }
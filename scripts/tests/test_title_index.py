@@ -0,0 +1,40 @@
+from bench_title_index import synthetic_titles
+from title_index import MinHashIndex, TitleIndex, find_similar_pairs, find_similar_pairs_bruteforce
+
+
+def test_exact_index_matches_all_pairs():
+    titles = synthetic_titles(300, duplicate_rate=0.2)
+    assert TitleIndex(titles).similar_pairs() == find_similar_pairs_bruteforce(titles)
+
+
+def test_exact_index_finds_pairs_without_shared_trigrams():
+    # Similar by ratio, yet no trigram in common: a trigram filter would drop them
+    titles = ['ab-cd-ef-gh', 'ab.cd.ef.gh', 'xyz']
+    trigrams = [{title[i:i + 3] for i in range(len(title) - 2)} for title in titles]
+    assert not trigrams[0] & trigrams[1]
+    pairs = find_similar_pairs(titles)
+    assert [(i, j) for i, j, _ in pairs] == [(0, 1)]
+    assert pairs == find_similar_pairs_bruteforce(titles)
+
+
+def test_empty_titles_are_not_paired():
+    assert find_similar_pairs(['', '', 'snake', 'snake']) == [(2, 3, 1.0)]
+
+
+def test_minhash_finds_a_subset_of_the_exact_pairs():
+    titles = synthetic_titles(500, duplicate_rate=0.2)
+    exact = TitleIndex(titles).similar_pairs()
+    found = MinHashIndex(titles).similar_pairs()
+    assert set(found) <= set(exact)
+    assert len(found) >= 0.95 * len(exact)
+
+
+def test_minhash_is_opt_in():
+    titles = synthetic_titles(300, duplicate_rate=0.2)
+    assert find_similar_pairs(titles) == TitleIndex(titles).similar_pairs()
+    assert find_similar_pairs(titles, minhash=True) == MinHashIndex(titles).similar_pairs()
+
+
+def test_minhash_is_deterministic():
+    titles = synthetic_titles(200)
+    assert MinHashIndex(titles).similar_pairs() == MinHashIndex(titles).similar_pairs()
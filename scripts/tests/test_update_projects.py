@@ -0,0 +1,60 @@
+import os
+from datetime import datetime, timezone
+
+import pytest
+
+from unsplash_standin import start_standin
+from update_projects import update_all_projects
+
+
+@pytest.fixture
+def server():
+    server = start_standin()
+    yield server
+    server.shutdown()
+
+
+def test_dry_run_resolves_nothing_and_writes_nothing(fake_db, server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('UNSPLASH_API_URL', server.url)
+    client = fake_db({'projects': {'p1': {'title': 'Chat', 'technologies': 'Django, PostgreSQL'}}})
+
+    plan = update_all_projects(dry_run=True)
+    [operation] = list(plan)
+    assert operation['data']['coverImage'] == {'url': None, 'would_resolve': 'web,application,fullstack'}
+    assert sum(server.requests.values()) == 0
+    assert os.listdir(tmp_path) == []
+    assert client.dump()['projects']['p1'] == {'title': 'Chat', 'technologies': 'Django, PostgreSQL'}
+
+
+STANDARDIZED = {
+    'title': 'Chat',
+    'description': 'A chat server.',
+    'role': 'Developer',
+    'technologies': ['Django', 'PostgreSQL'],
+    'category': 'Full Stack Development',
+    'status': 'Completed',
+    'featured': False,
+    'year': 2021,
+    'github_url': '',
+    'coverImage': {'url': 'https://example.com/chat.jpg'},
+    'gallery': [{'url': 'https://example.com/chat.jpg'}],
+    'details': 'A chat server.',
+    'created_at': datetime(2021, 5, 1, tzinfo=timezone.utc),
+    # Fields standardize_project() doesn't write
+    'slug': 'chat',
+    'date_built': datetime(2021, 5, 1, tzinfo=timezone.utc),
+}
+
+
+def test_already_standardized_projects_are_skipped_on_the_first_run(fake_db, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    changed = dict(STANDARDIZED, status='Live ', title='Chat app')
+    del changed['category']
+    client = fake_db({'projects': {'same': STANDARDIZED, 'changed': changed}})
+
+    plan = update_all_projects()
+    assert [operation['id'] for operation in plan] == ['changed']
+    assert client.dump()['projects']['same'] == STANDARDIZED
+    # Both are in the manifest now, so a second run reads them and writes nothing
+    assert len(update_all_projects()) == 0
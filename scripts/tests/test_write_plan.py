@@ -0,0 +1,28 @@
+from fake_firestore import FakeClient, InvalidArgument
+from write_plan import WritePlan, execute_plan
+
+
+def replacement_plan():
+    plan = WritePlan('test')
+    plan.set('projects', 'b', {'title': 'Merged'})
+    plan.delete('projects', 'a')
+    return plan
+
+
+def test_deletes_run_after_writes():
+    client = FakeClient({'projects': {'a': {'title': 'Original'}}})
+    stats = execute_plan(replacement_plan(), client)
+    assert stats.failed_writes == 0
+    assert stats.skipped == []
+    assert client.dump()['projects'] == {'b': {'title': 'Merged'}}
+
+
+def test_failed_writes_skip_deletes():
+    client = FakeClient({'projects': {'a': {'title': 'Original'}}})
+    client.failure = InvalidArgument
+    client.fail_commits = 1
+    stats = execute_plan(replacement_plan(), client)
+    assert stats.failed_writes == 1
+    assert stats.skipped == ['projects/a']
+    assert 'projects/a' in stats.report()
+    assert client.dump()['projects'] == {'a': {'title': 'Original'}}
@@ -0,0 +1,68 @@
+"""Title normalization and slug generation shared by the project scripts.
+
+Lookup tables and regexes are built once at import, and results are
+memoized in bounded LRU caches since the same titles come up on every run.
+"""
+import re
+from functools import lru_cache
+
+CACHE_SIZE = 4096
+
+# Convert numbers to words and words to numbers
+NUMBER_WORD_MAP = {
+    '0': 'zero', '1': 'one', '2': 'two', '3': 'three', '4': 'four',
+    '5': 'five', '6': 'six', '7': 'seven', '8': 'eight', '9': 'nine',
+    'zero': '0', 'one': '1', 'two': '2', 'three': '3', 'four': '4',
+    'five': '5', 'six': '6', 'seven': '7', 'eight': '8', 'nine': '9'
+}
+STOP_WORDS = frozenset({'a', 'an', 'the', 'and', 'or', 'but', 'game'})
+
+_SPECIAL_CHARS = re.compile(r'[^\w\s]')
+_WORD_NUMBER = re.compile(r'(\w+)(\d+)')
+_SLUG_SPECIAL_CHARS = re.compile(r'[^\w\s-]')
+_SLUG_SEPARATORS = re.compile(r'[-\s]+')
+
+
+def normalize_words(text, stop_words=STOP_WORDS):
+    """normalize_title()'s words for any text, uncached (for long text like descriptions)"""
+    # Convert to lowercase and remove special characters
+    text = _SPECIAL_CHARS.sub('', text.lower().strip())
+
+    # Handle special cases like "Connect4"
+    text = _WORD_NUMBER.sub(r'\1 \2', text)  # Split words and numbers
+
+    normalized = []
+    for word in text.split():
+        # Swap digits and number words
+        word = NUMBER_WORD_MAP.get(word, word)
+        # Remove common words
+        if word not in stop_words:
+            normalized.append(word)
+    return normalized
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def normalize_title(title):
+    """Normalize title for comparison"""
+    return ' '.join(normalize_words(title))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def create_slug(title):
+    """Create a URL-friendly slug from a title."""
+    # Convert to lowercase and replace spaces with hyphens
+    slug = title.lower().strip()
+    # Remove special characters
+    slug = _SLUG_SPECIAL_CHARS.sub('', slug)
+    # Replace spaces with hyphens
+    return _SLUG_SEPARATORS.sub('-', slug)
+
+
+def normalize_titles(titles):
+    """Normalize a list of titles in one call."""
+    return list(map(normalize_title, titles))
+
+
+def create_slugs(titles):
+    """Create slugs for a list of titles in one call."""
+    return list(map(create_slug, titles))
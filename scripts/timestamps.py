@@ -0,0 +1,83 @@
+"""Typed timestamp handling for exported documents.
+
+Snapshots record which fields of a document held timestamps (as a
+``types`` map of field paths next to the data), so those values are turned
+back into datetimes exactly on read and nothing else is touched. For
+exports without that information (legacy JSON files) only the fields the
+schema declares as timestamps are parsed (SnapshotReader does this for
+them); free-text fields are never guessed at, and snapshot documents are
+never coerced.
+
+Parsing goes through a precompiled ISO 8601 shape check before
+``datetime.fromisoformat``, so values that aren't timestamps (e.g. a
+``date`` of ``"2021"``) are rejected without raising and catching an
+exception.
+"""
+import re
+from datetime import datetime
+
+# Fields holding timestamps in every collection
+TIMESTAMP_FIELDS = frozenset({'created_at', 'updated_at', 'date_built', 'date'})
+TIMESTAMP = 'timestamp'
+
+ISO_TIMESTAMP = re.compile(
+    r'\d{4}-\d{2}-\d{2}'
+    r'(?:[T ]\d{2}:\d{2}(?::\d{2}(?:\.\d{1,6})?)?)?'
+    r'(Z|[+-]\d{2}:\d{2})?\Z'
+)
+
+
+def parse_timestamp(value):
+    """datetime for an ISO 8601 string, or None if it isn't one."""
+    match = ISO_TIMESTAMP.match(value)
+    if match is None:
+        return None
+    if match.group(1) == 'Z':
+        value = value[:-1] + '+00:00'
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        # Right shape, impossible value (month 13, ...)
+        return None
+
+
+def timestamp_types(data, prefix=''):
+    """Map of dotted field paths to 'timestamp' for every datetime in a document."""
+    types = {}
+    for key, value in data.items():
+        if isinstance(value, datetime):
+            types[prefix + key] = TIMESTAMP
+        elif isinstance(value, dict):
+            types.update(timestamp_types(value, f'{prefix}{key}.'))
+    return types
+
+
+def apply_types(data, types):
+    """Restore the values recorded by timestamp_types() in place."""
+    for path, kind in types.items():
+        if kind != TIMESTAMP:
+            continue
+        *parents, key = path.split('.')
+        target = data
+        for parent in parents:
+            target = target.get(parent)
+            if not isinstance(target, dict):
+                break
+        else:
+            value = target.get(key)
+            if isinstance(value, str):
+                parsed = parse_timestamp(value)
+                if parsed is not None:
+                    target[key] = parsed
+    return data
+
+
+def coerce_timestamps(data, fields=TIMESTAMP_FIELDS):
+    """Parse the schema's timestamp fields that are still ISO strings, in place."""
+    for key in fields:
+        value = data.get(key)
+        if isinstance(value, str):
+            parsed = parse_timestamp(value)
+            if parsed is not None:
+                data[key] = parsed
+    return data
@@ -0,0 +1,173 @@
+"""Finding near-duplicate titles without scoring every pair.
+
+Titles are similar when their SequenceMatcher ratio exceeds 0.7, as in the
+all-pairs loop merge_projects used to run; only the way candidate pairs
+are picked differs:
+
+- ``TitleIndex`` is exact. A ratio never exceeds quick_ratio(), the Dice
+  coefficient of the two titles' character multisets, so a pair above the
+  threshold has a multiset overlap above threshold * (len(a) + len(b)) / 2
+  and lengths within threshold / (2 - threshold) of each other. Only pairs
+  passing those bounds are scored, which provably keeps every similar pair,
+  but the bounds still pass a fixed share of all pairs, so the time grows
+  about quadratically (at a fraction of the all-pairs cost).
+- ``MinHashIndex`` buckets titles by MinHash signatures of their character
+  trigrams (LSH_BANDS bands of LSH_ROWS rows) and only scores titles sharing
+  a bucket. Its time grows about linearly, but a similar pair whose trigram
+  sets overlap little can be missed: on bench_title_index.py's synthetic
+  titles it finds 98-99% of the pairs, the misses being short titles.
+
+find_similar_pairs() always uses the exact index, so it finds the same
+pairs as the all-pairs loop; MinHash is only used when asked for with
+``minhash=True`` (merge_projects.py --minhash). bench_title_index.py
+measures both against the all-pairs loop. Empty titles are never paired.
+"""
+import difflib
+import random
+import zlib
+from array import array
+from bisect import bisect_left
+from collections import Counter, defaultdict
+
+SIMILARITY_THRESHOLD = 0.7
+NGRAM_SIZE = 3
+LSH_BANDS = 80
+LSH_ROWS = 3
+LSH_SEED = 1
+# Mersenne prime for the universal hash functions of the MinHash signatures
+HASH_PRIME = (1 << 61) - 1
+# Signatures keep 32 bits per hash so the per-n-gram tables stay small
+HASH_MASK = 0xffffffff
+
+
+def ngrams(text, n=NGRAM_SIZE):
+    """Set of character n-grams, padded so short titles still get some."""
+    padded = ' ' * (n - 1) + text + ' '
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def char_tokens(text):
+    """The title's characters as a set of (character, occurrence) pairs.
+
+    Intersecting two of these sets intersects the character multisets, which
+    is what SequenceMatcher.quick_ratio() counts.
+    """
+    seen = Counter()
+    tokens = set()
+    for char in text:
+        seen[char] += 1
+        tokens.add((char, seen[char]))
+    return frozenset(tokens)
+
+
+def _similar(matcher, first, second, threshold):
+    """SequenceMatcher ratio of two titles if it exceeds threshold, else None."""
+    matcher.set_seqs(first, second)
+    if matcher.real_quick_ratio() <= threshold or matcher.quick_ratio() <= threshold:
+        return None
+    ratio = matcher.ratio()
+    return ratio if ratio > threshold else None
+
+
+class TitleIndex:
+    """Exact candidate pairs over a fixed list of (already normalized) titles."""
+
+    def __init__(self, titles):
+        self.titles = list(titles)
+        self.tokens = [char_tokens(title) for title in self.titles]
+
+    def candidate_pairs(self, threshold=SIMILARITY_THRESHOLD):
+        """Yield (i, j) with i < j for every pair whose quick_ratio() exceeds threshold."""
+        order = sorted(range(len(self.titles)), key=lambda i: len(self.titles[i]))
+        lengths = [len(self.titles[i]) for i in order]
+        for position, j in enumerate(order):
+            length = lengths[position]
+            if not length:
+                continue
+            tokens = self.tokens[j]
+            # Shorter (or equally long, earlier) titles that could still reach the threshold
+            start = bisect_left(lengths, threshold / (2 - threshold) * length)
+            for i in order[start:position]:
+                if 2 * len(self.tokens[i] & tokens) > threshold * (len(self.titles[i]) + length):
+                    yield (i, j) if i < j else (j, i)
+
+    def similar_pairs(self, threshold=SIMILARITY_THRESHOLD):
+        """Return sorted (i, j, ratio) for every pair whose ratio exceeds threshold."""
+        matcher = difflib.SequenceMatcher(None)
+        pairs = []
+        for i, j in self.candidate_pairs(threshold):
+            ratio = _similar(matcher, self.titles[i], self.titles[j], threshold)
+            if ratio is not None:
+                pairs.append((i, j, ratio))
+        pairs.sort()
+        return pairs
+
+
+class MinHashIndex:
+    """Locality-sensitive candidate pairs: titles sharing a band of their MinHash signature."""
+
+    def __init__(self, titles, bands=LSH_BANDS, rows=LSH_ROWS, n=NGRAM_SIZE, seed=LSH_SEED):
+        self.titles = list(titles)
+        self.bands = bands
+        self.rows = rows
+        self.n = n
+        rng = random.Random(seed)
+        self._coefficients = [(rng.randrange(1, HASH_PRIME), rng.randrange(HASH_PRIME))
+                              for _ in range(bands * rows)]
+        self._hashes = {}
+
+    def _gram_hashes(self, gram):
+        """The n-gram's value under every hash function, computed once per distinct n-gram."""
+        hashes = self._hashes.get(gram)
+        if hashes is None:
+            x = zlib.crc32(gram.encode('utf-8'))
+            hashes = self._hashes[gram] = array(
+                'I', [((a * x + b) % HASH_PRIME) & HASH_MASK for a, b in self._coefficients])
+        return hashes
+
+    def signature(self, title):
+        # The all-ones row makes map() work for titles with a single n-gram too
+        tables = [self._gram_hashes(gram) for gram in ngrams(title, self.n)]
+        return list(map(min, [HASH_MASK] * len(self._coefficients), *tables))
+
+    def similar_pairs(self, threshold=SIMILARITY_THRESHOLD):
+        """Return sorted (i, j, ratio) for the similar pairs among titles sharing a bucket."""
+        buckets = defaultdict(list)
+        matcher = difflib.SequenceMatcher(None)
+        pairs = []
+        for j, title in enumerate(self.titles):
+            if not title:
+                continue
+            candidates = set()
+            # Keyed by (band number, that band's rows of the signature)
+            for key in enumerate(zip(*[iter(self.signature(title))] * self.rows)):
+                bucket = buckets[key]
+                candidates.update(bucket)
+                bucket.append(j)
+            for i in sorted(candidates):
+                ratio = _similar(matcher, self.titles[i], title, threshold)
+                if ratio is not None:
+                    pairs.append((i, j, ratio))
+        pairs.sort()
+        return pairs
+
+
+def find_similar_pairs(titles, threshold=SIMILARITY_THRESHOLD, minhash=False):
+    """Return sorted (i, j, ratio) for the pairs of titles with ratio > threshold.
+
+    With ``minhash`` the faster MinHashIndex is used, which can miss pairs.
+    """
+    titles = list(titles)
+    index = MinHashIndex(titles) if minhash else TitleIndex(titles)
+    return index.similar_pairs(threshold)
+
+
+def find_similar_pairs_bruteforce(titles, threshold=SIMILARITY_THRESHOLD):
+    """Reference all-pairs implementation, kept for benchmarks and checks."""
+    pairs = []
+    for i in range(len(titles)):
+        for j in range(i + 1, len(titles)):
+            ratio = difflib.SequenceMatcher(None, titles[i], titles[j]).ratio()
+            if ratio > threshold:
+                pairs.append((i, j, ratio))
+    return pairs
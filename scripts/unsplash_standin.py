@@ -0,0 +1,131 @@
+"""Local stand-in for the Unsplash /photos/random endpoint and the images it links to.
+
+    python unsplash_standin.py [--port 8765] [--latency 0.2] [--limit 50]
+    UNSPLASH_API_URL=http://127.0.0.1:8765 python update_projects.py
+
+Answers like the real API (including the X-Ratelimit-Remaining header and
+403 once the limit is used up) after an artificial delay, and counts the
+requests it served per query so cache and deduplication behaviour can be
+checked without spending real quota.
+
+The photos it returns point back at ``/images/<name>.jpg`` on the same
+server, which serves a generated IMAGE_SIZE JPEG (the same bytes for the
+same name, needs Pillow) and counts the downloads per name, so
+image_pipeline.py can be exercised against it too.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+IMAGE_SIZE = (1600, 900)
+
+
+@lru_cache(maxsize=64)
+def generated_image(name, size=IMAGE_SIZE):
+    """JPEG bytes of a gradient whose colours are derived from ``name``"""
+    import io
+    import zlib
+    from PIL import Image
+
+    seed = zlib.crc32(name.encode('utf-8'))
+    start = (seed & 0xff, (seed >> 8) & 0xff, (seed >> 16) & 0xff)
+    end = tuple(255 - channel for channel in start)
+    gradient = Image.linear_gradient('L').resize(size)
+    image = Image.composite(Image.new('RGB', size, end), Image.new('RGB', size, start), gradient)
+    output = io.BytesIO()
+    image.save(output, 'JPEG', quality=85)
+    return output.getvalue()
+
+
+class StandinServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, limit=50):
+        super().__init__(address, StandinHandler)
+        self.latency = latency
+        self.remaining = limit
+        self.requests = Counter()
+        self.downloads = Counter()
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        if url.path.startswith('/images/') and url.path.endswith('.jpg'):
+            self.send_image(url.path[len('/images/'):-len('.jpg')])
+            return
+        if url.path != '/photos/random':
+            self.send_error(404)
+            return
+        query = parse_qs(url.query).get('query', [''])[0]
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests[query] += 1
+            allowed = self.server.remaining > 0
+            if allowed:
+                self.server.remaining -= 1
+            remaining = self.server.remaining
+
+        if not allowed:
+            body = b'Rate Limit Exceeded'
+            self.send_response(403)
+        else:
+            slug = query.replace(',', '-')
+            body = json.dumps({
+                'urls': {'regular': f"{self.server.url}/images/{slug}.jpg"},
+                'user': {'name': f"Photographer {slug}", 'links': {'html': f"https://unsplash.com/@{slug}"}},
+            }).encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('X-Ratelimit-Remaining', str(remaining))
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_image(self, name):
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.downloads[name] += 1
+        body = generated_image(name)
+        self.send_response(200)
+        self.send_header('Content-Type', 'image/jpeg')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_standin(port=0, latency=0.0, limit=50):
+    """Serve in a background thread; returns the server (see .url, .requests, .shutdown())"""
+    server = StandinServer(('127.0.0.1', port), latency, limit)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Local Unsplash API stand-in.')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.2, help='seconds to delay each response')
+    parser.add_argument('--limit', type=int, default=50, help='requests before answering 403')
+    args = parser.parse_args()
+
+    server = StandinServer(('127.0.0.1', args.port), args.latency, args.limit)
+    print(f"Serving Unsplash stand-in on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"\nRequests per query: {dict(server.requests)}")
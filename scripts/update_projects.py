@@ -1,44 +1,19 @@
-import firebase_admin
-from firebase_admin import credentials, firestore
+from firestore_client import db
+import argparse
 from datetime import datetime
-import requests
 import re
+from content_hash import HashManifest, content_hash
+from image_resolver import ImageResolver, resolve_images
+from project_categories import classify_projects, classify_tech_stack
+from write_plan import WritePlan, execute_plan
 
-# Initialize Firebase Admin
-cred = credentials.Certificate('/Users/admin/Downloads/bymayanksingh-firebase-adminsdk-jmdt5-f612894ec8.json')
-firebase_admin.initialize_app(cred)
-
-db = firestore.client()
+YEAR_PATTERN = re.compile(r'\b(20\d{2})\b')
 
 def get_unsplash_image(query):
     """Get a relevant image from Unsplash based on project type"""
-    try:
-        # Using the public Unsplash API (limited to 50 requests per hour)
-        url = f"https://api.unsplash.com/photos/random?query={query}&orientation=landscape"
-        headers = {
-            "Authorization": "Client-ID YOUR_UNSPLASH_ACCESS_KEY"  # Replace with your Unsplash access key
-        }
-        response = requests.get(url, headers=headers)
-        if response.status_code == 200:
-            data = response.json()
-            return {
-                'url': data['urls']['regular'],
-                'credit': {
-                    'name': data['user']['name'],
-                    'link': data['user']['links']['html']
-                }
-            }
-    except Exception as e:
-        print(f"Error fetching Unsplash image: {e}")
-    
-    # Fallback to a default image if Unsplash fails
-    return {
-        'url': f"https://source.unsplash.com/random/800x600/?{query}",
-        'credit': {
-            'name': 'Unsplash',
-            'link': 'https://unsplash.com'
-        }
-    }
+    # Goes through the cached, rate-limited resolver; for many projects use
+    # resolve_images() once over all their queries instead
+    return resolve_images([query])[query]
 
 def extract_year(date_str):
     """Extract year from various date formats"""
@@ -51,7 +26,7 @@ def extract_year(date_str):
     
     # Handle string dates
     if isinstance(date_str, str):
-        match = re.search(r'\b(20\d{2})\b', date_str)
+        match = YEAR_PATTERN.search(date_str)
         return int(match.group(1)) if match else None
     
     # Handle datetime objects
@@ -61,23 +36,11 @@ def extract_year(date_str):
     return None
 
 def get_project_category(tech_stack):
-    """Determine project category based on technologies used"""
-    tech_lower = tech_stack.lower()
-    if 'api' in tech_lower or 'rest' in tech_lower:
-        return 'Backend Development'
-    elif 'react' in tech_lower or 'vue' in tech_lower or 'css' in tech_lower:
-        return 'Frontend Development'
-    elif 'pygame' in tech_lower or 'game' in tech_lower:
-        return 'Game Development'
-    elif 'flask' in tech_lower or 'django' in tech_lower:
-        return 'Full Stack Development'
-    return 'Software Development'
+    """Determine project category based on technologies used (list or string)"""
+    return classify_tech_stack(tech_stack)
 
-def standardize_project(project):
-    """Standardize project data structure"""
-    title = project.get('title', '')
-    tech_stack = project.get('technologies', '')
-    
+def get_image_query(title, category):
+    """Unsplash search terms for a project's category"""
     # Generate search terms for image based on project type
     image_search_terms = {
         'Backend Development': 'server,api,database',
@@ -86,9 +49,42 @@ def standardize_project(project):
         'Full Stack Development': 'web,application,fullstack',
         'Software Development': 'software,programming,code'
     }
+    return image_search_terms.get(category, 'programming')
+
+def needs_cover_image(project):
+    """True if standardize_project() has to look up a cover image"""
+    current_cover = project.get('coverImage')
+    if isinstance(current_cover, dict) and 'url' in current_cover:
+        return False
+    return not (isinstance(current_cover, str) and current_cover)
+
+def resolve_cover_images(projects, resolver=None, dry_run=False):
+    """Look up cover images for every project lacking one, once per distinct query
+    
+    With ``dry_run`` only cached images are used; the other covers are
+    would_resolve() placeholders and nothing is requested or saved.
+    """
+    projects = [p for p in projects if needs_cover_image(p)]
+    queries = [get_image_query(p.get('title', ''), category)
+               for p, category in zip(projects, classify_projects(projects))]
+    if not queries:
+        return {}
+    resolver = resolver or ImageResolver(dry_run=dry_run)
+    images = resolver.resolve(queries)
+    print(resolver.report())
+    return images
+
+def standardize_project(project, images=None):
+    """Standardize project data structure
+    
+    ``images`` maps image queries to prefetched cover images (see
+    resolve_cover_images()); without it a missing cover is looked up directly.
+    """
+    title = project.get('title', '')
+    tech_stack = project.get('technologies', '')
     
     category = get_project_category(tech_stack)
-    image_query = image_search_terms.get(category, 'programming')
+    image_query = get_image_query(title, category)
     
     # Get or generate cover image
     current_cover = project.get('coverImage')
@@ -96,6 +92,8 @@ def standardize_project(project):
         cover_image = current_cover
     elif isinstance(current_cover, str) and current_cover:
         cover_image = {'url': current_cover}
+    elif images and image_query in images:
+        cover_image = images[image_query]
     else:
         cover_image = get_unsplash_image(image_query)
     
@@ -142,21 +140,65 @@ def standardize_project(project):
         'updated_at': datetime.now()
     }
 
-def update_all_projects():
-    """Update all projects with standardized schema"""
-    docs = db.collection('projects').stream()
-    updated_count = 0
+def plan_project_updates(manifest, dry_run=False):
+    """Write plan standardizing every project the manifest hasn't seen in its current form
     
+    Returns the plan and how many projects were left unchanged.
+    """
+    docs = db.collection('projects').stream()
+    skipped_count = 0
+    pending = []
     for doc in docs:
         project = doc.to_dict()
-        updated_project = standardize_project(project)
-        
-        # Update the document
-        db.collection('projects').document(doc.id).set(updated_project)
-        updated_count += 1
-        print(f"Updated project: {updated_project['title']}")
-    
-    print(f"\nSuccessfully updated {updated_count} projects")
+        # Already standardized by a previous run and untouched since
+        if manifest.matches('projects', doc.id, project):
+            skipped_count += 1
+            continue
+        pending.append((doc, project))
+    
+    # Fetch all missing cover images up front, concurrently and once per query
+    images = resolve_cover_images([project for _, project in pending], dry_run=dry_run)
+    
+    plan = WritePlan('update_projects')
+    for doc, project in pending:
+        updated_project = standardize_project(project, images)
+        # Compare only the fields the standardized document has: fields it
+        # leaves out (slug, date_built, ...) would otherwise never match
+        written = {key: project.get(key) for key in updated_project}
+        if content_hash(updated_project) == content_hash(written):
+            manifest.record('projects', doc.id, project)
+            skipped_count += 1
+            continue
+        plan.set('projects', doc.id, updated_project, before=project)
+    return plan, skipped_count
+
+def update_all_projects(dry_run=False, plan_path=None):
+    """Update all projects with standardized schema, skipping unchanged ones"""
+    manifest = HashManifest('update_projects')
+    plan, skipped_count = plan_project_updates(manifest, dry_run)
+    print(plan.report(show_diffs=dry_run))
+    if plan_path:
+        plan.save(plan_path)
+        print(f"Plan saved to {plan_path}")
+    if dry_run:
+        # Nothing is saved, not even the manifest
+        print(f"\nDry run: {len(plan)} projects would be updated ({skipped_count} unchanged)")
+        return plan
+    
+    stats = execute_plan(plan, db)
+    print(stats.report())
+    if not stats.failed_writes:
+        for operation in plan:
+            manifest.record('projects', operation['id'], operation['data'])
+    manifest.save()
+    
+    print(f"\nSuccessfully updated {len(plan)} projects ({skipped_count} unchanged)")
+    return plan
 
 if __name__ == "__main__":
-    update_all_projects()
+    parser = argparse.ArgumentParser(description='Standardize the schema of every project.')
+    parser.add_argument('--dry-run', action='store_true', help='print the write plan without executing it')
+    parser.add_argument('--plan', metavar='FILE', help='save the write plan as JSON')
+    args = parser.parse_args()
+    
+    update_all_projects(args.dry_run, args.plan)
@@ -0,0 +1,271 @@
+"""Write plans: the changes a script would make, kept apart from making them.
+
+Transforms (merge_projects, update_projects, firebase_import_with_delete,
+projects_cli) compute a WritePlan instead of writing as they go. A plan
+holds at most one operation per document (a later set replaces an earlier
+delete of the same document, and so on) together with per-field diffs
+against what the document looked like when planned. It can be printed,
+saved as JSON, compared with the plan of a previous run, and handed to
+execute_plan(), which commits it through BulkWriter: sets and updates
+first, in parallel batches, then deletes. If any set or update failed the
+deletes are skipped, since they may remove the originals of documents
+whose replacements didn't land; the skipped documents are reported.
+
+PlanWriter writes the same JSON file an operation at a time, for plans too
+large to hold in memory while they are computed (snapshot_diff.py --plan).
+
+    python write_plan.py show plan.json
+    python write_plan.py diff old_plan.json new_plan.json
+    python write_plan.py execute plan.json [--batch-size N] [--workers N]
+"""
+import argparse
+import json
+from datetime import datetime
+
+from bulk_writer import BulkWriter, BulkWriteStats, MAX_BATCH_SIZE, MAX_WORKERS
+from content_hash import content_hash
+from snapshot import decode_document, encode_document, json_default
+
+FORMAT_VERSION = 1
+# Order in which execute_plan() runs the operations
+PHASES = ('set', 'update', 'delete')
+
+
+def field_diff(before, after):
+    """{field: {'old': ..., 'new': ...}} for the top-level fields that differ.
+
+    A key is left out on the side where the field doesn't exist.
+    """
+    before = before or {}
+    after = after or {}
+    diff = {}
+    for key in sorted(set(before) | set(after)):
+        if before.get(key, diff) != after.get(key, diff):
+            change = {}
+            if key in before:
+                change['old'] = before[key]
+            if key in after:
+                change['new'] = after[key]
+            diff[key] = change
+    return diff
+
+
+class WritePlan:
+    """Ordered set of set/update/delete operations, at most one per document."""
+
+    def __init__(self, source=None):
+        self.source = source
+        self.created_at = datetime.now()
+        self.operations = {}
+
+    def __len__(self):
+        return len(self.operations)
+
+    def __iter__(self):
+        return iter(self.operations.values())
+
+    def _add(self, operation):
+        key = (operation['collection'], operation['id'])
+        self.operations.pop(key, None)
+        self.operations[key] = operation
+
+    def set(self, collection, doc_id, data, before=None):
+        """Plan replacing a document; ``before`` is its current data, for the diff."""
+        self._add({'op': 'set', 'collection': collection, 'id': doc_id, 'data': data,
+                   'diff': field_diff(before, data)})
+
+    def update(self, collection, doc_id, fields, before=None):
+        """Plan updating some top-level fields of an existing document."""
+        old = {key: before[key] for key in fields if before and key in before}
+        self._add({'op': 'update', 'collection': collection, 'id': doc_id, 'data': fields,
+                   'diff': field_diff(old, fields)})
+
+    def delete(self, collection, doc_id, before=None):
+        self._add({'op': 'delete', 'collection': collection, 'id': doc_id, 'data': None,
+                   'diff': field_diff(before, None)})
+
+    def counts(self):
+        counts = {op: 0 for op in PHASES}
+        for operation in self:
+            counts[operation['op']] += 1
+        return counts
+
+    def report(self, show_diffs=True):
+        """Summary line plus one line per operation and, optionally, its field diffs."""
+        counts = self.counts()
+        lines = [f"Plan{f' from {self.source}' if self.source else ''}: {counts['set']} sets, "
+                 f"{counts['update']} updates, {counts['delete']} deletes"]
+        for operation in self:
+            lines.append(f"  {operation['op']} {operation['collection']}/{operation['id']}")
+            if show_diffs and operation['op'] != 'delete':
+                for field, change in operation['diff'].items():
+                    old = json.dumps(change['old'], default=json_default) if 'old' in change else '(missing)'
+                    new = json.dumps(change['new'], default=json_default) if 'new' in change else '(removed)'
+                    lines.append(f"      {field}: {old[:60]} -> {new[:60]}")
+        return '\n'.join(lines)
+
+    def to_json(self):
+        return {
+            'plan': FORMAT_VERSION,
+            'source': self.source,
+            'created_at': self.created_at.isoformat(),
+            'operations': [_operation_record(operation) for operation in self],
+        }
+
+    @classmethod
+    def from_json(cls, saved):
+        plan = cls(saved.get('source'))
+        plan.created_at = datetime.fromisoformat(saved['created_at'])
+        for record in saved['operations']:
+            if record['data'] is not None:
+                _, record['data'] = decode_document(record)
+            record.pop('types', None)
+            plan._add(record)
+        return plan
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=2, default=json_default)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_json(json.load(f))
+
+
+def _operation_record(operation):
+    record = dict(operation)
+    if record['data'] is not None:
+        # Keep the timestamp types so the data round-trips exactly
+        encoded = encode_document(record['id'], record['data'])
+        if 'types' in encoded:
+            record['types'] = encoded['types']
+    return record
+
+
+class PlanWriter:
+    """Writes a plan file as operations are added, without keeping them in memory.
+
+    Unlike WritePlan it doesn't combine operations on the same document, so
+    each document must be added at most once. The file loads with
+    WritePlan.load().
+    """
+
+    def __init__(self, path, source=None):
+        self.path = path
+        self.count = 0
+        self._file = open(path, 'w')
+        header = json.dumps({'plan': FORMAT_VERSION, 'source': source,
+                             'created_at': datetime.now().isoformat()})
+        # The header object, left open for the operations list
+        self._file.write(header[:-1] + ', "operations": [')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _write(self, operation):
+        record = json.dumps(_operation_record(operation), default=json_default)
+        self._file.write(('\n  ' if not self.count else ',\n  ') + record)
+        self.count += 1
+
+    def set(self, collection, doc_id, data, before=None):
+        self._write({'op': 'set', 'collection': collection, 'id': doc_id, 'data': data,
+                     'diff': field_diff(before, data)})
+
+    def update(self, collection, doc_id, fields, before=None):
+        old = {key: before[key] for key in fields if before and key in before}
+        self._write({'op': 'update', 'collection': collection, 'id': doc_id, 'data': fields,
+                     'diff': field_diff(old, fields)})
+
+    def delete(self, collection, doc_id, before=None):
+        self._write({'op': 'delete', 'collection': collection, 'id': doc_id, 'data': None,
+                     'diff': field_diff(before, None)})
+
+    def close(self):
+        if not self._file.closed:
+            self._file.write('\n]}\n')
+            self._file.close()
+
+
+def compare_plans(old, new):
+    """What changed between two plans: operations only in one of them, or different.
+
+    Operations count as the same when only volatile fields (updated_at) differ.
+    """
+    def signature(operation):
+        data = operation['data']
+        return operation['op'], content_hash(data) if data is not None else None
+
+    added = [key for key in new.operations if key not in old.operations]
+    removed = [key for key in old.operations if key not in new.operations]
+    changed = [
+        key for key in new.operations
+        if key in old.operations and signature(old.operations[key]) != signature(new.operations[key])
+    ]
+    return {'added': added, 'removed': removed, 'changed': changed}
+
+
+def execute_plan(plan, client, batch_size=MAX_BATCH_SIZE, max_workers=MAX_WORKERS):
+    """Commit a plan: sets and updates in parallel batches, then the deletes.
+
+    The deletes only run if every set and update was committed; otherwise
+    they are listed in the returned stats' ``skipped``.
+    """
+    stats = BulkWriteStats()
+    for phase in (('set', 'update'), ('delete',)):
+        operations = [operation for operation in plan if operation['op'] in phase]
+        if phase == ('delete',) and stats.failed_writes:
+            stats.skipped = [f"{operation['collection']}/{operation['id']}" for operation in operations]
+            break
+        with BulkWriter(client, batch_size=batch_size, max_workers=max_workers) as writer:
+            for operation in operations:
+                reference = client.collection(operation['collection']).document(operation['id'])
+                if operation['op'] == 'set':
+                    writer.set(reference, operation['data'])
+                elif operation['op'] == 'update':
+                    writer.update(reference, operation['data'])
+                else:
+                    writer.delete(reference)
+        stats.writes += writer.stats.writes
+        stats.batches += writer.stats.batches
+        stats.retries += writer.stats.retries
+        stats.failed_writes += writer.stats.failed_writes
+        stats.errors += writer.stats.errors
+    stats.finished = writer.stats.finished
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Inspect, compare and execute saved write plans.')
+    commands = parser.add_subparsers(dest='command', required=True)
+    show_parser = commands.add_parser('show', help='print a plan with its field diffs')
+    show_parser.add_argument('plan')
+    diff_parser = commands.add_parser('diff', help='compare two plans')
+    diff_parser.add_argument('old')
+    diff_parser.add_argument('new')
+    execute_parser = commands.add_parser('execute', help='commit a plan to Firestore')
+    execute_parser.add_argument('plan')
+    execute_parser.add_argument('--batch-size', type=int, default=MAX_BATCH_SIZE)
+    execute_parser.add_argument('--workers', type=int, default=MAX_WORKERS)
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        print(WritePlan.load(args.plan).report())
+    elif args.command == 'diff':
+        differences = compare_plans(WritePlan.load(args.old), WritePlan.load(args.new))
+        for kind, keys in differences.items():
+            print(f"{kind}: {len(keys)}")
+            for collection, doc_id in keys:
+                print(f"  {collection}/{doc_id}")
+    else:
+        from firestore_client import db
+        plan = WritePlan.load(args.plan)
+        print(plan.report(show_diffs=False).splitlines()[0])
+        print(execute_plan(plan, db, args.batch_size, args.workers).report())